@@ -0,0 +1,74 @@
+"""
+Bounded in-process LRU cache with hit/miss counters
+
+Values must be immutable snapshots so callers can share them freely. Loads
+that race with an invalidation are discarded: take a token with
+`load_token()` before reading the database and pass it to `put()`.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_registry = {}
+
+
+class LRUCache:
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        _registry[name] = self
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def load_token(self) -> int:
+        return self._generation
+
+    def put(self, key: Hashable, value: Any, token: Optional[int] = None):
+        """Store a value, unless an invalidation happened since `token` was taken"""
+        with self._lock:
+            if token is not None and token != self._generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+def cache_stats() -> dict:
+    """Stats of every cache in this process"""
+    return {name: cache.stats() for name, cache in _registry.items()}
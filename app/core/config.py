@@ -1,3 +1,4 @@
+import os
 from datetime import timedelta
 
 SECRET_KEY = "supersecretkey"
@@ -6,6 +7,140 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Refresh-token revocation (Bloom filter over the revoked_tokens table)
+REVOCATION_FILTER_CAPACITY = 1_000_000  # revocations before the filter is rebuilt (~1.8 MB)
+REVOCATION_FILTER_ERROR_RATE = 0.001
+REVOCATION_SYNC_SECONDS = 5  # how often a worker pulls revocations made by others
+
 UPLOAD_FOLDER = "uploads/"
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 ALLOWED_TYPES = ["application/pdf", "image/jpeg", "image/png"]
+
+# Per-user storage quota (users.storage_quota_bytes overrides it per user)
+STORAGE_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_BYTES", str(1024 * 1024 * 1024)))  # 1 GiB
+UPLOAD_FORM_OVERHEAD_BYTES = 4096  # multipart framing allowed on top of the file in Content-Length
+
+# On-demand request profiling (admin only)
+PROFILE_SPOOL_DIR = "profiles/"
+PROFILE_SPOOL_MAX_FILES = 50
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+PROFILE_MIN_INTERVAL_SECONDS = 10
+
+# Startup
+# Set CREATE_SCHEMA_ON_STARTUP=0 when the schema is created by an explicit
+# `python -m app.database` migration step instead of by every worker
+CREATE_SCHEMA_ON_STARTUP = os.getenv("CREATE_SCHEMA_ON_STARTUP", "1") == "1"
+# Prebuilt OpenAPI document (see `python -m app.main --dump-openapi`)
+OPENAPI_PREBUILT_PATH = os.getenv("OPENAPI_PREBUILT_PATH")
+
+# Cross-worker cache invalidation
+INVALIDATION_POLL_INTERVAL_SECONDS = 0.1
+INVALIDATION_RETENTION_SECONDS = 3600
+
+# Background process pool (thumbnails and other CPU-heavy derived work)
+PROCESS_POOL_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+# Thumbnails / previews
+THUMBNAIL_FOLDER = "uploads/thumbnails/"
+THUMBNAIL_MAX_SIZE = (256, 256)
+THUMBNAIL_CACHE_MAX_AGE = 365 * 24 * 3600  # thumbnails are immutable per content hash
+
+# Content search index
+CONTENT_INDEX_MAX_CHARS = 200_000  # indexed text per document
+
+# Near-duplicate detection
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16  # 4 rows per band: candidates from roughly 50% similarity
+MINHASH_SHINGLE_SIZE = 3  # words per shingle
+MINHASH_MAX_SHINGLES = 5000
+MINHASH_THRESHOLD = 0.8  # estimated Jaccard similarity reported as duplicate
+DHASH_BANDS = 4  # 16-bit bands probed with every 1-bit flip: finds any hash within 7 bits
+DHASH_MAX_DISTANCE = 6  # Hamming distance reported as duplicate
+SIMILARITY_MAX_CANDIDATES = 200  # signatures compared exactly per lookup
+SIMILARITY_TIMEOUT_SECONDS = 5  # upload waits this long for the signature
+
+# Pre-signed download URLs
+DOWNLOAD_URL_EXPIRE_SECONDS = 300
+# Let a front proxy send the bytes: "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache/lighttpd)
+DOWNLOAD_OFFLOAD_HEADER = os.getenv("DOWNLOAD_OFFLOAD_HEADER")
+# nginx internal location that maps to UPLOAD_FOLDER, used with X-Accel-Redirect
+DOWNLOAD_ACCEL_REDIRECT_PREFIX = os.getenv("DOWNLOAD_ACCEL_REDIRECT_PREFIX", "/protected/")
+
+# Streamed ZIP archives
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+ARCHIVE_QUERY_BATCH = 500  # rows fetched per round trip while streaming an archive
+ARCHIVE_STORED_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png")  # already compressed, store as-is
+
+# Document change feed (server-sent events)
+EVENTS_POLL_INTERVAL_SECONDS = 0.5  # how often streams look for events committed by any worker
+EVENTS_RETENTION_SECONDS = 3600  # events kept in document_events for Last-Event-ID resume
+EVENTS_REPLAY_MAX = 1000  # missed events replayed on reconnect before the client is told to resync
+EVENTS_QUEUE_SIZE = 100  # per-subscriber backlog before it is told to resync
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_STREAM_MAX_SECONDS = 300  # clients reconnect with Last-Event-ID after this
+EVENTS_TOKEN_EXPIRE_SECONDS = 60  # signed ?token= for EventSource, which cannot send headers
+
+# Delta sync of /documents/my
+SYNC_PAGE_SIZE = 100
+SYNC_MAX_PAGE_SIZE = 500
+
+# Review work queue (admins claim pending documents for a limited time)
+REVIEW_LEASE_SECONDS = 600
+REVIEW_CLAIM_MAX = 50
+
+# Bulk user import
+USER_IMPORT_CHUNK_SIZE = 500  # rows per transaction
+USER_IMPORT_MAX_ROWS = 50_000  # rows past this are not read
+USER_IMPORT_HASH_BATCH = 8  # passwords hashed per pool job
+USER_IMPORT_WORKERS = int(os.getenv("USER_IMPORT_WORKERS", str(max(2, (os.cpu_count() or 2) // 2))))  # dedicated hashing pool
+USER_IMPORT_MAX_IN_FLIGHT = 2 * USER_IMPORT_WORKERS  # hashing jobs one import keeps queued (every worker busy)
+
+# Batch lookups
+BATCH_GET_MAX_IDS = 100
+
+# In-process entity caches (invalidated through the invalidation bus)
+DOCUMENT_CACHE_SIZE = 2048
+
+# Single-flight coalescing of identical concurrent reads
+SINGLE_FLIGHT_MAX_WAITERS = 100  # beyond this, requests compute on their own
+SINGLE_FLIGHT_TIMEOUT_SECONDS = 10  # waiters give up and compute on their own
+
+# Admission control (token buckets per client IP and per user)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# "memory" (per process) or "sqlite" (shared by all workers through RATE_LIMIT_SQLITE_PATH)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "rate_limits.db")
+RATE_LIMIT_IP_RATE = 20.0  # tokens per second
+RATE_LIMIT_IP_BURST = 100.0
+RATE_LIMIT_USER_RATE = 10.0
+RATE_LIMIT_USER_BURST = 50.0
+# Token cost per request; other routes cost 1
+RATE_LIMIT_ROUTE_COSTS = {
+    ("POST", "/auth/login"): 10,  # bcrypt
+    ("POST", "/auth/register"): 10,
+    ("GET", "/documents/search/advanced"): 5,  # COUNT + page query
+    ("GET", "/documents/archive"): 20,
+    ("POST", "/users/import"): 50,
+}
+RATE_LIMIT_EXEMPT_PATHS = ("/health", "/docs", "/redoc", "/openapi.json")
+RATE_LIMIT_MAX_KEYS = 100_000  # in-memory buckets kept before idle ones are pruned
+RATE_LIMIT_PRUNE_SECONDS = 60  # sqlite backend: idle buckets are deleted at most this often
+
+# Idempotency-Key replay of state-changing requests
+# Keys are shared by all workers on the host through IDEMPOTENCY_SQLITE_PATH
+IDEMPOTENCY_SQLITE_PATH = os.getenv("IDEMPOTENCY_SQLITE_PATH", "idempotency.db")
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+IDEMPOTENCY_CLAIM_SECONDS = 5 * 60  # an unfinished attempt older than this is taken over (its worker died)
+IDEMPOTENCY_PRUNE_SECONDS = 60  # expired keys are deleted at most this often
+IDEMPOTENCY_MAX_BODY_BYTES = 64 * 1024  # larger responses are not stored
+IDEMPOTENCY_WAIT_SECONDS = 30  # a duplicate waits this long for the first attempt
+IDEMPOTENCY_POLL_SECONDS = 0.05  # how often a waiting duplicate checks the outcome
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Query deadlines (seconds) per route; running SQLite statements are interrupted
+QUERY_DEADLINE_SECONDS = {
+    "search_advanced": 5.0,
+    "list_documents": 10.0,
+}
+DEADLINE_PROGRESS_STEPS = 1000  # SQLite VM steps between deadline checks
+DISCONNECT_POLL_SECONDS = 0.25
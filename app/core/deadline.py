@@ -0,0 +1,99 @@
+"""
+Query deadlines and client-disconnect cancellation
+
+A route declares a time budget with `Depends(query_deadline("<name>"))`; the
+budget is looked up in QUERY_DEADLINE_SECONDS. While the request runs, a task
+on the event loop watches for the client disconnecting. Queries run inside
+`with deadline.guard(db):`, which installs a SQLite progress handler that
+aborts the running statement as soon as the budget is spent or the client is
+gone, so abandoned work stops holding a worker thread.
+
+Timeouts answer 503 and disconnects 499; both are counted in app.core.metrics.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import QUERY_DEADLINE_SECONDS, DEADLINE_PROGRESS_STEPS, DISCONNECT_POLL_SECONDS
+from app.core.exceptions import ClientDisconnected, QueryTimeout
+
+REASON_TIMEOUT = "timeout"
+REASON_DISCONNECT = "disconnect"
+
+
+class Deadline:
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        self.disconnected = False
+
+    def reason(self) -> Optional[str]:
+        if self.disconnected:
+            return REASON_DISCONNECT
+        if time.monotonic() >= self.expires_at:
+            return REASON_TIMEOUT
+        return None
+
+    def error(self, reason: str):
+        metrics.increment(f"queries_cancelled_{reason}")
+        return ClientDisconnected() if reason == REASON_DISCONNECT else QueryTimeout(self.budget)
+
+    def check(self):
+        """Raise if the budget is spent or the client is gone"""
+        reason = self.reason()
+        if reason:
+            raise self.error(reason)
+
+    def _should_abort(self) -> int:
+        # SQLite progress handler: a non-zero return interrupts the statement
+        return 1 if self.reason() else 0
+
+    @contextmanager
+    def guard(self, db: Session):
+        """Run the enclosed queries under this deadline"""
+        self.check()
+        dbapi_connection = db.connection().connection.driver_connection
+        set_handler = getattr(dbapi_connection, "set_progress_handler", None)
+        if set_handler:
+            set_handler(self._should_abort, DEADLINE_PROGRESS_STEPS)
+        try:
+            yield self
+        except DBAPIError as e:
+            reason = self.reason()
+            if reason is None:
+                raise
+            db.rollback()
+            raise self.error(reason) from e
+        finally:
+            if set_handler:
+                set_handler(None, 0)
+        # Finished late is still finished, but nobody will read it once the client left
+        if self.disconnected:
+            raise self.error(REASON_DISCONNECT)
+
+
+async def watch_disconnect(request: Request, deadline: Deadline, interval: float = DISCONNECT_POLL_SECONDS):
+    """Flag the deadline when the client goes away (GET routes only: it drains the receive channel)"""
+    while not deadline.disconnected:
+        if await request.is_disconnected():
+            deadline.disconnected = True
+            return
+        await asyncio.sleep(interval)
+
+
+def query_deadline(name: str):
+    """Dependency factory giving a route the time budget configured under `name`"""
+    async def dependency(request: Request):
+        deadline = Deadline(QUERY_DEADLINE_SECONDS[name])
+        watcher = asyncio.create_task(watch_disconnect(request, deadline))
+        try:
+            yield deadline
+        finally:
+            watcher.cancel()
+    return dependency
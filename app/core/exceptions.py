@@ -84,6 +84,46 @@ class DocumentStatusError(DocumentAPIException):
         )
 
 
+class DocumentConflict(DocumentAPIException):
+    """Concurrent modification exception"""
+    def __init__(self, doc_id: int):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Document with ID {doc_id} was modified concurrently, reload and retry",
+            error_code="DOCUMENT_CONFLICT"
+        )
+
+
+class DocumentClaimed(DocumentAPIException):
+    """Document leased to another reviewer exception"""
+    def __init__(self, doc_id: int):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Document with ID {doc_id} is claimed by another reviewer",
+            error_code="DOCUMENT_CLAIMED"
+        )
+
+
+class PreconditionFailed(DocumentAPIException):
+    """If-Match precondition failed exception"""
+    def __init__(self, message: str = "Precondition failed"):
+        super().__init__(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=message,
+            error_code="PRECONDITION_FAILED"
+        )
+
+
+class QuotaExceeded(DocumentAPIException):
+    """Storage quota exceeded exception"""
+    def __init__(self, quota: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Storage quota of {quota} bytes exceeded",
+            error_code="STORAGE_QUOTA_EXCEEDED"
+        )
+
+
 class DuplicateEmailError(DocumentAPIException):
     """Duplicate email exception"""
     def __init__(self, email: str):
@@ -102,3 +142,27 @@ class DatabaseError(DocumentAPIException):
             detail=message,
             error_code="DATABASE_ERROR"
         )
+
+
+class QueryCancelled(DocumentAPIException):
+    """Base exception for queries aborted before completion"""
+
+
+class QueryTimeout(QueryCancelled):
+    """Query deadline exceeded exception"""
+    def __init__(self, budget: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Query exceeded its time budget of {budget:g} seconds",
+            error_code="QUERY_TIMEOUT"
+        )
+
+
+class ClientDisconnected(QueryCancelled):
+    """Client closed the request before the response was ready"""
+    def __init__(self):
+        super().__init__(
+            status_code=499,
+            detail="Client closed request",
+            error_code="CLIENT_CLOSED_REQUEST"
+        )
@@ -0,0 +1,257 @@
+"""
+Idempotency-Key support for state-changing requests
+
+A client that retries a POST/PUT/PATCH/DELETE with the same `Idempotency-Key`
+header gets the response of the first attempt replayed instead of running the
+route again: no second Document row, file, history entry or background task.
+
+- Keys are scoped to the caller (user id from the bearer token, otherwise the
+  client IP), the method and the path, so two users cannot collide.
+- The replay is answered before the request body is read.
+- A duplicate that arrives while the first attempt is still running, in this
+  or another worker, waits for it (up to IDEMPOTENCY_WAIT_SECONDS) and then
+  gets the same response.
+- Only completed non-5xx responses up to IDEMPOTENCY_MAX_BODY_BYTES are
+  stored; a failed attempt can simply be retried.
+
+Keys live in one small WITHOUT ROWID table in IDEMPOTENCY_SQLITE_PATH shared by
+all workers on the host, like the sqlite rate-limit backend. An attempt claims
+its key with a write transaction before the route runs, so exactly one worker
+executes it; a claim whose worker died expires after IDEMPOTENCY_CLAIM_SECONDS.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.core import metrics
+from app.core.config import (
+    IDEMPOTENCY_SQLITE_PATH,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_CLAIM_SECONDS,
+    IDEMPOTENCY_PRUNE_SECONDS,
+    IDEMPOTENCY_MAX_BODY_BYTES,
+    IDEMPOTENCY_WAIT_SECONDS,
+    IDEMPOTENCY_POLL_SECONDS,
+    IDEMPOTENCY_KEY_MAX_LENGTH
+)
+from app.core.security import decode_request_token
+from app.schemas.responses import ErrorResponse
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENT_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+STATE_PENDING = "pending"
+STATE_DONE = "done"
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    raw_headers: list
+    body: bytes
+
+
+class IdempotencyStore:
+    """Key -> claim or stored response, shared by every worker through a local SQLite file"""
+
+    def __init__(
+        self,
+        path: str = IDEMPOTENCY_SQLITE_PATH,
+        ttl: float = IDEMPOTENCY_TTL_SECONDS,
+        claim_ttl: float = IDEMPOTENCY_CLAIM_SECONDS,
+        prune_interval: float = IDEMPOTENCY_PRUNE_SECONDS
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.claim_ttl = claim_ttl
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._last_prune = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency_keys "
+                "(key TEXT PRIMARY KEY, state TEXT NOT NULL, status_code INTEGER, headers TEXT, "
+                "body BLOB, expires_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._local.conn = conn
+        return conn
+
+    def claim(self, key: str) -> Tuple[bool, Optional[StoredResponse]]:
+        """Claim `key` for this attempt
+
+        Returns (True, None) when the caller must run the request, (False, stored)
+        when a response can be replayed and (False, None) while another attempt
+        holds the key.
+        """
+        now = time.time()  # wall clock: shared between processes
+        self._prune(now)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state, status_code, headers, body FROM idempotency_keys "
+                "WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO idempotency_keys (key, state, expires_at) VALUES (?, ?, ?)",
+                    (key, STATE_PENDING, now + self.claim_ttl)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return True, None
+        state, status_code, headers, body = row
+        if state != STATE_DONE:
+            return False, None
+        raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(headers)]
+        return False, StoredResponse(status_code, raw_headers, body)
+
+    def finish(self, key: str, status_code: int = None, raw_headers: list = None, body: bytes = None):
+        """Release `key`, storing the response when one is given so duplicates replay it"""
+        conn = self._connection()
+        if status_code is None:
+            conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND state = ?", (key, STATE_PENDING))
+            return
+        headers = json.dumps([(name.decode("latin-1"), value.decode("latin-1")) for name, value in raw_headers])
+        conn.execute(
+            "UPDATE idempotency_keys SET state = ?, status_code = ?, headers = ?, body = ?, expires_at = ? "
+            "WHERE key = ?",
+            (STATE_DONE, status_code, headers, body, time.time() + self.ttl, key)
+        )
+
+    def _prune(self, now: float):
+        if now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        self._connection().execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+
+    def reset(self):
+        self._connection().execute("DELETE FROM idempotency_keys")
+        self._last_prune = 0.0
+
+
+idempotency_store = IdempotencyStore()
+
+
+def scope_key(request: Request, key: str) -> str:
+    payload = decode_request_token(request)
+    if payload and payload.get("sub"):
+        principal = f"user:{payload['sub']}"
+    else:
+        principal = f"ip:{request.client.host if request.client else 'unknown'}"
+    return "\x1f".join((principal, request.method, request.url.path, key))
+
+
+def replay(stored: StoredResponse) -> Response:
+    response = Response(content=stored.body, status_code=stored.status_code)
+    response.raw_headers = stored.raw_headers + [(REPLAYED_HEADER.lower().encode(), b"true")]
+    return response
+
+
+def idempotency_error(status_code: int, error_code: str, message: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content=ErrorResponse(
+            success=False,
+            error_code=error_code,
+            message=message,
+            timestamp=datetime.utcnow().isoformat()
+        ).dict()
+    )
+
+
+async def idempotent_request(request: Request, call_next):
+    """HTTP middleware replaying the stored response of a repeated Idempotency-Key"""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None or request.method not in IDEMPOTENT_METHODS:
+        return await call_next(request)
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        return idempotency_error(
+            400, "INVALID_IDEMPOTENCY_KEY",
+            f"{IDEMPOTENCY_HEADER} must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+        )
+
+    store = idempotency_store
+    scoped = scope_key(request, key)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        try:
+            claimed, stored = await run_in_threadpool(store.claim, scoped)
+        except sqlite3.Error as e:
+            # Never turn a store outage into an API outage
+            logger.error(f"Idempotency store unavailable, running request: {str(e)}")
+            return await call_next(request)
+        if stored is not None:
+            metrics.increment("idempotency_replayed")
+            return replay(stored)
+        if claimed:
+            break
+        # Same key still running (possibly in another worker): wait for its outcome
+        if time.monotonic() >= deadline:
+            return idempotency_error(
+                409, "IDEMPOTENCY_KEY_IN_USE",
+                "A request with this Idempotency-Key is still in progress, retry later"
+            )
+        await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+    async def release(*response):
+        try:
+            await run_in_threadpool(store.finish, scoped, *response)
+        except sqlite3.Error as e:
+            logger.error(f"Error releasing idempotency key: {str(e)}")
+
+    try:
+        response = await call_next(request)
+        if response.status_code >= 500:
+            await release()
+            return response
+
+        body = b""
+        async for chunk in response.body_iterator:
+            body += chunk
+            if len(body) > IDEMPOTENCY_MAX_BODY_BYTES:
+                break
+        if len(body) > IDEMPOTENCY_MAX_BODY_BYTES:
+            # Too large to keep: pass it through and let retries run again
+            await release()
+            rest = response.body_iterator
+
+            async def passthrough():
+                yield body
+                async for chunk in rest:
+                    yield chunk
+            response.body_iterator = passthrough()
+            return response
+
+        raw_headers = list(response.raw_headers)
+        await release(response.status_code, raw_headers, body)
+        replayed = Response(content=body, status_code=response.status_code)
+        replayed.raw_headers = raw_headers
+        return replayed
+    except BaseException:
+        # No await here: a cancelled request would be cancelled again at it
+        try:
+            store.finish(scoped)
+        except sqlite3.Error as e:
+            logger.error(f"Error releasing idempotency key: {str(e)}")
+        raise
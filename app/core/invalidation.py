@@ -0,0 +1,138 @@
+"""
+Cross-worker cache invalidation bus
+
+Every worker process keeps its own in-process caches. When a worker changes a
+user or document it publishes an invalidation into the `cache_invalidations`
+change-sequence table as part of the same transaction. Other workers poll that
+table cheaply (an indexed range scan on the primary key, throttled to once per
+INVALIDATION_POLL_INTERVAL_SECONDS) and run the handlers subscribed to the
+topic, so every cache layer drops stale entries consistently.
+
+Usage:
+    invalidation_bus.subscribe(TOPIC_DOCUMENT, lambda key: cache.pop(key))
+    invalidation_bus.publish(db, TOPIC_DOCUMENT, document.id)
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.cache_invalidation import CacheInvalidation
+from app.core.config import INVALIDATION_POLL_INTERVAL_SECONDS, INVALIDATION_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+TOPIC_USER = "user"
+TOPIC_DOCUMENT = "document"
+
+PENDING_KEY = "pending_invalidations"
+
+
+class InvalidationBus:
+    """Publishes invalidations through the database and dispatches them to local handlers"""
+
+    def __init__(
+        self,
+        poll_interval: float = INVALIDATION_POLL_INTERVAL_SECONDS,
+        retention: float = INVALIDATION_RETENTION_SECONDS
+    ):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._handlers = defaultdict(list)
+        self._lock = threading.Lock()
+        self._last_seen_id = None
+        self._last_poll = 0.0
+        self._last_prune = time.monotonic()
+
+    def subscribe(self, topic: str, handler: Callable[[Optional[str]], None]):
+        """Register a handler called with the invalidated key (None = whole topic)"""
+        self._handlers[topic].append(handler)
+
+    def publish(self, db: Session, topic: str, key=None) -> CacheInvalidation:
+        """Record an invalidation in the caller's transaction
+
+        Local handlers run once the transaction commits; other workers pick the
+        change up on their next poll.
+        """
+        key = str(key) if key is not None else None
+        change = CacheInvalidation(topic=topic, key=key)
+        db.add(change)
+        db.info.setdefault(PENDING_KEY, []).append((topic, key))
+        return change
+
+    def dispatch(self, topic: str, key: Optional[str]):
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(key)
+            except Exception as e:
+                logger.error(f"Error invalidating {topic}:{key}: {str(e)}")
+
+    def poll(self, db: Session, force: bool = False):
+        """Apply invalidations published by other workers since the last poll"""
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already polling
+        try:
+            self._last_poll = now
+            if self._last_seen_id is None:
+                # Caches start empty, so only changes from now on matter
+                self._last_seen_id = db.query(func.max(CacheInvalidation.id)).scalar() or 0
+                return
+
+            rows = db.query(
+                CacheInvalidation.id, CacheInvalidation.topic, CacheInvalidation.key
+            ).filter(
+                CacheInvalidation.id > self._last_seen_id
+            ).order_by(CacheInvalidation.id).all()
+
+            for row_id, topic, key in rows:
+                self.dispatch(topic, key)
+                self._last_seen_id = row_id
+
+            if now - self._last_prune > self.retention:
+                self._last_prune = now
+                self.prune(db)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error polling cache invalidations: {str(e)}")
+        finally:
+            self._lock.release()
+
+    def prune(self, db: Session):
+        """Delete old invalidations, always keeping the newest row so ids stay monotonic"""
+        newest_id = db.query(func.max(CacheInvalidation.id)).scalar()
+        if newest_id is None:
+            return
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        db.query(CacheInvalidation).filter(
+            CacheInvalidation.id < newest_id,
+            CacheInvalidation.created_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    def reset(self):
+        """Forget the poll position (used when a worker process starts)"""
+        self._last_seen_id = None
+        self._last_poll = 0.0
+
+
+invalidation_bus = InvalidationBus()
+
+
+@event.listens_for(Session, "after_commit")
+def dispatch_committed_invalidations(session: Session):
+    for topic, key in session.info.pop(PENDING_KEY, ()):
+        invalidation_bus.dispatch(topic, key)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_invalidations(session: Session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,23 @@
+"""
+Process-local counters exposed at /health/metrics
+"""
+import threading
+from collections import Counter
+
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def increment(name: str, amount: int = 1):
+    with _lock:
+        _counters[name] += amount
+
+
+def counters() -> dict:
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,222 @@
+"""
+On-demand request profiling
+
+An admin can ask for a single request to be profiled by sending the
+`X-Profile: 1` header (or the `_profile=1` query flag). While that request is
+in flight a sampling profiler records the stacks of the threads running it, and
+the result is written as collapsed stacks (flamegraph format) into a bounded
+spool.
+
+The sampler only reads the stacks of threads registered with it: the event
+loop thread serving the request, and each threadpool worker while it runs the
+request's sync endpoints and dependencies. Threadpool calls are registered by
+wrapping anyio.to_thread.run_sync (see install_thread_registry); the wrapper
+finds the sampler through a ContextVar set by the middleware, so work of other
+requests on the pool is never sampled. Coroutines of concurrent requests that
+interleave on the event loop thread can still appear in a profile.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import anyio.to_thread
+from fastapi import Request
+
+from app.core.config import (
+    PROFILE_SPOOL_DIR,
+    PROFILE_SPOOL_MAX_FILES,
+    PROFILE_SAMPLE_INTERVAL_SECONDS,
+    PROFILE_MIN_INTERVAL_SECONDS
+)
+from app.core.security import decode_request_token
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_FLAG = "_profile"
+
+# Leaf frames from these modules mean the thread is idle (waiting for work)
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+
+# The sampler of the request being profiled, visible in every copy of its context
+_profiled_request = contextvars.ContextVar("profiled_request", default=None)
+
+
+class StackSampler:
+    """Periodically samples the Python stacks of the threads registered with it"""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = Counter()
+        self._threads = Counter()  # thread ident -> work items of the request it is running
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def register_thread(self):
+        """Sample the calling thread until unregister_thread"""
+        with self._threads_lock:
+            self._threads[threading.get_ident()] += 1
+
+    def unregister_thread(self):
+        with self._threads_lock:
+            thread_id = threading.get_ident()
+            self._threads[thread_id] -= 1
+            if self._threads[thread_id] <= 0:
+                del self._threads[thread_id]
+
+    def tracked(self, func):
+        """Wrap threadpool work so the worker thread is sampled while it runs it"""
+        def run(*args, **kwargs):
+            self.register_thread()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.unregister_thread()
+        return run
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._threads_lock:
+                thread_ids = list(self._threads)
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None or os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+
+_run_sync = anyio.to_thread.run_sync
+
+
+async def _run_sync_registered(func, *args, **kwargs):
+    """anyio.to_thread.run_sync that registers the worker with the profiled request, if any"""
+    sampler = _profiled_request.get()
+    if sampler is not None:
+        func = sampler.tracked(func)
+    return await _run_sync(func, *args, **kwargs)
+
+
+def install_thread_registry():
+    """Route threadpool calls (Starlette/FastAPI sync endpoints and dependencies) through the registry"""
+    anyio.to_thread.run_sync = _run_sync_registered
+
+
+class ProfileGate:
+    """Allows one profile at a time and at most one per interval"""
+
+    def __init__(self, min_interval: float = PROFILE_MIN_INTERVAL_SECONDS):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._active = False
+        self._last_started = 0.0
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._active or now - self._last_started < self.min_interval:
+                return False
+            self._active = True
+            self._last_started = now
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active = False
+
+    def reset(self):
+        with self._lock:
+            self._active = False
+            self._last_started = 0.0
+
+
+profile_gate = ProfileGate()
+
+
+def is_profile_requested(request: Request) -> bool:
+    """Check whether the client asked for this request to be profiled"""
+    return (
+        request.headers.get(PROFILE_HEADER) == "1"
+        or request.query_params.get(PROFILE_QUERY_FLAG) == "1"
+    )
+
+
+def is_admin_request(request: Request) -> bool:
+    """Check the bearer token carries the admin role"""
+    payload = decode_request_token(request)
+    return payload is not None and payload.get("role") == "admin"
+
+
+def write_profile(samples: Counter, request: Request, elapsed: float) -> str:
+    """Write collapsed stacks to the spool and prune the oldest profiles"""
+    os.makedirs(PROFILE_SPOOL_DIR, exist_ok=True)
+
+    route = request.url.path.strip("/").replace("/", "_") or "root"
+    profile_id = (
+        f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-"
+        f"{request.method.lower()}-{route}-{uuid.uuid4().hex[:8]}"
+    )
+    path = os.path.join(PROFILE_SPOOL_DIR, f"{profile_id}.collapsed")
+
+    with open(path, "w") as f:
+        f.write(f"# {request.method} {request.url.path} elapsed={elapsed:.6f}s\n")
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+
+    profiles = sorted(
+        (entry for entry in os.scandir(PROFILE_SPOOL_DIR) if entry.name.endswith(".collapsed")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:max(0, len(profiles) - PROFILE_SPOOL_MAX_FILES)]:
+        os.remove(entry.path)
+
+    return profile_id
+
+
+async def profile_request(request: Request, call_next):
+    """HTTP middleware that profiles a request when an admin asks for it"""
+    if not is_profile_requested(request) or not is_admin_request(request):
+        return await call_next(request)
+
+    if not profile_gate.try_acquire():
+        response = await call_next(request)
+        response.headers["X-Profile-Status"] = "rate-limited"
+        return response
+
+    try:
+        sampler = StackSampler()
+        # Set before call_next: the app task and its threadpool work copy this context
+        marker = _profiled_request.set(sampler)
+        sampler.register_thread()  # the event loop thread
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            samples = sampler.stop()
+            sampler.unregister_thread()
+            _profiled_request.reset(marker)
+        profile_id = write_profile(samples, request, time.perf_counter() - started)
+    finally:
+        profile_gate.release()
+
+    response.headers["X-Profile-Status"] = "recorded"
+    response.headers["X-Profile-Id"] = profile_id
+    return response
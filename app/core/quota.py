@@ -0,0 +1,154 @@
+"""
+Per-user storage quotas
+
+Every user row carries `storage_used_bytes` and `document_count`, updated in
+the same transaction as the upload or delete that changes them. Checking a
+quota is therefore a primary-key read, whatever the size of the library:
+
+- the HTTP middleware rejects an upload whose Content-Length cannot fit
+  before the multipart body is received
+- upload_document reserves the exact size with a conditional UPDATE, so
+  concurrent uploads cannot overshoot the quota together
+
+Counters of documents uploaded before accounting existed are rebuilt with:
+    python -m app.core.quota recount
+"""
+import argparse
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import STORAGE_QUOTA_BYTES, UPLOAD_FORM_OVERHEAD_BYTES
+from app.core.exceptions import QuotaExceeded
+from app.core.security import decode_request_token
+from app.database import SessionLocal
+from app.dependencies.auth import request_db
+from app.models.user import User
+from app.schemas.responses import ErrorResponse
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PATH = "/documents/upload"
+
+effective_quota = func.coalesce(User.storage_quota_bytes, STORAGE_QUOTA_BYTES)
+
+
+def quota_for(user: User) -> int:
+    return user.storage_quota_bytes if user.storage_quota_bytes is not None else STORAGE_QUOTA_BYTES
+
+
+def check_quota(user: User, incoming: int):
+    """Raise QuotaExceeded if `incoming` more bytes would not fit"""
+    quota = quota_for(user)
+    if (user.storage_used_bytes or 0) + incoming > quota:
+        raise QuotaExceeded(quota)
+
+
+def reserve_storage(db: Session, user: User, size: int):
+    """Add an upload to the user's counters, atomically refusing it past the quota (caller commits)"""
+    updated = db.query(User).filter(
+        User.id == user.id,
+        User.storage_used_bytes + size <= effective_quota
+    ).update({
+        User.storage_used_bytes: User.storage_used_bytes + size,
+        User.document_count: User.document_count + 1
+    }, synchronize_session=False)
+    if not updated:
+        raise QuotaExceeded(quota_for(user))
+
+
+def release_storage(db: Session, user_id: int, size: Optional[int]):
+    """Remove a deleted document from its owner's counters (caller commits)"""
+    db.query(User).filter(User.id == user_id).update({
+        User.storage_used_bytes: func.max(User.storage_used_bytes - (size or 0), 0),
+        User.document_count: func.max(User.document_count - 1, 0)
+    }, synchronize_session=False)
+
+
+def quota_exceeded_response(quota: int) -> JSONResponse:
+    error = QuotaExceeded(quota)
+    return JSONResponse(
+        status_code=error.status_code,
+        content=ErrorResponse(
+            success=False,
+            error_code=error.error_code,
+            message=error.detail,
+            timestamp=datetime.utcnow().isoformat()
+        ).dict()
+    )
+
+
+def storage_usage(request: Request, user_id: int) -> Optional[tuple]:
+    """(used, quota) of a user, or None when unknown"""
+    with request_db(request) as db:
+        try:
+            row = db.query(User.storage_used_bytes, effective_quota).filter(User.id == user_id).first()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error reading storage usage of user {user_id}: {str(e)}")
+            return None
+    return None if row is None else tuple(row)
+
+
+async def storage_quota_precheck(request: Request, call_next):
+    """HTTP middleware refusing uploads whose Content-Length exceeds the remaining quota"""
+    if request.method != "POST" or request.url.path != UPLOAD_PATH:
+        return await call_next(request)
+    payload = decode_request_token(request)
+    try:
+        content_length = int(request.headers.get("Content-Length", ""))
+        user_id = int(payload["sub"]) if payload else None
+    except (KeyError, ValueError):
+        return await call_next(request)
+    if user_id is None:
+        return await call_next(request)
+
+    usage = await run_in_threadpool(storage_usage, request, user_id)
+    if usage is not None:
+        used, quota = usage
+        if used + content_length - UPLOAD_FORM_OVERHEAD_BYTES > quota:
+            return quota_exceeded_response(quota)
+    return await call_next(request)
+
+
+def recount(db: Session) -> int:
+    """Fill missing document sizes from disk and rebuild every user's counters"""
+    from app.models.document import Document
+
+    for doc_id, path in db.query(Document.id, Document.file_path).filter(Document.size_bytes.is_(None)).all():
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        db.query(Document).filter(Document.id == doc_id).update({Document.size_bytes: size}, synchronize_session=False)
+
+    db.query(User).update({User.storage_used_bytes: 0, User.document_count: 0}, synchronize_session=False)
+    totals = db.query(
+        Document.uploaded_by, func.coalesce(func.sum(Document.size_bytes), 0), func.count(Document.id)
+    ).group_by(Document.uploaded_by).all()
+    for user_id, used, count in totals:
+        db.query(User).filter(User.id == user_id).update(
+            {User.storage_used_bytes: used, User.document_count: count}, synchronize_session=False
+        )
+    db.commit()
+    return len(totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain per-user storage counters")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("recount", help="Rebuild usage counters from the documents table")
+    args = parser.parse_args()
+
+    from app.database import init_db
+    init_db()
+    session = SessionLocal()
+    try:
+        print(f"Recounted storage of {recount(session)} users")
+    finally:
+        session.close()
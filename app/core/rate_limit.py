@@ -0,0 +1,219 @@
+"""
+Admission control with token buckets
+
+Every request takes `cost` tokens from the bucket of its client IP and, when
+it carries a valid token, from the bucket of its user. Buckets refill at a
+steady rate up to a burst size; a request that finds too few tokens is
+answered 429 with Retry-After before reaching any route, so a noisy client
+cannot occupy workers, bcrypt or the database.
+
+Backends:
+- memory: a dict of (tokens, updated) tuples guarded by striped locks, per
+  process (each worker enforces its own share)
+- sqlite: one small WITHOUT ROWID table in RATE_LIMIT_SQLITE_PATH shared by all
+  workers on the host; idle buckets are deleted every RATE_LIMIT_PRUNE_SECONDS
+"""
+import logging
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_SQLITE_PATH,
+    RATE_LIMIT_IP_RATE,
+    RATE_LIMIT_IP_BURST,
+    RATE_LIMIT_USER_RATE,
+    RATE_LIMIT_USER_BURST,
+    RATE_LIMIT_ROUTE_COSTS,
+    RATE_LIMIT_EXEMPT_PATHS,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_PRUNE_SECONDS
+)
+from app.core.security import decode_request_token
+from app.schemas.responses import ErrorResponse
+
+logger = logging.getLogger(__name__)
+
+IDLE_SECONDS = 300  # a bucket untouched this long is full again and can be dropped
+
+
+def refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + max(now - updated, 0) * rate)
+
+
+class MemoryBucketStore:
+    """Per-process buckets; lock striping keeps unrelated clients from contending"""
+    blocking = False
+
+    def __init__(self, stripes: int = 64, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._prune_lock = threading.Lock()
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float]:
+        """Take `cost` tokens; returns (allowed, seconds until they would be available)"""
+        now = time.monotonic()
+        cost = min(cost, burst)
+        with self._locks[hash(key) % len(self._locks)]:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = refill(tokens, updated, now, rate, burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def _prune(self, now: float):
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            for key, (_, updated) in list(self._buckets.items()):
+                if now - updated > IDLE_SECONDS:
+                    self._buckets.pop(key, None)
+        finally:
+            self._prune_lock.release()
+
+    def reset(self):
+        self._buckets.clear()
+
+
+class SqliteBucketStore:
+    """Buckets shared by every worker process through a local SQLite file"""
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH, prune_interval: float = RATE_LIMIT_PRUNE_SECONDS):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._last_prune = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float]:
+        now = time.time()  # wall clock: shared between processes
+        cost = min(cost, burst)
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = refill(*row, now, rate, burst) if row else burst
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                conn.execute(
+                    "INSERT INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (key, tokens, now)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            # Never turn a limiter outage into an API outage
+            logger.error(f"Rate limit store unavailable, admitting request: {str(e)}")
+            return True, 0.0
+
+        if now - self._last_prune >= self.prune_interval:
+            self._last_prune = now
+            try:
+                self.prune()
+            except sqlite3.Error as e:
+                logger.error(f"Error pruning rate limit buckets: {str(e)}")
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def prune(self):
+        """Delete buckets idle long enough to be full again"""
+        self._connection().execute("DELETE FROM rate_limit_buckets WHERE updated < ?", (time.time() - IDLE_SECONDS,))
+
+    def reset(self):
+        self._connection().execute("DELETE FROM rate_limit_buckets")
+        self._last_prune = 0.0
+
+
+def create_bucket_store(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "sqlite":
+        return SqliteBucketStore()
+    return MemoryBucketStore()
+
+
+bucket_store = create_bucket_store()
+
+
+def is_exempt(path: str) -> bool:
+    return any(path == exempt or path.startswith(exempt + "/") for exempt in RATE_LIMIT_EXEMPT_PATHS)
+
+
+def request_cost(request: Request) -> float:
+    path = request.url.path.rstrip("/") or "/"
+    return RATE_LIMIT_ROUTE_COSTS.get((request.method, path), 1)
+
+
+def too_many_requests(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        content=ErrorResponse(
+            success=False,
+            error_code="RATE_LIMITED",
+            message="Too many requests, retry later",
+            timestamp=datetime.utcnow().isoformat()
+        ).dict()
+    )
+
+
+def admit(request: Request, store=None) -> Tuple[bool, float]:
+    """Charge the request to its IP and user buckets"""
+    store = store or bucket_store
+    cost = request_cost(request)
+    ip = request.client.host if request.client else "unknown"
+    buckets = [(f"ip:{ip}", RATE_LIMIT_IP_RATE, RATE_LIMIT_IP_BURST)]
+    payload = decode_request_token(request)
+    if payload and payload.get("sub"):
+        buckets.append((f"user:{payload['sub']}", RATE_LIMIT_USER_RATE, RATE_LIMIT_USER_BURST))
+
+    for key, rate, burst in buckets:
+        allowed, retry_after = store.take(key, cost, rate, burst)
+        if not allowed:
+            return False, retry_after
+    return True, 0.0
+
+
+async def rate_limit_request(request: Request, call_next):
+    """HTTP middleware rejecting requests over their client's budget with 429"""
+    if not RATE_LIMIT_ENABLED or is_exempt(request.url.path):
+        return await call_next(request)
+
+    if bucket_store.blocking:
+        allowed, retry_after = await run_in_threadpool(admit, request)
+    else:
+        allowed, retry_after = admit(request)
+    if not allowed:
+        return too_many_requests(retry_after)
+    return await call_next(request)
@@ -0,0 +1,172 @@
+"""
+Refresh-token revocation list
+
+Refresh tokens carry a `jti` and a `fam` (family) claim. Every refresh
+consumes the presented jti and issues a new token of the same family, so a
+jti that is presented a second time means the token was copied: the whole
+family is revoked and the caller must log in again.
+
+Revoked keys ("jti:<id>", "family:<id>") are appended to the `revoked_tokens`
+table and mirrored in an in-memory Bloom filter. A lookup that misses the
+filter is answered without touching the database; only a (rare) hit is
+confirmed with an indexed query. Each worker pulls rows revoked elsewhere with
+a throttled range scan on the primary key, like the invalidation bus, so a
+family revoked on another worker is refused here within REVOCATION_SYNC_SECONDS.
+Reuse of a jti needs no sync: consuming it is a unique insert.
+
+The filter is built, and rebuilt from the unexpired rows once full, on a
+background thread; until the first build finishes lookups go to the table.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    REVOCATION_FILTER_CAPACITY,
+    REVOCATION_FILTER_ERROR_RATE,
+    REVOCATION_SYNC_SECONDS
+)
+from app.models.revoked_token import RevokedToken
+from app.utils.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+REASON_ROTATED = "rotated"
+REASON_REUSED = "reused"
+REASON_LOGOUT = "logout"
+
+
+def jti_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+def family_key(family: str) -> str:
+    return f"family:{family}"
+
+
+class RevocationList:
+    """Bloom-filtered view of the revoked_tokens table"""
+
+    def __init__(
+        self,
+        capacity: int = REVOCATION_FILTER_CAPACITY,
+        error_rate: float = REVOCATION_FILTER_ERROR_RATE,
+        sync_interval: float = REVOCATION_SYNC_SECONDS
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._last_seen_id = None
+        self._last_sync = 0.0
+        self._rebuilding = False
+        self._generation = 0
+
+    def revoked(self, db: Session, keys: Iterable[str]) -> set:
+        """Return which of `keys` are revoked; no query unless the filter reports a hit"""
+        self.sync(db)
+        if self._last_seen_id is None:
+            candidates = list(keys)
+        else:
+            candidates = [key for key in keys if key in self._filter]
+        if not candidates:
+            return set()
+        return {key for (key,) in db.query(RevokedToken.key).filter(RevokedToken.key.in_(candidates))}
+
+    def revoke(self, db: Session, key: str, user_id: Optional[int], reason: str, expires_at: datetime) -> bool:
+        """Append a revocation and commit it; False if `key` was already revoked"""
+        db.add(RevokedToken(key=key, user_id=user_id, reason=reason, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        self._filter.add(key)
+        return True
+
+    def sync(self, db: Session, force: bool = False):
+        """Add rows revoked by other workers since the last sync"""
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already syncing
+        try:
+            self._last_sync = now
+            if self._last_seen_id is None or self._filter.is_full:
+                self._start_rebuild(db)
+            if self._last_seen_id is None:
+                return
+            rows = db.query(RevokedToken.id, RevokedToken.key).filter(
+                RevokedToken.id > self._last_seen_id
+            ).order_by(RevokedToken.id).all()
+            for row_id, key in rows:
+                self._filter.add(key)
+                self._last_seen_id = row_id
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error syncing revoked tokens: {str(e)}")
+        finally:
+            self._lock.release()
+
+    def _start_rebuild(self, db: Session):
+        """Rebuild the filter on a background thread with its own session (caller holds the lock)"""
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+        bind = db.get_bind()
+
+        def run():
+            session = Session(bind=bind)
+            try:
+                self.rebuild(session)
+            except SQLAlchemyError as e:
+                session.rollback()
+                logger.error(f"Error rebuilding revocation filter: {str(e)}")
+            finally:
+                session.close()
+                self._rebuilding = False
+
+        threading.Thread(target=run, name="revocation-rebuild", daemon=True).start()
+
+    def rebuild(self, db: Session):
+        """Drop expired revocations and rebuild the filter from the remaining rows
+
+        The newest row is always kept: SQLite hands out max(id) + 1, and ids
+        must stay monotonic for other workers' range scans.
+        """
+        generation = self._generation
+        last_seen_id = db.query(func.max(RevokedToken.id)).scalar() or 0
+        db.query(RevokedToken).filter(
+            RevokedToken.id < last_seen_id,
+            RevokedToken.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        live = db.query(func.count(RevokedToken.id)).scalar()
+        rebuilt = BloomFilter(max(self.capacity, live * 2), self.error_rate)
+        for (key,) in db.query(RevokedToken.key).filter(RevokedToken.id <= last_seen_id).yield_per(10_000):
+            rebuilt.add(key)
+        # Rows after last_seen_id, even if already added to the old filter, come with the next sync
+        with self._lock:
+            if generation != self._generation:
+                return  # reset while rebuilding
+            self._filter = rebuilt
+            self._last_seen_id = last_seen_id
+
+    def reset(self):
+        """Forget the filter (it is rebuilt from the table on next use)"""
+        self._generation += 1
+        self._filter = BloomFilter(self.capacity, self.error_rate)
+        self._last_seen_id = None
+        self._last_sync = 0.0
+
+
+revocation_list = RevocationList()
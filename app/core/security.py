@@ -1,15 +1,26 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
 from datetime import datetime, timedelta
+from functools import lru_cache
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.core.config import SECRET_KEY, ALGORITHM
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """Build the passlib context on first use (passlib/bcrypt are slow to import)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return get_pwd_context().verify(plain, hashed)
 
 def create_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
@@ -25,3 +36,82 @@ def create_access_token_with_role(user_id: int, role: str, expires_delta: timede
     to_encode = data.copy()
     to_encode.update({"exp": datetime.utcnow() + expires_delta})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_refresh_token(user_id: int, expires_delta: timedelta, family: str = None) -> str:
+    """Create a single-use refresh token; rotations keep the family of the first one"""
+    return create_token({
+        "sub": str(user_id),
+        "type": "refresh",
+        "jti": uuid.uuid4().hex,
+        "fam": family or uuid.uuid4().hex
+    }, expires_delta)
+
+def decode_refresh_token(token: str):
+    """Return the verified payload of a refresh token, or None"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "refresh" or not all(payload.get(claim) for claim in ("sub", "jti", "fam")):
+        return None
+    return payload
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(data: dict) -> str:
+    payload = _b64encode(json.dumps(data, separators=(",", ":")).encode())
+    signature = _b64encode(hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest())
+    return f"{payload}.{signature}"
+
+def _verify(token: str, token_type: str):
+    """Return the payload of a signed token of `token_type` if valid and unexpired, otherwise None"""
+    payload, _, signature = token.partition(".")
+    expected = _b64encode(hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest())
+    if not signature or not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        data = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("t") != token_type or data.get("e", 0) < time.time():
+        return None
+    return data
+
+def create_download_token(document_id: int, file_path: str, filename: str, expires_in: int) -> tuple:
+    """Create an HMAC-signed download token carrying everything needed to serve the file
+
+    Returns (token, expires_at unix timestamp)
+    """
+    expires_at = int(time.time()) + expires_in
+    return _sign({"t": "download", "d": document_id, "p": file_path, "n": filename, "e": expires_at}), expires_at
+
+def verify_download_token(token: str):
+    """Return the token payload if the signature is valid and unexpired, otherwise None"""
+    return _verify(token, "download")
+
+def create_events_token(user_id: int, is_admin: bool, expires_in: int) -> tuple:
+    """Create an HMAC-signed token opening the change feed, for clients that cannot send headers (EventSource)
+
+    Returns (token, expires_at unix timestamp)
+    """
+    expires_at = int(time.time()) + expires_in
+    return _sign({"t": "events", "u": user_id, "a": is_admin, "e": expires_at}), expires_at
+
+def verify_events_token(token: str):
+    """Return the token payload if the signature is valid and unexpired, otherwise None"""
+    return _verify(token, "events")
+
+def decode_request_token(request):
+    """Return the verified payload of the request's bearer token, or None"""
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
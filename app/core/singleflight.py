@@ -0,0 +1,78 @@
+"""
+Single-flight coalescing of identical concurrent computations
+
+Concurrent callers with the same key share one in-flight call: the first
+caller (the leader) runs it, the others wait and receive its result or its
+exception. Nothing is cached; once the call finishes the next caller starts
+a new one. Results are shared between callers and must be treated as
+read-only.
+
+Waiters are capped per key and wait at most `timeout` seconds; past either
+limit a caller runs the computation itself rather than failing.
+"""
+import threading
+from typing import Any, Callable, Hashable
+
+from app.core.config import SINGLE_FLIGHT_MAX_WAITERS, SINGLE_FLIGHT_TIMEOUT_SECONDS
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, max_waiters: int = SINGLE_FLIGHT_MAX_WAITERS, timeout: float = SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.max_waiters = max_waiters
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], retry_on: tuple = ()) -> Any:
+        """Run fn, or wait for the identical call in flight
+
+        Waiters run fn themselves when the leader fails with one of `retry_on`
+        (errors specific to the leader's own request).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            elif call.waiters >= self.max_waiters:
+                call = None
+                leader = False
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if call is None:
+            return fn()
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(self.timeout):
+            return fn()
+        if isinstance(call.error, retry_on):
+            return fn()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+single_flight = SingleFlight()
@@ -1,9 +1,27 @@
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./dms.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dms.db")
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 Base = declarative_base()
+
+
+def init_db(bind=None):
+    """Create all tables; run explicitly with `python -m app.database`"""
+    # Import models (and the content index DDL) so they are registered on Base.metadata
+    from app.models import (  # noqa: F401
+        cache_invalidation, document, document_event, document_lsh_bucket, document_signature,
+        document_status_history, document_tombstone, revoked_token, user
+    )
+    from app.services import content_index  # noqa: F401
+
+    Base.metadata.create_all(bind=bind or engine)
+
+
+if __name__ == "__main__":
+    init_db()
+    print(f"Schema created for {DATABASE_URL}")
@@ -1,12 +1,15 @@
-from fastapi import Depends, HTTPException
+from contextlib import contextmanager
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBearer
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models.user import User
 from app.core.config import SECRET_KEY, ALGORITHM
+from app.core.invalidation import invalidation_bus
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # =========================
 # Database Dependency
@@ -14,11 +17,24 @@ security = HTTPBearer()
 def get_db():
     db = SessionLocal()
     try:
+        # Pick up cache invalidations published by other workers
+        invalidation_bus.poll(db)
         yield db
     finally:
         db.close()
 
 
+@contextmanager
+def request_db(request: Request):
+    """get_db for code outside route dependencies (middleware), honoring app overrides"""
+    provider = request.app.dependency_overrides.get(get_db, get_db)
+    sessions = provider()
+    try:
+        yield next(sessions)
+    finally:
+        sessions.close()
+
+
 # =========================
 # Get Current User (JWT)
 # =========================
@@ -33,7 +49,8 @@ def get_current_user(
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
 
-        if not user_id:
+        # Refresh tokens only work at /auth/refresh
+        if not user_id or payload.get("type") == "refresh":
             raise HTTPException(status_code=401, detail="Invalid token")
 
         user = db.query(User).filter(User.id == int(user_id)).first()
@@ -49,6 +66,19 @@ def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid token format")
 
 
+# =========================
+# Optional Current User
+# =========================
+def get_optional_user(
+    credentials = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """Return the current user when a token is sent, otherwise None"""
+    if credentials is None:
+        return None
+    return get_current_user(credentials, db)
+
+
 # =========================
 # Admin Only Dependency
 # =========================
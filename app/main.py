@@ -1,14 +1,37 @@
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import HTTPBearer
 from datetime import datetime
-from app.database import Base, engine
-from app.routes import auth, documents, users
+from app.database import init_db
+from app.routes import auth, documents, downloads, users
+from app.core.config import CREATE_SCHEMA_ON_STARTUP, OPENAPI_PREBUILT_PATH
 from app.core.exceptions import DocumentAPIException
+from app.core.profiling import install_thread_registry, profile_request
+from app.core.rate_limit import rate_limit_request
+from app.core.idempotency import idempotent_request
+from app.core.quota import storage_quota_precheck
+from app.core.cache import cache_stats
+from app.core import metrics
 from app.schemas.responses import ErrorResponse
+from app.services.workers import shutdown_process_pool
+
+
+# ==================================================
+# Startup / Shutdown
+# ==================================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the schema at startup (not at import) unless migrations own it"""
+    if CREATE_SCHEMA_ON_STARTUP:
+        init_db()
+    yield
+    shutdown_process_pool()
 
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Document Management API",
@@ -16,7 +39,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan
 )
 
 # ==================================================
@@ -51,12 +75,26 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
 
 
+# ==================================================
+# Middleware
+# ==================================================
+install_thread_registry()
+app.middleware("http")(profile_request)
+# Over-quota uploads are refused from their Content-Length, before the body is read
+app.middleware("http")(storage_quota_precheck)
+# Replays of an Idempotency-Key are answered before the body is read
+app.middleware("http")(idempotent_request)
+# Registered last so it runs first: rejected requests never reach the profiler
+app.middleware("http")(rate_limit_request)
+
+
 # ==================================================
 # Routes
 # ==================================================
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(documents.router)
+app.include_router(downloads.router)
 
 
 # ==================================================
@@ -71,6 +109,18 @@ def health_check():
     }
 
 
+@app.get("/health/cache", tags=["Health"])
+def cache_health():
+    """Hit/miss counters of the in-process caches of this worker"""
+    return cache_stats()
+
+
+@app.get("/health/metrics", tags=["Health"])
+def metrics_health():
+    """Counters of this worker (e.g. cancelled queries) and its caches"""
+    return {"counters": metrics.counters(), "caches": cache_stats()}
+
+
 # ==================================================
 # Root Endpoint
 # ==================================================
@@ -87,10 +137,8 @@ def root():
 # ==================================================
 # Swagger Documentation Customization
 # ==================================================
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-    
+def build_openapi():
+    """Build the OpenAPI document from the registered routes"""
     openapi_schema = get_openapi(
         title="Document Management API",
         version="1.0.0",
@@ -113,16 +161,39 @@ def custom_openapi():
         for operation in path.values():
             if isinstance(operation, dict) and operation.get("tags"):
                 # Apply security to protected endpoints
-                if operation.get("tags")[0] not in ["Auth", "Home", "Health"]:
+                if operation.get("tags")[0] not in ["Auth", "Home", "Health", "Downloads"]:
                     operation["security"] = [{"HTTPBearer": []}]
     
     openapi_schema["info"]["x-logo"] = {
         "url": "https://fastapi.tiangolo.com/img/logo-margin/logo-teal.png"
     }
     
-    app.openapi_schema = openapi_schema
+    return openapi_schema
+
+
+def custom_openapi():
+    if app.openapi_schema:
+        return app.openapi_schema
+
+    # Load the prebuilt document when available instead of walking every route
+    if OPENAPI_PREBUILT_PATH and os.path.exists(OPENAPI_PREBUILT_PATH):
+        with open(OPENAPI_PREBUILT_PATH) as f:
+            app.openapi_schema = json.load(f)
+    else:
+        app.openapi_schema = build_openapi()
     return app.openapi_schema
 
 
 app.openapi = custom_openapi
 
+
+if __name__ == "__main__":
+    # Prebuild the OpenAPI document: python -m app.main --dump-openapi openapi.json
+    if len(sys.argv) == 3 and sys.argv[1] == "--dump-openapi":
+        with open(sys.argv[2], "w") as f:
+            json.dump(build_openapi(), f)
+        print(f"OpenAPI document written to {sys.argv[2]}")
+    else:
+        print("Usage: python -m app.main --dump-openapi <path>")
+        sys.exit(1)
+
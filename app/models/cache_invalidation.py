@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.database import Base
+
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+
+    id = Column(Integer, primary_key=True)  # monotonically increasing change sequence
+    topic = Column(String, nullable=False)  # user / document / ...
+    key = Column(String, nullable=True)  # entity id, or NULL to invalidate the whole topic
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheInvalidation(id={self.id}, topic={self.topic}, key={self.key})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -9,6 +9,8 @@ class Document(Base):
     id = Column(Integer, primary_key=True)
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
+    content_hash = Column(String, nullable=True)  # sha256 of the file content
+    size_bytes = Column(Integer, nullable=True)
     status = Column(String, default="pending")  # pending / approved / rejected
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     approved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -16,6 +18,18 @@ class Document(Base):
     approval_comment = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped by every status change
+    claimed_by = Column(Integer, ForeignKey("users.id"), nullable=True)  # reviewer holding the lease
+    lease_expires_at = Column(DateTime, nullable=True)
+    # cache_invalidations id published by the last change: commit-ordered delta sync position
+    change_id = Column(Integer, nullable=False, default=0, server_default="0")
 
     owner = relationship("User", foreign_keys=[uploaded_by])
     approver = relationship("User", foreign_keys=[approved_by])
+
+    __table_args__ = (
+        # Delta sync of /documents/my scans one owner's rows in change_id order
+        Index("ix_documents_uploaded_by_change_id", "uploaded_by", "change_id"),
+        # The review queue takes the oldest pending documents without a live lease
+        Index("ix_documents_review_queue", "status", "lease_expires_at", "created_at"),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.database import Base
+
+class DocumentEvent(Base):
+    """Append-only change feed entry; its id is the SSE event id shared by every worker"""
+    __tablename__ = "document_events"
+
+    id = Column(Integer, primary_key=True)  # monotonic (taken in the write transaction), the Last-Event-ID
+    type = Column(String, nullable=False)  # document.uploaded / document.status
+    owner_id = Column(Integer, nullable=False)
+    data = Column(Text, nullable=False)  # JSON payload
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<DocumentEvent(id={self.id}, type={self.type})>"
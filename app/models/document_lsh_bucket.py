@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.database import Base
+
+class DocumentLshBucket(Base):
+    __tablename__ = "document_lsh_buckets"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    bucket = Column(String, nullable=False, index=True)  # "<kind>:<band>:<band hash>" (dHash: "dhash:w<width>:<band>:<value>")
+
+    def __repr__(self):
+        return f"<DocumentLshBucket(document_id={self.document_id}, bucket={self.bucket})>"
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.database import Base
+
+class DocumentSignature(Base):
+    __tablename__ = "document_signatures"
+
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+    kind = Column(String, nullable=False)  # minhash (PDF text) / dhash (images)
+    signature = Column(String, nullable=False)  # comma separated integers
+
+    def __repr__(self):
+        return f"<DocumentSignature(document_id={self.document_id}, kind={self.kind})>"
@@ -6,7 +6,7 @@ class DocumentStatusHistory(Base):
     __tablename__ = "document_status_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
     status = Column(String, nullable=False)  # pending/approved/rejected
     changed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     comment = Column(String, nullable=True)
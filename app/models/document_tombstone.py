@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+class DocumentTombstone(Base):
+    """Records a deleted document so delta sync clients can drop it"""
+    __tablename__ = "document_tombstones"
+
+    id = Column(Integer, primary_key=True)  # monotonic, used as the sync position
+    document_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_document_tombstones_owner_id_id", "owner_id", "id"),
+    )
+
+    def __repr__(self):
+        return f"<DocumentTombstone(document_id={self.document_id}, owner_id={self.owner_id})>"
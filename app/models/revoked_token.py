@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.database import Base
+
+class RevokedToken(Base):
+    """Append-only record of a revoked refresh token (jti) or token family"""
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)  # monotonic, used as the sync position
+    key = Column(String, unique=True, nullable=False)  # "jti:<id>" or "family:<id>"
+    user_id = Column(Integer, nullable=True)
+    reason = Column(String, nullable=False)  # rotated / reused / logout
+    expires_at = Column(DateTime, nullable=False, index=True)  # no token it covers is valid after this
+    revoked_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<RevokedToken(key={self.key}, reason={self.reason})>"
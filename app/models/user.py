@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import BigInteger, Column, Integer, String
 from app.database import Base
 
 class User(Base):
@@ -8,3 +8,7 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(String, default="user")  # user / admin
+    # Usage counters maintained on upload/delete, so quota checks never sum documents
+    storage_used_bytes = Column(BigInteger, nullable=False, default=0, server_default="0", index=True)
+    document_count = Column(Integer, nullable=False, default=0, server_default="0")
+    storage_quota_bytes = Column(BigInteger, nullable=True)  # None = STORAGE_QUOTA_BYTES
@@ -1,32 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from datetime import timedelta
-from jose import JWTError, jwt
+from datetime import datetime, timedelta
 
-from app.schemas.auth import Register, Login, TokenResponse
+from app.schemas.auth import Register, Login, TokenResponse, RefreshRequest
 from app.schemas.user import UserResponse
 from app.models.user import User
-from app.database import SessionLocal
-from app.core.security import hash_password, verify_password, create_token, create_access_token_with_role
+from app.dependencies.auth import get_db
+from app.core.security import (
+    hash_password,
+    verify_password,
+    create_access_token_with_role,
+    create_refresh_token,
+    decode_refresh_token
+)
+from app.core.revocation import (
+    revocation_list,
+    family_key,
+    jti_key,
+    REASON_LOGOUT,
+    REASON_REUSED,
+    REASON_ROTATED
+)
 from app.core.config import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
-    REFRESH_TOKEN_EXPIRE_DAYS,
-    SECRET_KEY,
-    ALGORITHM
+    REFRESH_TOKEN_EXPIRE_DAYS
 )
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
-# ✅ Proper DB Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # =========================
 # ✅ REGISTER
 # =========================
@@ -78,10 +80,7 @@ def login(data: Login, db: Session = Depends(get_db)):
         timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
-    refresh_token = create_token(
-        {"sub": str(user.id)},
-        timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    )
+    refresh_token = create_refresh_token(user.id, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
 
     return {
         "access_token": access_token,
@@ -89,26 +88,49 @@ def login(data: Login, db: Session = Depends(get_db)):
     }
 
 
+def revoke_family(db: Session, payload: dict, reason: str):
+    """Revoke every refresh token descended from the same login"""
+    revocation_list.revoke(
+        db,
+        family_key(payload["fam"]),
+        int(payload["sub"]),
+        reason,
+        datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+
 # =========================
 # ✅ REFRESH TOKEN
 # =========================
 @router.post("/refresh", response_model=TokenResponse)
-def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
-
-    try:
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid refresh token")
-
-    except JWTError:
+def refresh_token(data: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access and refresh token
+
+    Each refresh token works once. Presenting a used one again revokes its
+    whole family, so both the thief and the victim have to log in again.
+    """
+    payload = decode_refresh_token(data.refresh_token)
+    if not payload:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    token_key = jti_key(payload["jti"])
+    revoked = revocation_list.revoked(db, [token_key, family_key(payload["fam"])])
+    if token_key in revoked:
+        revoke_family(db, payload, REASON_REUSED)
+        raise HTTPException(status_code=401, detail="Refresh token reuse detected")
+    if revoked:
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+
+    user = db.query(User).filter(User.id == int(payload["sub"])).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
+    # Consuming the jti is the atomic step: of two concurrent refreshes only one inserts it
+    if not revocation_list.revoke(db, token_key, user.id, REASON_ROTATED, datetime.utcfromtimestamp(payload["exp"])):
+        revoke_family(db, payload, REASON_REUSED)
+        raise HTTPException(status_code=401, detail="Refresh token reuse detected")
+
     # Create token with role information
     new_access_token = create_access_token_with_role(
         user.id,
@@ -116,12 +138,25 @@ def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
         timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
-    new_refresh_token = create_token(
-        {"sub": str(user.id)},
-        timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    new_refresh_token = create_refresh_token(
+        user.id,
+        timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        family=payload["fam"]
     )
 
     return {
         "access_token": new_access_token,
         "refresh_token": new_refresh_token
     }
+
+
+# =========================
+# ✅ LOGOUT
+# =========================
+@router.post("/logout", status_code=204)
+def logout(data: RefreshRequest, db: Session = Depends(get_db)):
+    """Revoke the refresh token and every token rotated from the same login"""
+    payload = decode_refresh_token(data.refresh_token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    revoke_family(db, payload, REASON_LOGOUT)
@@ -0,0 +1,45 @@
+import mimetypes
+import os
+import time
+from urllib.parse import quote
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, Response
+from app.core.config import UPLOAD_FOLDER, DOWNLOAD_OFFLOAD_HEADER, DOWNLOAD_ACCEL_REDIRECT_PREFIX
+from app.core.security import verify_download_token
+
+router = APIRouter(prefix="/files", tags=["Downloads"])
+
+
+# ==================================================
+# 🔗 Signed Download (no auth, no database)
+# ==================================================
+@router.get("/{token}")
+def download_file(token: str):
+    """Serve a file from a pre-signed URL minted by POST /documents/{doc_id}/download-url"""
+    payload = verify_download_token(token)
+    if payload is None:
+        raise HTTPException(status_code=403, detail="Invalid or expired download link")
+
+    file_path = payload["p"]
+    filename = payload["n"]
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    # The URL itself expires, so caches must not outlive it
+    max_age = max(int(payload["e"] - time.time()), 0)
+    headers = {
+        "Cache-Control": f"private, max-age={max_age}",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"
+    }
+
+    if DOWNLOAD_OFFLOAD_HEADER:
+        # Let the front proxy send the bytes
+        if DOWNLOAD_OFFLOAD_HEADER.lower() == "x-accel-redirect":
+            relative = os.path.relpath(file_path, UPLOAD_FOLDER).replace(os.sep, "/")
+            headers[DOWNLOAD_OFFLOAD_HEADER] = DOWNLOAD_ACCEL_REDIRECT_PREFIX + quote(relative)
+        else:
+            headers[DOWNLOAD_OFFLOAD_HEADER] = os.path.abspath(file_path)
+        return Response(media_type=media_type, headers=headers)
+
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return FileResponse(file_path, media_type=media_type, headers=headers)
@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import logging
+from itertools import chain
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from sqlalchemy.orm import Session
 
-from app.dependencies.auth import get_db, admin_only, get_current_user
+from app.dependencies.auth import get_db, admin_only, get_current_user, request_db
 from app.models.user import User
-from app.schemas.user import UserResponse, UserUpdate
+from app.schemas.user import UserImportChunk, UserImportSummary, UserResponse, UserStorageUsage, UserUpdate
 from app.core.security import hash_password
+from app.core.invalidation import invalidation_bus, TOPIC_USER
+from app.core.quota import effective_quota
+from app.utils.fields import USER_FIELDS, columns, parse_fields, project, sparse_response
+from app.services.user_import import detect_format, import_users, read_rows
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -13,8 +24,13 @@ router = APIRouter(prefix="/users", tags=["Users"])
 # Get Current User Profile
 # =========================
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,role"),
+    current_user: User = Depends(get_current_user)
+):
     """Get current authenticated user profile"""
+    if fields:
+        return sparse_response(project(current_user, parse_fields(fields, USER_FIELDS)))
     return current_user
 
 
@@ -23,24 +39,102 @@ def get_me(current_user: User = Depends(get_current_user)):
 # =========================
 @router.get("/", response_model=list[UserResponse])
 def list_users(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,role"),
     admin: User = Depends(admin_only),
     db: Session = Depends(get_db)
 ):
     """Get all users (Admin only)"""
+    if fields:
+        names = parse_fields(fields, USER_FIELDS)
+        rows = db.query(*columns(names, USER_FIELDS)).all()
+        return sparse_response([project(row, names) for row in rows])
+
     users = db.query(User).all()
     return users
 
 
+# =========================
+# Admin: Bulk Import Users
+# =========================
+@router.post("/import")
+def import_users_file(
+    request: Request,
+    file: UploadFile = File(..., description="CSV with email,password[,role] header or NDJSON"),
+    admin: User = Depends(admin_only)
+):
+    """
+    Create many users from a CSV or NDJSON file (Admin only)
+
+    Existing emails are reported as duplicates, never updated. Rows are committed
+    in chunks and the response streams NDJSON: one `chunk` line with the results
+    of each committed chunk, then a `summary` line with the totals. If a chunk
+    fails, an `error` line ends the stream; the chunks before it stay committed.
+    """
+    fmt = detect_format(file.filename, file.content_type)
+    rows = read_rows(file.file, fmt)
+    # Read the first row now, so a bad header is a 400 rather than a broken stream
+    first = next(rows, None)
+    rows = chain([first], rows) if first is not None else iter(())
+
+    def lines():
+        with request_db(request) as db:
+            try:
+                for line in import_users(db, rows):
+                    model = UserImportChunk if line["type"] == "chunk" else UserImportSummary
+                    yield model(**line).model_dump_json() + "\n"
+            except Exception as e:
+                db.rollback()
+                logger.error(f"User import failed: {str(e)}")
+                yield json.dumps({"type": "error", "message": "Import failed; earlier chunks were committed"}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# =========================
+# Admin: Storage Usage Report
+# =========================
+@router.get("/storage", response_model=list[UserStorageUsage])
+def storage_usage_report(
+    limit: int = Query(50, ge=1, le=1000),
+    skip: int = Query(0, ge=0),
+    admin: User = Depends(admin_only),
+    db: Session = Depends(get_db)
+):
+    """Users by storage used, largest first (Admin only); read from the usage counters"""
+    rows = db.query(
+        User.id, User.email, User.document_count, User.storage_used_bytes, effective_quota.label("quota")
+    ).order_by(User.storage_used_bytes.desc(), User.id).offset(skip).limit(limit).all()
+    return [
+        {
+            "id": row.id,
+            "email": row.email,
+            "document_count": row.document_count,
+            "storage_used_bytes": row.storage_used_bytes,
+            "storage_quota_bytes": row.quota,
+            "usage_ratio": round(row.storage_used_bytes / row.quota, 4) if row.quota else 1.0
+        }
+        for row in rows
+    ]
+
+
 # =========================
 # Admin: Get User by ID
 # =========================
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,role"),
     admin: User = Depends(admin_only),
     db: Session = Depends(get_db)
 ):
     """Get specific user by ID (Admin only)"""
+    if fields:
+        names = parse_fields(fields, USER_FIELDS)
+        row = db.query(*columns(names, USER_FIELDS)).filter(User.id == user_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="User not found")
+        return sparse_response(project(row, names))
+
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -77,6 +171,10 @@ def update_user(
     if data.password:
         user.hashed_password = hash_password(data.password)
 
+    if data.storage_quota_bytes is not None:
+        user.storage_quota_bytes = data.storage_quota_bytes
+
+    invalidation_bus.publish(db, TOPIC_USER, user.id)
     db.commit()
     db.refresh(user)
     return user
@@ -104,6 +202,7 @@ def delete_user(
         )
 
     db.delete(user)
+    invalidation_bus.publish(db, TOPIC_USER, user_id)
     db.commit()
 
 
@@ -130,6 +229,7 @@ def update_own_password(
         raise HTTPException(status_code=400, detail="Password is required")
 
     user.hashed_password = hash_password(data.password)
+    invalidation_bus.publish(db, TOPIC_USER, user.id)
     db.commit()
     db.refresh(user)
 
@@ -14,3 +14,7 @@ class Login(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     refresh_token: str
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
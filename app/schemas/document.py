@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 from datetime import datetime
+from app.core.config import BATCH_GET_MAX_IDS
 
 
 class DocumentBase(BaseModel):
@@ -20,15 +21,23 @@ class DocumentResponse(BaseModel):
     uploaded_by: int
     created_at: datetime
     updated_at: datetime
+    version: int = 1
 
     class Config:
         from_attributes = True
 
 
+class DuplicateCandidate(BaseModel):
+    """Likely near-duplicate of a document"""
+    document_id: int
+    similarity: float
+
+
 class DocumentDetailResponse(DocumentResponse):
     approved_by: Optional[int] = None
     approval_date: Optional[datetime] = None
     approval_comment: Optional[str] = None
+    possible_duplicates: List[DuplicateCandidate] = []
 
 
 class DocumentApprovalRequest(BaseModel):
@@ -47,6 +56,40 @@ class DocumentAdminView(BaseModel):
     approval_comment: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    version: int = 1
+    claimed_by: Optional[int] = None
+    lease_expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+
+class ReviewClaimResponse(BaseModel):
+    """Pending documents leased to the calling admin, oldest first"""
+    lease_expires_at: datetime
+    documents: List[DocumentAdminView]
+
+
+class DownloadUrlResponse(BaseModel):
+    """Short-lived pre-signed download URL"""
+    url: str
+    expires_at: datetime
+
+
+class EventsTokenResponse(BaseModel):
+    """Short-lived signed token for `GET /documents/events?token=`"""
+    token: str
+    expires_at: datetime
+
+
+class DocumentSyncResponse(BaseModel):
+    """Changes since a watermark; pass `watermark` back as `since` for the next call"""
+    documents: List[DocumentResponse]
+    deleted: List[int]
+    watermark: str
+    has_more: bool
+
+
+class DocumentBatchRequest(BaseModel):
+    """Ids to fetch in one request"""
+    ids: List[int] = Field(..., min_length=1, max_length=BATCH_GET_MAX_IDS)
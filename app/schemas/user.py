@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 
 
 class UserBase(BaseModel):
@@ -15,6 +15,7 @@ class UserCreate(BaseModel):
 class UserUpdate(BaseModel):
     role: Optional[str] = None
     password: Optional[str] = None
+    storage_quota_bytes: Optional[int] = Field(None, ge=0)
 
 
 class UserResponse(BaseModel):
@@ -28,3 +29,37 @@ class UserResponse(BaseModel):
 
 class UserDetailResponse(UserResponse):
     pass
+
+
+class UserImportResult(BaseModel):
+    """Outcome of one imported row: created, duplicate or invalid"""
+    row: int
+    email: Optional[str] = None
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class UserImportChunk(BaseModel):
+    """NDJSON line of an import, sent once a chunk of rows is committed"""
+    type: str = "chunk"
+    results: List[UserImportResult]
+
+
+class UserImportSummary(BaseModel):
+    """Last NDJSON line of an import"""
+    type: str = "summary"
+    created: int
+    duplicates: int
+    invalid: int
+    truncated: bool  # rows past the import limit were not read
+
+
+class UserStorageUsage(BaseModel):
+    """Storage used by one user against their quota"""
+    id: int
+    email: str
+    document_count: int
+    storage_used_bytes: int
+    storage_quota_bytes: int
+    usage_ratio: float
@@ -0,0 +1,84 @@
+"""
+Multi-process serving mode
+
+    python -m app.serve --workers 4 --port 8000
+
+Creates the schema once in the parent process, then runs preforked workers
+with the application preloaded (gunicorn + uvicorn workers). When gunicorn is
+not installed it falls back to uvicorn's own multi-worker supervisor, which
+imports the application in each worker instead of preloading it.
+
+Workers keep their own in-process caches; they stay consistent through the
+invalidation bus in app.core.invalidation.
+"""
+import argparse
+import multiprocessing
+import os
+
+
+def prepare_database():
+    """Create the schema once and switch SQLite to WAL so workers can read concurrently"""
+    from app.database import DATABASE_URL, engine, init_db
+
+    init_db()
+    if DATABASE_URL.startswith("sqlite"):
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    # Never share pooled connections across fork
+    engine.dispose()
+
+
+def post_fork(server, worker):
+    """Gunicorn hook: reset per-process state inherited from the preloaded parent"""
+    from app.database import engine
+    from app.core.invalidation import invalidation_bus
+
+    engine.dispose(close=False)
+    invalidation_bus.reset()
+
+
+def run_gunicorn(host: str, port: int, workers: int):
+    from gunicorn.app.base import BaseApplication
+
+    class PreforkApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    PreforkApplication().run()
+
+
+def run_uvicorn(host: str, port: int, workers: int):
+    import uvicorn
+
+    uvicorn.run("app.main:app", host=host, port=port, workers=workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args(argv)
+
+    # The parent creates the schema; workers must not race to create it
+    os.environ["CREATE_SCHEMA_ON_STARTUP"] = "0"
+    prepare_database()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        run_uvicorn(args.host, args.port, args.workers)
+    else:
+        run_gunicorn(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
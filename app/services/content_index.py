@@ -0,0 +1,240 @@
+"""
+Document content indexing and search
+
+Text is extracted from uploaded PDFs (pypdf when installed, otherwise a
+built-in parser for the text operators of uncompressed/Flate streams) and
+OCR-free metadata is extracted from images. It is stored in the SQLite FTS5
+table `document_content`, whose rowid is the document id. Search results are
+ranked with bm25.
+
+The index is maintained incrementally:
+- upload:  the text is extracted in a process-pool worker together with the
+           near-duplicate signature (app.services.similarity) and inserted,
+           unless the document was deleted in the meantime
+- delete:  the row is removed in the same transaction as the document
+- approve: nothing to do, visibility is filtered on documents.status
+
+Existing documents are indexed in parallel with:
+    python -m app.services.content_index backfill --workers 8
+"""
+import argparse
+import logging
+import re
+import struct
+import zlib
+
+from sqlalchemy import DDL, Float, Integer, column, event, select, table, text
+from sqlalchemy.orm import Session
+
+from app.database import Base, SessionLocal
+from app.core.config import CONTENT_INDEX_MAX_CHARS
+from app.core.exceptions import InvalidRequest
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TABLE = "document_content"
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(f"CREATE VIRTUAL TABLE IF NOT EXISTS {CONTENT_TABLE} USING fts5(body)").execute_if(dialect="sqlite")
+)
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {CONTENT_TABLE}").execute_if(dialect="sqlite")
+)
+
+
+# ==================================================
+# Extraction (runs inside pool workers)
+# ==================================================
+STREAM_RE = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+TEXT_BLOCK_RE = re.compile(rb"BT(.*?)ET", re.S)
+LITERAL_RE = re.compile(rb"\(((?:\\.|[^\\()])*)\)", re.S)
+PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"(": b"(", b")": b")", b"\\": b"\\"}
+
+
+def _unescape_pdf_literal(value: bytes) -> bytes:
+    return re.sub(rb"\\(.)", lambda m: PDF_ESCAPES.get(m.group(1), m.group(1)), value, flags=re.S)
+
+
+def _extract_pdf_text_fallback(data: bytes) -> str:
+    """Pull literal strings out of BT/ET text blocks of plain and Flate streams"""
+    parts = []
+    for match in STREAM_RE.finditer(data):
+        stream = match.group(1)
+        try:
+            stream = zlib.decompress(stream)
+        except zlib.error:
+            pass
+        for block in TEXT_BLOCK_RE.finditer(stream):
+            words = [_unescape_pdf_literal(m.group(1)) for m in LITERAL_RE.finditer(block.group(1))]
+            parts.append(b"".join(words).decode("latin-1"))
+    return " ".join(parts)
+
+
+def _extract_pdf_text(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        with open(path, "rb") as f:
+            return _extract_pdf_text_fallback(f.read())
+
+    reader = PdfReader(path)
+    parts = []
+    size = 0
+    for page in reader.pages:
+        page_text = page.extract_text() or ""
+        parts.append(page_text)
+        size += len(page_text)
+        if size >= CONTENT_INDEX_MAX_CHARS:
+            break
+    return " ".join(parts)
+
+
+def _image_dimensions(data: bytes):
+    if data.startswith(b"\x89PNG\r\n\x1a\n") and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data.startswith(b"\xff\xd8"):
+        offset = 2
+        while offset + 9 < len(data):
+            if data[offset] != 0xFF:
+                break
+            marker = data[offset + 1]
+            length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+            if marker in (0xC0, 0xC1, 0xC2, 0xC3):
+                height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    return None
+
+
+def _extract_image_metadata(path: str, content_type: str) -> str:
+    with open(path, "rb") as f:
+        header = f.read(64 * 1024)
+    kind = "png" if content_type == "image/png" else "jpeg"
+    words = ["image", kind]
+    dimensions = _image_dimensions(header)
+    if dimensions:
+        width, height = dimensions
+        orientation = "landscape" if width > height else "portrait" if height > width else "square"
+        words += [f"{width}x{height}", orientation]
+    return " ".join(words)
+
+
+def extract_text(path: str, content_type: str) -> str:
+    """Extract indexable text from a stored file"""
+    try:
+        if content_type == "application/pdf":
+            content = _extract_pdf_text(path)
+        elif content_type in ("image/png", "image/jpeg"):
+            content = _extract_image_metadata(path, content_type)
+        else:
+            content = ""
+    except Exception as e:
+        logger.error(f"Error extracting text from {path}: {str(e)}")
+        content = ""
+    return " ".join(content.split())[:CONTENT_INDEX_MAX_CHARS]
+
+
+# ==================================================
+# Index maintenance
+# ==================================================
+def upsert_content(db: Session, document_id: int, body: str) -> bool:
+    """Index a document's text; False (and nothing written) if the document no longer exists"""
+    db.execute(text(f"DELETE FROM {CONTENT_TABLE} WHERE rowid = :id"), {"id": document_id})
+    # Conditional insert: a delete committed meanwhile must not leave an orphan row
+    result = db.execute(
+        text(
+            f"INSERT INTO {CONTENT_TABLE} (rowid, body) "
+            f"SELECT :id, :body WHERE EXISTS (SELECT 1 FROM documents WHERE id = :id)"
+        ),
+        {"id": document_id, "body": body}
+    )
+    return result.rowcount == 1
+
+
+def remove_content(db: Session, document_id: int):
+    """Remove a document from the index (call inside the deleting transaction)"""
+    db.execute(text(f"DELETE FROM {CONTENT_TABLE} WHERE rowid = :id"), {"id": document_id})
+
+
+# ==================================================
+# Search
+# ==================================================
+def build_match_query(content: str) -> str:
+    """Turn free text into an FTS5 query matching all words (no operator injection)"""
+    words = re.findall(r"\w+", content)
+    if not words:
+        raise InvalidRequest("Content search must contain at least one word")
+    return " ".join(f'"{word}"' for word in words)
+
+
+def content_matches(content: str):
+    """Subquery of (document_id, rank) for documents matching `content`; lower rank is better"""
+    return text(
+        f"SELECT rowid AS document_id, bm25({CONTENT_TABLE}) AS rank "
+        f"FROM {CONTENT_TABLE} WHERE {CONTENT_TABLE} MATCH :match"
+    ).bindparams(match=build_match_query(content)).columns(
+        document_id=Integer, rank=Float
+    ).subquery()
+
+
+# ==================================================
+# Backfill
+# ==================================================
+def content_type_for(path: str) -> str:
+    lowered = path.lower()
+    if lowered.endswith(".pdf"):
+        return "application/pdf"
+    if lowered.endswith(".png"):
+        return "image/png"
+    if lowered.endswith((".jpg", ".jpeg")):
+        return "image/jpeg"
+    return ""
+
+
+def backfill(workers: int, batch_size: int = 500) -> int:
+    """Index every document missing from the index, extracting in parallel"""
+    from concurrent.futures import ProcessPoolExecutor
+    from app.models.document import Document
+
+    indexed = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                batch = db.query(Document.id, Document.file_path).filter(
+                    Document.id > last_id,
+                    ~Document.id.in_(select(column("rowid")).select_from(table(CONTENT_TABLE)))
+                ).order_by(Document.id).limit(batch_size).all()
+                if not batch:
+                    break
+
+                paths = [row.file_path for row in batch]
+                bodies = pool.map(extract_text, paths, [content_type_for(p) for p in paths], chunksize=16)
+                for row, body in zip(batch, bodies):
+                    upsert_content(db, row.id, body)
+                db.commit()
+
+                indexed += len(batch)
+                last_id = batch[-1].id
+                print(f"Indexed {indexed} documents (last id {last_id})")
+    finally:
+        db.close()
+    return indexed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the document content index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subparsers.add_parser("backfill", help="Index documents missing from the index")
+    backfill_parser.add_argument("--workers", type=int, default=None)
+    backfill_parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from app.database import init_db
+    init_db()
+    backfill(args.workers, args.batch_size)
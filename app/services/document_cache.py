@@ -0,0 +1,74 @@
+"""
+Read-through cache of Document rows by id
+
+Snapshots are immutable namedtuples of the document columns plus the id of
+its latest status history entry. Every route that changes a document already
+publishes a TOPIC_DOCUMENT invalidation, which drops the entry here after
+commit (and in other workers on their next poll).
+"""
+from typing import NamedTuple, Optional
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import LRUCache
+from app.core.config import DOCUMENT_CACHE_SIZE
+from app.core.invalidation import invalidation_bus, TOPIC_DOCUMENT
+from app.core.singleflight import single_flight
+from app.models.document import Document
+from app.models.document_status_history import DocumentStatusHistory
+
+
+class DocumentSnapshot(NamedTuple):
+    id: int
+    filename: str
+    file_path: str
+    content_hash: Optional[str]
+    status: str
+    uploaded_by: int
+    approved_by: Optional[int]
+    approval_date: Optional[datetime]
+    approval_comment: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    version: int
+    history_id: Optional[int]  # latest status history entry
+
+
+document_cache = LRUCache("documents", DOCUMENT_CACHE_SIZE)
+
+SNAPSHOT_COLUMNS = [getattr(Document, name) for name in DocumentSnapshot._fields if name != "history_id"]
+
+
+def get_document_snapshot(db: Session, doc_id: int) -> Optional[DocumentSnapshot]:
+    """Return the cached snapshot of a document, loading it on a miss"""
+    snapshot = document_cache.get(doc_id)
+    if snapshot is not None:
+        return snapshot
+
+    # Concurrent misses for the same document share one load
+    return single_flight.do(("document_snapshot", doc_id), lambda: _load_snapshot(db, doc_id))
+
+
+def _load_snapshot(db: Session, doc_id: int) -> Optional[DocumentSnapshot]:
+    token = document_cache.load_token()
+    latest_history = select(func.max(DocumentStatusHistory.id)).where(
+        DocumentStatusHistory.document_id == doc_id
+    ).scalar_subquery()
+    row = db.query(*SNAPSHOT_COLUMNS, latest_history).filter(Document.id == doc_id).first()
+    if row is None:
+        return None
+    snapshot = DocumentSnapshot(*row)
+    document_cache.put(doc_id, snapshot, token)
+    return snapshot
+
+
+def _invalidate(key: Optional[str]):
+    if key is None:
+        document_cache.clear()
+    else:
+        document_cache.invalidate(int(key))
+
+
+invalidation_bus.subscribe(TOPIC_DOCUMENT, _invalidate)
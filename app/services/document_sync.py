@@ -0,0 +1,86 @@
+"""
+Delta sync for a user's documents
+
+A watermark is an opaque cursor holding two positions:
+- (change_id, id) of the last document returned, scanned with the
+  (uploaded_by, change_id) index
+- the id of the last tombstone returned (tombstone ids only grow)
+
+`change_id` is the id of the cache_invalidations row published by the
+document's last change. SQLite runs one write transaction at a time, so ids
+taken inside a write transaction follow commit order. A watermark therefore
+never skips a change that committed late, which a timestamp taken before the
+transaction (updated_at) could. Tombstone ids are commit-ordered the same way.
+
+A first call without a watermark pages through every document and starts the
+tombstone position at "now", since the client had nothing to delete yet.
+"""
+from typing import Optional
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.exceptions import InvalidRequest
+from app.core.invalidation import invalidation_bus, TOPIC_DOCUMENT
+from app.models.document import Document
+from app.models.document_tombstone import DocumentTombstone
+from app.schemas.document import DocumentResponse, DocumentSyncResponse
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+def record_change(db: Session, document_id: int):
+    """Publish a document change and stamp its sync position (call inside the changing transaction)"""
+    change = invalidation_bus.publish(db, TOPIC_DOCUMENT, document_id)
+    db.flush()
+    db.query(Document).filter(Document.id == document_id).update(
+        {Document.change_id: change.id}, synchronize_session=False
+    )
+
+
+def record_tombstone(db: Session, document_id: int, owner_id: int):
+    """Remember a deleted document (call inside the deleting transaction)"""
+    db.add(DocumentTombstone(document_id=document_id, owner_id=owner_id))
+
+
+def document_changes(db: Session, owner_id: int, since: Optional[str], limit: int) -> DocumentSyncResponse:
+    """Documents created/updated and deleted since a watermark, at most `limit` of each"""
+    position = decode_cursor(since) if since else {}
+    # Watermarks without a change position (older formats) restart the document scan
+    change_id = position.get("c", 0)
+    last_id = position.get("i", 0) if "c" in position else 0
+    tombstone_id = position.get("d")
+    if not all(isinstance(value, int) for value in (change_id, last_id, tombstone_id or 0)):
+        raise InvalidRequest("Invalid cursor")
+
+    documents = db.query(Document).filter(
+        Document.uploaded_by == owner_id,
+        tuple_(Document.change_id, Document.id) > (change_id, last_id)
+    ).order_by(Document.change_id, Document.id).limit(limit + 1).all()
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    if documents:
+        change_id = documents[-1].change_id
+        last_id = documents[-1].id
+
+    deleted = []
+    if tombstone_id is None:
+        tombstone_id = db.query(func.max(DocumentTombstone.id)).filter(
+            DocumentTombstone.owner_id == owner_id
+        ).scalar() or 0
+    else:
+        tombstones = db.query(DocumentTombstone.id, DocumentTombstone.document_id).filter(
+            DocumentTombstone.owner_id == owner_id,
+            DocumentTombstone.id > tombstone_id
+        ).order_by(DocumentTombstone.id).limit(limit + 1).all()
+        has_more = has_more or len(tombstones) > limit
+        tombstones = tombstones[:limit]
+        if tombstones:
+            tombstone_id = tombstones[-1].id
+        deleted = [row.document_id for row in tombstones]
+
+    return DocumentSyncResponse(
+        documents=[DocumentResponse.model_validate(document) for document in documents],
+        deleted=deleted,
+        watermark=encode_cursor({"c": change_id, "i": last_id, "d": tombstone_id}),
+        has_more=has_more
+    )
@@ -0,0 +1,264 @@
+"""
+Document change feed shared by every worker
+
+Routes publish events into the caller's transaction as rows of the
+`document_events` table, so a change that is rolled back never produces an
+event. The row id is the event id: it is taken inside the SQLite write
+transaction, so ids follow commit order and mean the same thing on every
+worker. A client can therefore resume with its Last-Event-ID on whichever
+worker its reconnect lands.
+
+Each worker polls the table for new rows (an indexed range scan on the primary
+key, throttled to once per EVENTS_POLL_INTERVAL_SECONDS however many streams
+are open, like the invalidation bus) and hands them to its local subscribers.
+Streams run on the event loop, so polls and replays go through the threadpool
+and events are handed to each subscriber's asyncio queue with
+call_soon_threadsafe.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import (
+    EVENTS_POLL_INTERVAL_SECONDS,
+    EVENTS_RETENTION_SECONDS,
+    EVENTS_REPLAY_MAX,
+    EVENTS_QUEUE_SIZE,
+    EVENTS_HEARTBEAT_SECONDS,
+    EVENTS_STREAM_MAX_SECONDS
+)
+from app.dependencies.auth import request_db
+from app.models.document_event import DocumentEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_DOCUMENT_UPLOADED = "document.uploaded"
+EVENT_DOCUMENT_STATUS = "document.status"
+EVENT_RESYNC = "resync"  # events were missed; the client should refetch its state
+
+
+class Event(NamedTuple):
+    id: int
+    type: str
+    owner_id: int
+    data: dict
+
+
+def _event(row) -> Event:
+    return Event(row.id, row.type, row.owner_id, json.loads(row.data))
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, accepts: Callable[[Event], bool], queue_size: int):
+        self.loop = loop
+        self.accepts = accepts
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def deliver(self, item: Event):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBroker:
+    """Appends events to document_events and feeds the rows to this worker's subscribers"""
+
+    def __init__(
+        self,
+        poll_interval: float = EVENTS_POLL_INTERVAL_SECONDS,
+        retention: float = EVENTS_RETENTION_SECONDS,
+        replay_max: int = EVENTS_REPLAY_MAX,
+        queue_size: int = EVENTS_QUEUE_SIZE
+    ):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.replay_max = replay_max
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._last_seen_id = None
+        self._last_poll = 0.0
+        self._last_prune = time.monotonic()
+
+    def publish(self, db: Session, event_type: str, owner_id: int, data: dict) -> DocumentEvent:
+        """Record an event in the caller's transaction; subscribers get it once committed"""
+        row = DocumentEvent(type=event_type, owner_id=owner_id, data=json.dumps(data))
+        db.add(row)
+        return row
+
+    def poll_due(self) -> bool:
+        return self._last_seen_id is None or time.monotonic() - self._last_poll >= self.poll_interval
+
+    def poll(self, db: Session, force: bool = False):
+        """Deliver events committed by any worker since the last poll"""
+        if not force and not self.poll_due():
+            return
+        now = time.monotonic()
+        if not self._poll_lock.acquire(blocking=False):
+            return  # another stream is already polling
+        try:
+            self._last_poll = now
+            if self._last_seen_id is None:
+                # Live delivery starts now; older events are replayed per stream
+                self._last_seen_id = db.query(func.max(DocumentEvent.id)).scalar() or 0
+                return
+
+            rows = db.query(DocumentEvent).filter(
+                DocumentEvent.id > self._last_seen_id
+            ).order_by(DocumentEvent.id).all()
+            for row in rows:
+                self.broadcast(_event(row))
+                self._last_seen_id = row.id
+
+            if now - self._last_prune > self.retention:
+                self._last_prune = now
+                self.prune(db)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error polling document events: {str(e)}")
+        finally:
+            self._poll_lock.release()
+
+    def broadcast(self, item: Event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if subscriber.accepts(item):
+                try:
+                    subscriber.loop.call_soon_threadsafe(subscriber.deliver, item)
+                except RuntimeError:
+                    # The subscriber's loop is gone
+                    self.unsubscribe(subscriber)
+
+    def missed(self, db: Session, accepts: Callable[[Event], bool], last_event_id: int) -> tuple:
+        """Return (events after `last_event_id` that `accepts` takes, resync)
+
+        resync is True when the missed events are no longer all retained, or too
+        many to replay, and the client must refetch.
+        """
+        oldest_id, newest_id = db.query(func.min(DocumentEvent.id), func.max(DocumentEvent.id)).one()
+        # An id past the newest never came from this feed (e.g. the database was reset)
+        resync = last_event_id > (newest_id or 0) or (oldest_id is not None and last_event_id < oldest_id - 1)
+        rows = db.query(DocumentEvent).filter(
+            DocumentEvent.id > last_event_id
+        ).order_by(DocumentEvent.id).limit(self.replay_max + 1).all()
+        if len(rows) > self.replay_max:
+            return [], True
+        return [item for item in map(_event, rows) if accepts(item)], resync
+
+    def subscribe(self, accepts: Callable[[Event], bool]) -> Subscriber:
+        """Register a subscriber on the running loop"""
+        subscriber = Subscriber(asyncio.get_running_loop(), accepts, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def prune(self, db: Session):
+        """Delete old events, always keeping the newest row so ids stay monotonic"""
+        newest_id = db.query(func.max(DocumentEvent.id)).scalar()
+        if newest_id is None:
+            return
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        db.query(DocumentEvent).filter(
+            DocumentEvent.id < newest_id,
+            DocumentEvent.created_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    def reset(self):
+        """Forget subscribers and the poll position"""
+        with self._lock:
+            self._subscribers.clear()
+        self._last_seen_id = None
+        self._last_poll = 0.0
+
+
+event_broker = EventBroker()
+
+
+# ==================================================
+# Server-sent events stream
+# ==================================================
+def format_event(event_type: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event_type}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def _poll(request, broker: EventBroker):
+    if broker.poll_due():
+        with request_db(request) as db:
+            broker.poll(db)
+
+
+def _missed(request, broker: EventBroker, accepts: Callable[[Event], bool], last_event_id: int) -> tuple:
+    with request_db(request) as db:
+        # Start live delivery before reading the replay, so no event falls in between
+        broker.poll(db)
+        return broker.missed(db, accepts, last_event_id)
+
+
+async def stream_events(
+    request,
+    accepts: Callable[[Event], bool],
+    last_event_id: Optional[int] = None,
+    broker: EventBroker = event_broker
+):
+    """Async generator of SSE frames: missed events first, then live ones until the stream expires"""
+    loop = asyncio.get_running_loop()
+    subscriber = broker.subscribe(accepts)
+    try:
+        yield f"retry: {EVENTS_HEARTBEAT_SECONDS * 1000}\n\n"
+        sent_id = 0
+        if last_event_id is not None:
+            missed, resync = await run_in_threadpool(_missed, request, broker, accepts, last_event_id)
+            if resync:
+                yield format_event(EVENT_RESYNC, {})
+            for item in missed:
+                yield format_event(item.type, item.data, item.id)
+                sent_id = item.id
+        else:
+            await run_in_threadpool(_poll, request, broker)
+
+        deadline = loop.time() + EVENTS_STREAM_MAX_SECONDS
+        next_heartbeat = loop.time() + EVENTS_HEARTBEAT_SECONDS
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                item = await asyncio.wait_for(
+                    subscriber.queue.get(), timeout=min(broker.poll_interval, remaining)
+                )
+            except asyncio.TimeoutError:
+                await run_in_threadpool(_poll, request, broker)
+                if loop.time() >= next_heartbeat:
+                    if await request.is_disconnected():
+                        break
+                    next_heartbeat = loop.time() + EVENTS_HEARTBEAT_SECONDS
+                    yield ": keep-alive\n\n"
+                continue
+
+            if subscriber.overflowed:
+                subscriber.overflowed = False
+                yield format_event(EVENT_RESYNC, {})
+            if item.id <= sent_id:
+                continue  # already replayed
+            sent_id = item.id
+            yield format_event(item.type, item.data, item.id)
+    finally:
+        broker.unsubscribe(subscriber)
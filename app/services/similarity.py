@@ -0,0 +1,354 @@
+"""
+Near-duplicate detection
+
+- PDFs: a MinHash signature over word shingles of the extracted text
+- JPEG/PNG: a 64-bit difference hash (dHash, needs Pillow)
+
+Signatures are split into bands and every band is stored as a bucket in
+`document_lsh_buckets`. Finding duplicates is an indexed lookup of the
+documents sharing at least one bucket, followed by an exact similarity check
+of at most SIMILARITY_MAX_CANDIDATES of them, so it never compares against
+every document. dHash bands are 16 bits wide, which keeps buckets selective;
+lookups also probe every 1-bit variant of each band, so any two hashes within
+7 bits still meet in a bucket.
+
+Buckets of signatures stored under an older band layout are rebuilt with:
+    python -m app.services.similarity rebucket
+
+An upload's text is extracted once, in a process-pool worker, and feeds both
+the signature and the content index (see analyze_document).
+"""
+import argparse
+import hashlib
+import logging
+import random
+import re
+from concurrent.futures import TimeoutError
+from typing import Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    MINHASH_PERMUTATIONS,
+    MINHASH_BANDS,
+    MINHASH_SHINGLE_SIZE,
+    MINHASH_MAX_SHINGLES,
+    MINHASH_THRESHOLD,
+    DHASH_BANDS,
+    DHASH_MAX_DISTANCE,
+    SIMILARITY_MAX_CANDIDATES,
+    SIMILARITY_TIMEOUT_SECONDS
+)
+from app.database import SessionLocal
+from app.core.invalidation import invalidation_bus, TOPIC_DOCUMENT
+from app.models.document_signature import DocumentSignature
+from app.models.document_lsh_bucket import DocumentLshBucket
+from app.services.content_index import extract_text, upsert_content
+from app.services.workers import submit
+
+logger = logging.getLogger(__name__)
+
+KIND_MINHASH = "minhash"
+KIND_DHASH = "dhash"
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Fixed seed: signatures must stay comparable across processes and restarts
+_rng = random.Random(20240501)
+PERMUTATIONS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+
+# ==================================================
+# Signatures (run inside pool workers)
+# ==================================================
+def shingles(text: str, size: int = MINHASH_SHINGLE_SIZE) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    result = set()
+    for i in range(len(words) - size + 1):
+        result.add(" ".join(words[i:i + size]))
+        if len(result) >= MINHASH_MAX_SHINGLES:
+            break
+    return result
+
+
+def minhash(text: str) -> Optional[list]:
+    values = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), "big")
+        for shingle in shingles(text)
+    ]
+    if not values:
+        return None
+    return [
+        min(((a * value + b) % MERSENNE_PRIME) & MAX_HASH for value in values)
+        for a, b in PERMUTATIONS
+    ]
+
+
+def dhash(path: str) -> Optional[list]:
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    with Image.open(path) as image:
+        image.draft("L", (32, 32))
+        pixels = list(image.convert("L").resize((9, 8)).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return [bits]
+
+
+def compute_signature(path: str, content_type: str, content: Optional[str] = None):
+    """Return (kind, signature) for a stored file, or None when it has no usable content
+
+    `content` is the already extracted text of a PDF, so it is not parsed twice.
+    """
+    try:
+        if content_type == "application/pdf":
+            if content is None:
+                content = extract_text(path, content_type)
+            signature = minhash(content)
+            return (KIND_MINHASH, signature) if signature else None
+        if content_type in ("image/png", "image/jpeg"):
+            signature = dhash(path)
+            return (KIND_DHASH, signature) if signature else None
+    except Exception as e:
+        logger.error(f"Error computing signature for {path}: {str(e)}")
+    return None
+
+
+def analyze_document(path: str, content_type: str):
+    """Return (text, signature) of a stored file, extracting its text only once"""
+    content = extract_text(path, content_type)
+    return content, compute_signature(path, content_type, content)
+
+
+# ==================================================
+# LSH buckets and similarity
+# ==================================================
+def _dhash_bands(signature: list) -> list:
+    width = 64 // DHASH_BANDS
+    mask = (1 << width) - 1
+    return [(signature[0] >> (band * width)) & mask for band in range(DHASH_BANDS)]
+
+
+def _dhash_bucket(band: int, value: int) -> str:
+    # The band width is part of the key: buckets of another layout never match
+    return f"{KIND_DHASH}:w{64 // DHASH_BANDS}:{band}:{value:x}"
+
+
+def lsh_buckets(kind: str, signature: list) -> list:
+    """Buckets a signature is stored under"""
+    if kind == KIND_DHASH:
+        return [_dhash_bucket(band, value) for band, value in enumerate(_dhash_bands(signature))]
+
+    rows = len(signature) // MINHASH_BANDS
+    buckets = []
+    for band in range(MINHASH_BANDS):
+        chunk = ",".join(str(value) for value in signature[band * rows:(band + 1) * rows])
+        buckets.append(f"{kind}:{band}:{hashlib.blake2b(chunk.encode(), digest_size=8).hexdigest()}")
+    return buckets
+
+
+def probe_buckets(kind: str, signature: list) -> list:
+    """Buckets to look a signature up in"""
+    if kind != KIND_DHASH:
+        return lsh_buckets(kind, signature)
+    width = 64 // DHASH_BANDS
+    buckets = []
+    for band, value in enumerate(_dhash_bands(signature)):
+        buckets.append(_dhash_bucket(band, value))
+        buckets.extend(_dhash_bucket(band, value ^ (1 << bit)) for bit in range(width))
+    return buckets
+
+
+def similarity(kind: str, first: list, second: list) -> float:
+    if kind == KIND_DHASH:
+        return 1 - bin(first[0] ^ second[0]).count("1") / 64
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def is_duplicate(kind: str, score: float) -> bool:
+    if kind == KIND_DHASH:
+        return score >= 1 - DHASH_MAX_DISTANCE / 64
+    return score >= MINHASH_THRESHOLD
+
+
+def encode_signature(signature: list) -> str:
+    return ",".join(str(value) for value in signature)
+
+
+def decode_signature(value: str) -> list:
+    return [int(part) for part in value.split(",")]
+
+
+def store_signature(db: Session, document_id: int, kind: str, signature: list):
+    """Store a signature and its LSH buckets (caller commits)"""
+    remove_signature(db, document_id)
+    db.add(DocumentSignature(document_id=document_id, kind=kind, signature=encode_signature(signature)))
+    db.add_all([
+        DocumentLshBucket(document_id=document_id, bucket=bucket)
+        for bucket in lsh_buckets(kind, signature)
+    ])
+
+
+def remove_signature(db: Session, document_id: int):
+    db.query(DocumentLshBucket).filter(DocumentLshBucket.document_id == document_id).delete(synchronize_session=False)
+    db.query(DocumentSignature).filter(DocumentSignature.document_id == document_id).delete(synchronize_session=False)
+
+
+def find_duplicates(
+    db: Session,
+    kind: str,
+    signature: list,
+    exclude_id: int = None,
+    limit: int = 10,
+    max_candidates: int = SIMILARITY_MAX_CANDIDATES
+) -> list:
+    """Documents whose signature is near `signature`, most similar first"""
+    candidate_ids = db.query(DocumentLshBucket.document_id).filter(
+        DocumentLshBucket.bucket.in_(probe_buckets(kind, signature))
+    )
+    if exclude_id is not None:
+        candidate_ids = candidate_ids.filter(DocumentLshBucket.document_id != exclude_id)
+    # Newest candidates first; a crowded bucket must not turn the check into a scan
+    candidate_ids = candidate_ids.distinct().order_by(DocumentLshBucket.document_id.desc()).limit(max_candidates)
+
+    candidates = db.query(DocumentSignature).filter(
+        DocumentSignature.document_id.in_(candidate_ids),
+        DocumentSignature.kind == kind
+    ).all()
+
+    matches = []
+    for candidate in candidates:
+        score = similarity(kind, signature, decode_signature(candidate.signature))
+        if is_duplicate(kind, score):
+            matches.append({"document_id": candidate.document_id, "similarity": round(score, 4)})
+    matches.sort(key=lambda match: match["similarity"], reverse=True)
+    return matches[:limit]
+
+
+def find_duplicates_of(db: Session, document_id: int) -> list:
+    """Likely duplicates of an already indexed document"""
+    stored = db.query(DocumentSignature).filter(DocumentSignature.document_id == document_id).first()
+    if not stored:
+        return []
+    return find_duplicates(db, stored.kind, decode_signature(stored.signature), exclude_id=document_id)
+
+
+def duplicates_version(db: Session, document_id: int) -> Optional[tuple]:
+    """Cheap version of find_duplicates_of(document_id), or None when it has no signature
+
+    (count, max id) of the bucket rows its lookup probes: storing, replacing or
+    removing any candidate's signature changes it, other documents do not.
+    """
+    stored = db.query(DocumentSignature).filter(DocumentSignature.document_id == document_id).first()
+    if not stored:
+        return None
+    return tuple(db.query(func.count(DocumentLshBucket.id), func.max(DocumentLshBucket.id)).filter(
+        DocumentLshBucket.bucket.in_(probe_buckets(stored.kind, decode_signature(stored.signature)))
+    ).one())
+
+
+# ==================================================
+# Upload integration
+# ==================================================
+def start_analysis(file_path: str, content_type: str):
+    """Start extracting the text and signature of an upload in the process pool"""
+    return submit(analyze_document, file_path, content_type)
+
+
+def wait_for_analysis(future, timeout: float = SIMILARITY_TIMEOUT_SECONDS) -> Tuple[Optional[tuple], bool]:
+    """Return ((text, signature), False), (None, False) if the analysis failed or (None, True) on timeout
+
+    A timed out job may still finish a moment later: callers hand it to
+    store_analysis_when_ready rather than check done() again.
+    """
+    try:
+        return future.result(timeout=timeout), False
+    except TimeoutError:
+        return None, True
+    except Exception as e:
+        logger.error(f"Error analyzing document: {str(e)}")
+        return None, False
+
+
+def store_analysis(db: Session, document_id: int, content: str, signature) -> bool:
+    """Index the text and store the signature; False if the document no longer exists (caller commits)"""
+    if not upsert_content(db, document_id, content):
+        return False
+    if signature:
+        store_signature(db, document_id, *signature)
+    return True
+
+
+def store_analysis_when_ready(document_id: int, future):
+    """Background task: store an analysis that was not ready during the request"""
+    result, _ = wait_for_analysis(future, timeout=None)
+    if not result:
+        return
+    db = SessionLocal()
+    try:
+        if not store_analysis(db, document_id, *result):
+            logger.info(f"Document {document_id} was deleted during analysis, not storing it")
+            db.rollback()
+            return
+        # Duplicate lists (and their ETags) depend on the stored signatures
+        invalidation_bus.publish(db, TOPIC_DOCUMENT, document_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error storing analysis for document {document_id}: {str(e)}")
+    finally:
+        db.close()
+
+
+# ==================================================
+# Maintenance
+# ==================================================
+def rebucket(db: Session, batch_size: int = 1000) -> int:
+    """Rebuild the LSH buckets of every stored signature (after a band layout change)"""
+    rebuilt = 0
+    last_id = 0
+    while True:
+        batch = db.query(DocumentSignature).filter(
+            DocumentSignature.document_id > last_id
+        ).order_by(DocumentSignature.document_id).limit(batch_size).all()
+        if not batch:
+            break
+        for stored in batch:
+            db.query(DocumentLshBucket).filter(
+                DocumentLshBucket.document_id == stored.document_id
+            ).delete(synchronize_session=False)
+            db.add_all([
+                DocumentLshBucket(document_id=stored.document_id, bucket=bucket)
+                for bucket in lsh_buckets(stored.kind, decode_signature(stored.signature))
+            ])
+        db.commit()
+        rebuilt += len(batch)
+        last_id = batch[-1].document_id
+    return rebuilt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain near-duplicate signatures")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebucket", help="Rebuild LSH buckets from the stored signatures")
+    args = parser.parse_args()
+
+    from app.database import init_db
+    init_db()
+    session = SessionLocal()
+    try:
+        print(f"Rebuilt buckets of {rebucket(session)} signatures")
+    finally:
+        session.close()
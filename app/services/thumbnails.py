@@ -0,0 +1,72 @@
+"""
+Thumbnail and preview generation
+
+After an upload commits, a process-pool worker renders a bounded-size PNG
+thumbnail of the image (or of the first page of a PDF) into THUMBNAIL_FOLDER.
+Thumbnails are keyed by document id and content hash, so a cached thumbnail
+never goes stale and can be served with long-lived cache headers.
+
+Rendering uses optional libraries: Pillow for images and PyMuPDF (fitz) for
+PDFs. When a library is missing the thumbnail is simply not generated and the
+endpoint answers 404.
+"""
+import logging
+import os
+from typing import Optional
+
+from app.core.config import THUMBNAIL_FOLDER, THUMBNAIL_MAX_SIZE
+from app.services.workers import submit
+
+logger = logging.getLogger(__name__)
+
+
+def thumbnail_path(document_id: int, content_hash: str) -> str:
+    return os.path.join(THUMBNAIL_FOLDER, f"{document_id}_{content_hash}.png")
+
+
+def render_thumbnail(
+    source_path: str,
+    content_type: str,
+    destination: str,
+    max_size: tuple = THUMBNAIL_MAX_SIZE
+) -> Optional[str]:
+    """Render a PNG thumbnail (runs inside a pool worker); returns the path or None"""
+    if os.path.exists(destination):
+        return destination
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    if content_type == "application/pdf":
+        try:
+            import fitz
+        except ImportError:
+            return None
+        with fitz.open(source_path) as pdf:
+            if pdf.page_count == 0:
+                return None
+            pixmap = pdf[0].get_pixmap()
+            image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    else:
+        image = Image.open(source_path)
+        image.draft("RGB", max_size)  # lets JPEG decode at reduced scale
+
+    image = image.convert("RGB")
+    image.thumbnail(max_size)
+
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    # Write then rename so readers never see a partial file
+    partial = f"{destination}.{os.getpid()}.tmp"
+    image.save(partial, format="PNG", optimize=True)
+    os.replace(partial, destination)
+    return destination
+
+
+def schedule_thumbnail(document_id: int, file_path: str, content_type: str, content_hash: str):
+    """Background task: hand thumbnail rendering to the process pool"""
+    try:
+        submit(render_thumbnail, file_path, content_type, thumbnail_path(document_id, content_hash))
+    except Exception as e:
+        logger.error(f"Error scheduling thumbnail for document {document_id}: {str(e)}")
@@ -0,0 +1,201 @@
+"""
+Bulk user import
+
+Rows are read from a CSV (header `email,password[,role]`) or NDJSON stream one
+line at a time and processed in chunks of USER_IMPORT_CHUNK_SIZE:
+
+1. validate every row (email syntax, password present, role)
+2. look up the chunk's emails in one query against the unique email index
+3. hash the new passwords in small batches in the import process pool, which
+   is separate from the pool serving uploads
+4. insert the chunk with one executemany and commit it
+5. yield the chunk's results, so the caller can stream progress
+
+Each chunk is its own transaction, so a failed chunk never undoes earlier ones,
+and bcrypt never runs on the request thread one row at a time.
+"""
+import csv
+import io
+import json
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    USER_IMPORT_CHUNK_SIZE,
+    USER_IMPORT_MAX_ROWS,
+    USER_IMPORT_HASH_BATCH,
+    USER_IMPORT_MAX_IN_FLIGHT
+)
+from app.core.exceptions import InvalidRequest
+from app.core.security import hash_password
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.services.workers import POOL_IMPORT, submit_to
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+ROLES = ("user", "admin")
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return FORMAT_NDJSON
+    if name.endswith(".csv") or content_type in ("text/csv", "application/csv"):
+        return FORMAT_CSV
+    raise InvalidRequest("Import file must be CSV (.csv) or NDJSON (.ndjson)")
+
+
+def read_rows(stream, fmt: str) -> Iterator[tuple]:
+    """Yield (row number, dict or error message) without loading the whole file"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == FORMAT_CSV:
+        reader = csv.DictReader(text)
+        if not reader.fieldnames or not {"email", "password"} <= set(reader.fieldnames):
+            raise InvalidRequest("CSV header must contain email and password columns")
+        for number, row in enumerate(reader, start=1):
+            yield number, row
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, "Invalid JSON"
+            continue
+        yield number, row if isinstance(row, dict) else "Each line must be a JSON object"
+
+
+def validate_row(row) -> tuple:
+    """Return (email, password, role) or raise ValueError with the reason"""
+    if isinstance(row, str):
+        raise ValueError(row)
+    role = (row.get("role") or "user").strip()
+    if role not in ROLES:
+        raise ValueError(f"Role must be one of: {', '.join(ROLES)}")
+    try:
+        data = UserCreate(email=(row.get("email") or "").strip(), password=row.get("password") or "")
+    except ValidationError:
+        raise ValueError("Invalid email address")
+    if not data.password:
+        raise ValueError("Password is required")
+    return data.email, data.password, role
+
+
+def _raw_email(row) -> Optional[str]:
+    return row.get("email") if isinstance(row, dict) else None
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def hash_passwords(passwords: list) -> list:
+    """Hash a batch of passwords (runs inside a pool worker)"""
+    return [hash_password(password) for password in passwords]
+
+
+def _hash_in_pool(passwords: list) -> list:
+    """Hash in order, with at most USER_IMPORT_MAX_IN_FLIGHT batches queued in the import pool"""
+    hashes = []
+    in_flight = deque()
+    for start in range(0, len(passwords), USER_IMPORT_HASH_BATCH):
+        if len(in_flight) >= USER_IMPORT_MAX_IN_FLIGHT:
+            hashes.extend(in_flight.popleft().result())
+        in_flight.append(submit_to(POOL_IMPORT, hash_passwords, passwords[start:start + USER_IMPORT_HASH_BATCH]))
+    while in_flight:
+        hashes.extend(in_flight.popleft().result())
+    return hashes
+
+
+def _insert_chunk(db: Session, pending: list) -> dict:
+    """Insert a chunk of users in one transaction; returns {email: id} of the created ones
+
+    Emails registered concurrently since the lookup are skipped by the database
+    (ON CONFLICT DO NOTHING) and reported as duplicates by the caller.
+    """
+    inserted = db.execute(
+        insert(User).on_conflict_do_nothing(index_elements=[User.email]).returning(User.id, User.email),
+        pending
+    ).all()
+    db.commit()
+    return {email: user_id for user_id, email in inserted}
+
+
+def import_users(
+    db: Session,
+    rows: Iterable,
+    chunk_size: int = USER_IMPORT_CHUNK_SIZE,
+    max_rows: int = USER_IMPORT_MAX_ROWS
+) -> Iterator[dict]:
+    """Import (row number, row) pairs
+
+    Yields {"type": "chunk", "results": [...]} once each chunk is committed,
+    then {"type": "summary", ...} with the totals and whether rows were left unread.
+    """
+    totals = {"created": 0, "duplicate": 0, "invalid": 0}
+    seen = set()
+    rows = iter(rows)
+
+    for chunk in _chunks(islice(rows, max_rows), chunk_size):
+        results = []
+        valid = []
+        for number, row in chunk:
+            try:
+                email, password, role = validate_row(row)
+            except ValueError as e:
+                results.append({"row": number, "email": _raw_email(row), "status": "invalid", "error": str(e)})
+                continue
+            if email in seen:
+                results.append({"row": number, "email": email, "status": "duplicate", "error": "Repeated in the import"})
+                continue
+            seen.add(email)
+            valid.append((number, email, password, role))
+
+        if valid:
+            existing = {
+                email for (email,) in
+                db.query(User.email).filter(User.email.in_([email for _, email, _, _ in valid]))
+            }
+            new = [entry for entry in valid if entry[1] not in existing]
+            hashes = _hash_in_pool([password for _, _, password, _ in new])
+
+            created = _insert_chunk(db, [
+                {"email": email, "hashed_password": hashed, "role": role}
+                for (_, email, _, role), hashed in zip(new, hashes)
+            ]) if new else {}
+
+            for number, email, _, _ in valid:
+                if email in created:
+                    results.append({"row": number, "email": email, "status": "created", "id": created[email]})
+                else:
+                    results.append({"row": number, "email": email, "status": "duplicate", "error": "Email already registered"})
+
+        results.sort(key=lambda result: result["row"])
+        for result in results:
+            totals[result["status"]] += 1
+        yield {"type": "chunk", "results": results}
+
+    yield {
+        "type": "summary",
+        "created": totals["created"],
+        "duplicates": totals["duplicate"],
+        "invalid": totals["invalid"],
+        "truncated": next(rows, None) is not None
+    }
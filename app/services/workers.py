@@ -0,0 +1,73 @@
+"""
+Process pools for CPU-heavy work
+
+The shared pool runs derived work of uploads (thumbnails, text extraction,
+signatures). Bulk imports hash passwords in a dedicated pool of their own, so
+an import gets a real share of the CPU without starving uploads, and uploads
+never wait behind thousands of bcrypt jobs.
+
+Pools are created on first use so importing the app (and cold starts) stay
+cheap, and they use the "spawn" start method so children never inherit the
+parent's threads, database connections or locks.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.config import PROCESS_POOL_WORKERS, USER_IMPORT_WORKERS
+
+logger = logging.getLogger(__name__)
+
+POOL_SHARED = "shared"
+POOL_IMPORT = "import"
+POOL_SIZES = {POOL_SHARED: PROCESS_POOL_WORKERS, POOL_IMPORT: USER_IMPORT_WORKERS}
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(name: str = POOL_SHARED) -> ProcessPoolExecutor:
+    pool = _pools.get(name)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = ProcessPoolExecutor(
+                    max_workers=POOL_SIZES[name],
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return pool
+
+
+def submit(fn, *args, **kwargs) -> Future:
+    """Submit work to the shared pool, logging (not raising) failures of fire-and-forget jobs"""
+    return submit_to(POOL_SHARED, fn, *args, **kwargs)
+
+
+def submit_to(name: str, fn, *args, **kwargs) -> Future:
+    """Submit work to the named pool"""
+    try:
+        future = get_process_pool(name).submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); replace the pool once and retry
+        logger.error(f"Process pool {name} is broken, restarting it")
+        shutdown_process_pool(name)
+        future = get_process_pool(name).submit(fn, *args, **kwargs)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def _log_failure(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Background worker job failed: {future.exception()}")
+
+
+def shutdown_process_pool(name: str = None):
+    """Shut down the named pool, or every pool"""
+    with _pool_lock:
+        for pool_name in [name] if name else list(_pools):
+            pool = _pools.pop(pool_name, None)
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
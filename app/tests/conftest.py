@@ -1,16 +1,26 @@
 """
 Pytest configuration and fixtures for testing
 """
+import os
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 
+# Tests create their own schema; keep app startup away from the real database
+os.environ.setdefault("CREATE_SCHEMA_ON_STARTUP", "0")
+
 from app.main import app
 from app.database import Base, SessionLocal
 from app.dependencies.auth import get_db
 from app.models.user import User
 from app.core.security import hash_password
+from app.services.events import event_broker
+from app.services.document_cache import document_cache
+from app.core.rate_limit import bucket_store
+from app.core import idempotency
+from app.core.idempotency import IdempotencyStore
+from app.core.revocation import revocation_list
 
 
 # Create test database
@@ -36,7 +46,7 @@ def db():
 
 
 @pytest.fixture(scope="function")
-def client(db: Session):
+def client(db: Session, tmp_path, monkeypatch):
     """Create test client with test database"""
     
     def override_get_db():
@@ -46,6 +56,11 @@ def client(db: Session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    event_broker.reset()
+    document_cache.clear()
+    bucket_store.reset()
+    monkeypatch.setattr(idempotency, "idempotency_store", IdempotencyStore(str(tmp_path / "idempotency.db")))
+    revocation_list.reset()
     
     with TestClient(app) as test_client:
         yield test_client
@@ -53,6 +68,16 @@ def client(db: Session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def upload_folder(tmp_path, monkeypatch):
+    """Store uploads under the test's tmp_path instead of the repository's uploads/"""
+    from app.utils import file_handler
+
+    folder = tmp_path / "uploads"
+    monkeypatch.setattr(file_handler, "UPLOAD_FOLDER", str(folder))
+    return folder
+
+
 @pytest.fixture
 def test_user(db: Session):
     """Create test user"""
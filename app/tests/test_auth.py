@@ -1,6 +1,8 @@
 """
 Test cases for authentication endpoints
 """
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -80,3 +82,152 @@ class TestAuthentication:
             json={"refresh_token": "invalid_token"}
         )
         assert response.status_code == 401
+
+    def login_refresh_token(self, client: TestClient) -> str:
+        response = client.post(
+            "/auth/login",
+            json={"email": "testuser@example.com", "password": "password123"}
+        )
+        return response.json()["refresh_token"]
+
+    def test_refresh_token_rotation_detects_reuse(self, client: TestClient, test_user):
+        """Test a refresh token works once and replaying it revokes its family"""
+        first = self.login_refresh_token(client)
+        rotated = client.post("/auth/refresh", json={"refresh_token": first})
+        assert rotated.status_code == 200
+        second = rotated.json()["refresh_token"]
+
+        replay = client.post("/auth/refresh", json={"refresh_token": first})
+        assert replay.status_code == 401
+        assert "reuse" in replay.json()["detail"]
+
+        # The legitimate successor is revoked with the family
+        response = client.post("/auth/refresh", json={"refresh_token": second})
+        assert response.status_code == 401
+
+        # Other logins are unaffected
+        other = self.login_refresh_token(client)
+        assert client.post("/auth/refresh", json={"refresh_token": other}).status_code == 200
+
+    def test_logout_revokes_refresh_token(self, client: TestClient, test_user):
+        """Test logout revokes the refresh token"""
+        token = self.login_refresh_token(client)
+        response = client.post("/auth/logout", json={"refresh_token": token})
+        assert response.status_code == 204
+
+        response = client.post("/auth/refresh", json={"refresh_token": token})
+        assert response.status_code == 401
+        assert "revoked" in response.json()["detail"]
+
+    def test_refresh_token_is_not_an_access_token(self, client: TestClient, test_user):
+        """Test refresh tokens cannot authenticate API calls and access tokens cannot refresh"""
+        response = client.post(
+            "/auth/login",
+            json={"email": "testuser@example.com", "password": "password123"}
+        )
+        tokens = response.json()
+
+        response = client.get("/users/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+        assert response.status_code == 401
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]})
+        assert response.status_code == 401
+
+    def test_revocation_check_skips_database_on_filter_miss(self, db):
+        """Test unrevoked tokens are answered by the Bloom filter alone"""
+        from sqlalchemy import event
+        from app.core.revocation import RevocationList
+        from app.tests.conftest import engine
+
+        revocations = RevocationList(capacity=1000, error_rate=0.001, sync_interval=3600)
+        revocations.rebuild(db)
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            assert revocations.revoked(db, ["jti:a", "family:b"]) == set()
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert statements == []
+
+    def test_refresh_reads_revocations_only_from_the_filter(self, client: TestClient, test_user, db):
+        """Test a refresh of an unrevoked token runs no query on revoked_tokens"""
+        from sqlalchemy import event
+        from app.core.revocation import revocation_list
+        from app.tests.conftest import engine
+
+        token = self.login_refresh_token(client)
+        revocation_list.rebuild(db)
+        revocation_list._last_sync = time.monotonic()
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            assert client.post("/auth/refresh", json={"refresh_token": token}).status_code == 200
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert not [sql for sql in statements if sql.lstrip().startswith("SELECT") and "revoked_tokens" in sql]
+
+    def test_family_revoked_by_other_worker_stops_refresh(self, client: TestClient, test_user, db):
+        """Test a family revoked elsewhere is refused once this worker syncs"""
+        from datetime import datetime, timedelta
+        from app.core.revocation import RevocationList, family_key, revocation_list
+        from app.core.security import decode_refresh_token
+
+        token = self.login_refresh_token(client)
+        revocation_list.rebuild(db)
+
+        other_worker = RevocationList(sync_interval=3600)
+        family = decode_refresh_token(token)["fam"]
+        other_worker.revoke(db, family_key(family), test_user.id, "logout", datetime.utcnow() + timedelta(days=1))
+
+        revocation_list._last_sync = 0.0
+        response = client.post("/auth/refresh", json={"refresh_token": token})
+        assert response.status_code == 401
+        assert "revoked" in response.json()["detail"]
+
+    def test_rebuild_keeps_newest_row(self, db):
+        """Test pruning expired revocations never lets SQLite reuse a synced id"""
+        from datetime import datetime, timedelta
+        from app.core.revocation import RevocationList
+        from app.models.revoked_token import RevokedToken
+
+        revocations = RevocationList(sync_interval=3600)
+        expired = datetime.utcnow() - timedelta(days=1)
+        for key in ("jti:old", "jti:newest"):
+            revocations.revoke(db, key, None, "rotated", expired)
+        newest_id = db.query(RevokedToken.id).filter(RevokedToken.key == "jti:newest").scalar()
+
+        revocations.rebuild(db)
+        assert [key for (key,) in db.query(RevokedToken.key)] == ["jti:newest"]
+        revocations.revoke(db, "jti:next", None, "rotated", datetime.utcnow() + timedelta(days=1))
+        assert db.query(RevokedToken.id).filter(RevokedToken.key == "jti:next").scalar() > newest_id
+
+    def test_filter_is_built_off_the_request_path(self, db):
+        """Test a lookup before the filter exists reads the table and leaves the build to a thread"""
+        from datetime import datetime, timedelta
+        from app.core.revocation import RevocationList
+
+        RevocationList().revoke(db, "jti:used", None, "rotated", datetime.utcnow() + timedelta(days=1))
+        revocations = RevocationList(capacity=1000, error_rate=0.001, sync_interval=3600)
+        assert revocations.revoked(db, ["jti:used", "jti:fresh"]) == {"jti:used"}
+
+        for _ in range(100):
+            if revocations._last_seen_id is not None:
+                break
+            time.sleep(0.05)
+        assert "jti:used" in revocations._filter
+
+
+class TestBloomFilter:
+    """Bloom filter tests"""
+
+    def test_no_false_negatives(self):
+        """Test every added item is reported present and the false-positive rate holds"""
+        from app.utils.bloom import BloomFilter
+
+        bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+        for i in range(10_000):
+            bloom.add(f"jti:{i}")
+        assert all(f"jti:{i}" in bloom for i in range(10_000))
+        false_positives = sum(f"other:{i}" in bloom for i in range(10_000))
+        assert false_positives < 200
@@ -0,0 +1,98 @@
+"""
+Test cases for document content extraction and search
+"""
+import zlib
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.document import Document
+from app.services.content_index import extract_text, upsert_content
+
+
+def make_pdf(path, page_text: str, compress: bool = True):
+    """Write a minimal PDF whose page content shows `page_text`"""
+    stream = f"BT /F1 12 Tf 72 712 Td ({page_text}) Tj ET".encode()
+    if compress:
+        stream = zlib.compress(stream)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n4 0 obj\n")
+        f.write(f"<< /Length {len(stream)} >>\nstream\n".encode())
+        f.write(stream)
+        f.write(b"\nendstream\nendobj\n%%EOF\n")
+
+
+@pytest.fixture
+def indexed_documents(db, test_user):
+    """Two approved documents and one pending document with indexed content"""
+    bodies = [
+        ("approved", "quarterly invoice for consulting services"),
+        ("approved", "employment contract and invoice appendix invoice"),
+        ("pending", "draft invoice awaiting review"),
+    ]
+    documents = []
+    for i, (status, body) in enumerate(bodies):
+        doc = Document(
+            filename=f"doc{i}.pdf",
+            file_path=f"/uploads/doc{i}.pdf",
+            uploaded_by=test_user.id,
+            status=status
+        )
+        db.add(doc)
+        db.flush()
+        upsert_content(db, doc.id, body)
+        documents.append(doc)
+    db.commit()
+    return documents
+
+
+class TestContentIndex:
+    """Content indexing and search tests"""
+
+    @pytest.mark.parametrize("compress", [True, False])
+    def test_extract_pdf_text(self, tmp_path, compress):
+        """Test text extraction from plain and Flate-compressed PDF streams"""
+        path = tmp_path / "sample.pdf"
+        make_pdf(path, "Signed rental agreement", compress=compress)
+        assert extract_text(str(path), "application/pdf") == "Signed rental agreement"
+
+    def test_extract_png_metadata(self, tmp_path):
+        """Test OCR-free metadata extraction for images"""
+        path = tmp_path / "scan.png"
+        path.write_bytes(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x03\x20\x00\x00\x02\x58")
+        assert extract_text(str(path), "image/png") == "image png 800x600 landscape"
+
+    def test_public_content_search(self, client: TestClient, indexed_documents):
+        """Test public content search only returns approved documents, best match first"""
+        response = client.get("/documents/public/approved?content=invoice")
+        assert response.status_code == 200
+        ids = [doc["id"] for doc in response.json()["documents"]]
+        assert ids == [indexed_documents[1].id, indexed_documents[0].id]
+
+    def test_admin_content_search(self, client: TestClient, admin_token, indexed_documents):
+        """Test admin content search across all statuses"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get("/documents/search/advanced?content=draft invoice", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
+        assert response.json()["documents"][0]["id"] == indexed_documents[2].id
+
+    def test_content_search_requires_words(self, client: TestClient):
+        """Test content search rejects queries without words"""
+        response = client.get("/documents/public/approved?content=***")
+        assert response.status_code == 400
+
+    def test_upload_is_searchable(self, client: TestClient, user_token, admin_token, tmp_path):
+        """Test an uploaded PDF is indexed by the upload itself"""
+        path = tmp_path / "lease.pdf"
+        make_pdf(path, "Signed rental agreement")
+        response = client.post(
+            "/documents/upload",
+            files={"file": ("lease.pdf", path.read_bytes(), "application/pdf")},
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 200
+        document_id = response.json()["document_id"]
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get("/documents/search/advanced?content=rental", headers=headers)
+        assert [doc["id"] for doc in response.json()["documents"]] == [document_id]
@@ -0,0 +1,55 @@
+"""
+Test cases for query deadlines and disconnect cancellation
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core import deadline as deadline_module, metrics
+from app.core.deadline import Deadline, watch_disconnect
+from app.core.exceptions import ClientDisconnected, QueryTimeout
+
+ENDLESS_QUERY = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c")
+
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+class TestDeadline:
+    """Deadline tests"""
+
+    def test_running_statement_interrupted_at_deadline(self, db):
+        """Test an endless query is aborted once the budget is spent"""
+        metrics.reset()
+        with pytest.raises(QueryTimeout):
+            with Deadline(0.2).guard(db):
+                db.execute(ENDLESS_QUERY).scalar()
+        assert metrics.counters()["queries_cancelled_timeout"] == 1
+
+    def test_disconnect_aborts_query(self, db):
+        """Test a disconnected client cancels its query with 499"""
+        deadline = Deadline(60)
+        asyncio.run(watch_disconnect(DisconnectedRequest(), deadline, interval=0))
+        assert deadline.disconnected
+
+        with pytest.raises(ClientDisconnected) as exc_info:
+            with deadline.guard(db):
+                db.execute(ENDLESS_QUERY).scalar()
+        assert exc_info.value.status_code == 499
+
+    def test_fast_query_unaffected(self, db):
+        """Test queries within budget run normally"""
+        with Deadline(5).guard(db):
+            assert db.execute(text("SELECT 1")).scalar() == 1
+
+    def test_search_returns_503_when_budget_spent(self, client: TestClient, admin_token, monkeypatch):
+        """Test a route answers 503 once its budget is exhausted"""
+        monkeypatch.setitem(deadline_module.QUERY_DEADLINE_SECONDS, "search_advanced", 0)
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get("/documents/search/advanced", headers=headers)
+        assert response.status_code == 503
+        assert response.json()["error_code"] == "QUERY_TIMEOUT"
@@ -0,0 +1,71 @@
+"""
+Test cases for the document entity cache
+"""
+from fastapi.testclient import TestClient
+
+from app.core.cache import LRUCache
+from app.core.invalidation import invalidation_bus, TOPIC_DOCUMENT
+from app.models.document import Document
+from app.services.document_cache import document_cache, get_document_snapshot
+
+
+class TestLRUCache:
+    """LRU cache tests"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted first"""
+        cache = LRUCache("test-evict", maxsize=2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+        assert cache.get(2) is None
+        assert cache.get(1) == "a"
+        assert cache.stats()["hits"] == 2
+
+    def test_load_racing_invalidation_is_discarded(self):
+        """Test a value loaded before an invalidation is not stored"""
+        cache = LRUCache("test-race", maxsize=2)
+        token = cache.load_token()
+        cache.invalidate(1)
+        cache.put(1, "stale", token)
+        assert cache.get(1) is None
+
+
+class TestDocumentCache:
+    """Document snapshot cache tests"""
+
+    def test_snapshot_cached_until_invalidated(self, db):
+        """Test lookups hit the cache until the document invalidation is committed"""
+        document_cache.clear()
+        doc = Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2)
+        db.add(doc)
+        db.commit()
+
+        first = get_document_snapshot(db, doc.id)
+        hits = document_cache.hits
+        assert get_document_snapshot(db, doc.id) is first
+        assert document_cache.hits == hits + 1
+
+        doc.status = "approved"
+        invalidation_bus.publish(db, TOPIC_DOCUMENT, doc.id)
+        db.commit()
+        assert get_document_snapshot(db, doc.id).status == "approved"
+
+    def test_delete_invalidates_snapshot(self, client: TestClient, user_token, test_user, db):
+        """Test a deleted document is not served from the cache"""
+        doc = Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=test_user.id)
+        db.add(doc)
+        db.commit()
+        doc_id = doc.id
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        assert client.post(f"/documents/{doc_id}/download-url", headers=headers).status_code == 200
+        assert client.delete(f"/documents/{doc_id}", headers=headers).status_code == 200
+        assert client.post(f"/documents/{doc_id}/download-url", headers=headers).status_code == 404
+
+    def test_cache_stats_endpoint(self, client: TestClient):
+        """Test cache counters are exposed"""
+        response = client.get("/health/cache")
+        assert response.status_code == 200
+        assert "hits" in response.json()["documents"]
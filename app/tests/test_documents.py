@@ -184,3 +184,396 @@ class TestDocuments:
             headers=headers
         )
         assert response.status_code == 403
+
+    def test_thumbnail_not_available(self, client: TestClient, user_token, test_user, db):
+        """Test thumbnail request before the thumbnail has been rendered"""
+        from app.models.document import Document
+
+        doc = Document(
+            filename="test.pdf",
+            file_path="/uploads/test.pdf",
+            content_hash="abc123",
+            uploaded_by=test_user.id,
+            status="pending"
+        )
+        db.add(doc)
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.get(f"/documents/{doc.id}/thumbnail", headers=headers)
+        assert response.status_code == 404
+
+    def test_thumbnail_public_for_approved_document(self, client: TestClient, db, tmp_path, monkeypatch):
+        """Test approved document thumbnails are public and long-lived cacheable"""
+        from app.models.document import Document
+        from app.services import thumbnails
+
+        monkeypatch.setattr(thumbnails, "THUMBNAIL_FOLDER", str(tmp_path))
+        doc = Document(
+            filename="test.png",
+            file_path="/uploads/test.png",
+            content_hash="abc123",
+            uploaded_by=2,
+            status="approved"
+        )
+        db.add(doc)
+        db.commit()
+        with open(thumbnails.thumbnail_path(doc.id, "abc123"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\nthumbnail")
+
+        response = client.get(f"/documents/{doc.id}/thumbnail")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert "immutable" in response.headers["cache-control"]
+
+        cached = client.get(
+            f"/documents/{doc.id}/thumbnail",
+            headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert cached.status_code == 304
+        cached = client.get(
+            f"/documents/{doc.id}/thumbnail",
+            headers={"If-None-Match": f'"other", W/{response.headers["etag"]}'}
+        )
+        assert cached.status_code == 304
+
+    def test_thumbnail_private_for_pending_document(self, client: TestClient, db):
+        """Test pending document thumbnails require authentication"""
+        from app.models.document import Document
+
+        doc = Document(
+            filename="test.pdf",
+            file_path="/uploads/test.pdf",
+            uploaded_by=2,
+            status="pending"
+        )
+        db.add(doc)
+        db.commit()
+
+        response = client.get(f"/documents/{doc.id}/thumbnail")
+        assert response.status_code == 401
+
+    def test_archive_streams_matching_documents(self, client: TestClient, admin_token, db, tmp_path):
+        """Test the archive contains only documents matching the filters"""
+        import zipfile
+        from app.models.document import Document
+
+        for name, status in [("a.pdf", "approved"), ("b.txt", "approved"), ("c.pdf", "pending")]:
+            path = tmp_path / name
+            path.write_bytes(name.encode() * 1000)
+            db.add(Document(filename=name, file_path=str(path), uploaded_by=2, status=status))
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get("/documents/archive?status=approved", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+
+        archive = zipfile.ZipFile(BytesIO(response.content))
+        entries = {info.filename.split("_", 1)[1]: info for info in archive.infolist()}
+        assert set(entries) == {"a.pdf", "b.txt"}
+        assert entries["a.pdf"].compress_type == zipfile.ZIP_STORED
+        assert entries["b.txt"].compress_type == zipfile.ZIP_DEFLATED
+        assert archive.read(entries["a.pdf"]) == b"a.pdf" * 1000
+
+    def test_archive_reads_documents_in_batches(self, client: TestClient, admin_token, db, tmp_path, monkeypatch):
+        """Test the archive holds every match when rows are fetched one batch at a time"""
+        import zipfile
+        import app.routes.documents as documents
+        from app.models.document import Document
+
+        monkeypatch.setattr(documents, "ARCHIVE_QUERY_BATCH", 2)
+        for i in range(5):
+            path = tmp_path / f"{i}.pdf"
+            path.write_bytes(b"%PDF-1.4")
+            db.add(Document(filename=f"{i}.pdf", file_path=str(path), uploaded_by=2, status="approved"))
+        db.commit()
+
+        response = client.get("/documents/archive", headers={"Authorization": f"Bearer {admin_token}"})
+        archive = zipfile.ZipFile(BytesIO(response.content))
+        assert sorted(name.split("_", 1)[1] for name in archive.namelist()) == [f"{i}.pdf" for i in range(5)]
+
+    def test_archive_user_forbidden(self, client: TestClient, user_token):
+        """Test regular users cannot download archives"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.get("/documents/archive", headers=headers)
+        assert response.status_code == 403
+
+    def test_my_documents_delta_sync(self, client: TestClient, user_token, admin_token, test_user, db):
+        """Test sync pages through documents and then returns only changes and deletes"""
+        from app.models.document import Document
+
+        docs = [
+            Document(filename=f"{i}.pdf", file_path=f"/uploads/{i}.pdf", uploaded_by=test_user.id)
+            for i in range(3)
+        ]
+        db.add_all(docs)
+        db.commit()
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        first = client.get("/documents/my?limit=2", headers=headers).json()
+        assert [d["filename"] for d in first["documents"]] == ["0.pdf", "1.pdf"]
+        assert first["has_more"] is True
+
+        second = client.get(f"/documents/my?since={first['watermark']}&limit=2", headers=headers).json()
+        assert [d["filename"] for d in second["documents"]] == ["2.pdf"]
+        assert second["has_more"] is False
+
+        deleted_id = docs[0].id
+        assert client.delete(f"/documents/{deleted_id}", headers=headers).status_code == 200
+        approve = client.put(
+            f"/documents/{docs[1].id}/approve", json={}, headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert approve.status_code == 200
+
+        delta = client.get(f"/documents/my?since={second['watermark']}", headers=headers).json()
+        assert [d["filename"] for d in delta["documents"]] == ["1.pdf"]
+        assert delta["deleted"] == [deleted_id]
+
+        unchanged = client.get(f"/documents/my?since={delta['watermark']}", headers=headers).json()
+        assert unchanged["documents"] == [] and unchanged["deleted"] == []
+
+    def test_delta_sync_follows_commit_order(self, client: TestClient, user_token, test_user, db):
+        """Test a change stamped with an older timestamp but committed later is still synced"""
+        from datetime import datetime
+        from app.models.document import Document
+        from app.services.document_sync import record_change
+
+        doc = Document(filename="late.pdf", file_path="/uploads/late.pdf", uploaded_by=test_user.id)
+        db.add(doc)
+        db.flush()
+        record_change(db, doc.id)
+        db.commit()
+        headers = {"Authorization": f"Bearer {user_token}"}
+        watermark = client.get("/documents/my?limit=10", headers=headers).json()["watermark"]
+
+        # A transaction that read the clock long ago commits only now
+        doc.status = "approved"
+        doc.updated_at = datetime(2000, 1, 1)
+        record_change(db, doc.id)
+        db.commit()
+
+        delta = client.get(f"/documents/my?since={watermark}", headers=headers).json()
+        assert [d["status"] for d in delta["documents"]] == ["approved"]
+
+    def test_my_documents_invalid_watermark(self, client: TestClient, user_token):
+        """Test a malformed watermark is rejected"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.get("/documents/my?since=not-a-cursor", headers=headers)
+        assert response.status_code == 400
+
+    def test_batch_get_applies_visibility(self, client: TestClient, user_token, test_user, db):
+        """Test batch lookup returns visible documents and reports the rest as missing
+
+        Other users' approved documents only expose public fields.
+        """
+        from app.models.document import Document
+
+        own = Document(filename="own.pdf", file_path="/uploads/own.pdf", uploaded_by=test_user.id)
+        other = Document(filename="other.pdf", file_path="/uploads/other.pdf", uploaded_by=test_user.id + 1)
+        public = Document(filename="public.pdf", file_path="/uploads/public.pdf",
+                          uploaded_by=test_user.id + 1, status="approved")
+        db.add_all([own, other, public])
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(
+            "/documents/batch-get?fields=status,filename",
+            json={"ids": [public.id, own.id, other.id, 9999]},
+            headers=headers
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert body["documents"] == [
+            {"id": public.id, "filename": "public.pdf"},
+            {"id": own.id, "status": "pending", "filename": "own.pdf"}
+        ]
+        assert body["missing"] == [other.id, 9999]
+
+    def test_batch_get_rejects_unknown_fields(self, client: TestClient, user_token):
+        """Test unknown sparse fields are rejected"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post("/documents/batch-get?fields=password", json={"ids": [1]}, headers=headers)
+        assert response.status_code == 400
+
+    def test_search_sparse_fields(self, client: TestClient, admin_token, db):
+        """Test the fields parameter narrows search results"""
+        from app.models.document import Document
+
+        db.add(Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2))
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get("/documents/search/advanced?fields=status", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["documents"] == [{"id": 1, "status": "pending"}]
+
+        full = client.get("/documents/search/advanced", headers=headers).json()["documents"][0]
+        assert "file_path" not in full and "approval_comment" in full
+
+    def test_document_details_conditional_get(self, client: TestClient, admin_token, db):
+        """Test detail responses carry an ETag and answer 304 until the document changes"""
+        from datetime import datetime
+        from app.models.document import Document
+
+        doc = Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2)
+        db.add(doc)
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get(f"/documents/{doc.id}", headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert "last-modified" in response.headers
+
+        cached = client.get(f"/documents/{doc.id}", headers={**headers, "If-None-Match": etag})
+        assert cached.status_code == 304
+        cached = client.get(
+            f"/documents/{doc.id}",
+            headers={**headers, "If-Modified-Since": response.headers["last-modified"]}
+        )
+        assert cached.status_code == 304
+
+        from app.core.invalidation import invalidation_bus, TOPIC_DOCUMENT
+
+        doc.status = "approved"
+        doc.updated_at = datetime(2100, 1, 1)
+        invalidation_bus.publish(db, TOPIC_DOCUMENT, doc.id)
+        db.commit()
+        changed = client.get(f"/documents/{doc.id}", headers={**headers, "If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    def test_document_history_conditional_get(self, client: TestClient, admin_token, db):
+        """Test history responses answer 304 for a matching ETag"""
+        from app.models.document import Document
+
+        doc = Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2)
+        db.add(doc)
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get(f"/documents/{doc.id}/history", headers=headers)
+        assert response.status_code == 200
+        cached = client.get(
+            f"/documents/{doc.id}/history",
+            headers={**headers, "If-None-Match": response.headers["etag"]}
+        )
+        assert cached.status_code == 304
+
+    def test_approve_with_stale_if_match(self, client: TestClient, admin_token, db):
+        """Test approving with an outdated If-Match version answers 412"""
+        from app.models.document import Document
+
+        doc = Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2, version=3)
+        db.add(doc)
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {admin_token}", "If-Match": '"2"'}
+        response = client.put(f"/documents/{doc.id}/approve", json={"comment": "ok"}, headers=headers)
+        assert response.status_code == 412
+
+        headers["If-Match"] = '"3"'
+        response = client.put(f"/documents/{doc.id}/approve", json={"comment": "ok"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["version"] == 4
+        assert response.headers["etag"] == '"4"'
+
+    def test_approve_with_if_match_from_get(self, client: TestClient, admin_token, db):
+        """Test the ETag of a document read is accepted by If-Match until the document changes"""
+        from app.models.document import Document
+
+        doc = Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2)
+        db.add(doc)
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        etag = client.get(f"/documents/{doc.id}", headers=headers).headers["etag"]
+        response = client.put(
+            f"/documents/{doc.id}/approve", json={"comment": "ok"}, headers={**headers, "If-Match": etag}
+        )
+        assert response.status_code == 200
+
+        response = client.put(
+            f"/documents/{doc.id}/reject", json={"comment": "no"}, headers={**headers, "If-Match": etag}
+        )
+        assert response.status_code == 412
+
+    def test_concurrent_review_conflict(self, db, test_admin):
+        """Test the reviewer whose read went stale gets 409 and writes nothing"""
+        import pytest
+        from starlette.requests import Request
+        from app.core.exceptions import DocumentConflict
+        from app.models.document import Document
+        from app.models.document_status_history import DocumentStatusHistory
+        from app.routes.documents import review_document
+        from app.tests.conftest import TestingSessionLocal
+
+        doc = Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2)
+        db.add(doc)
+        db.commit()
+        request = Request({"type": "http", "headers": []})
+
+        # Reviewer A has read the pending document; reviewer B approves it first
+        stale = TestingSessionLocal()
+        stale_document = stale.query(Document).filter(Document.id == doc.id).first()
+        review_document(db, request, doc.id, test_admin, "approved", "first")
+
+        with pytest.raises(DocumentConflict):
+            review_document(stale, request, stale_document.id, test_admin, "rejected", "second")
+        stale.close()
+
+        assert db.query(DocumentStatusHistory).filter(DocumentStatusHistory.document_id == doc.id).count() == 1
+
+    def test_review_claims_do_not_overlap(self, client: TestClient, admin_token, db):
+        """Test two admins claiming the queue get disjoint, oldest-first leases"""
+        from datetime import datetime, timedelta
+        from app.core.security import create_access_token_with_role
+        from app.models.document import Document
+        from app.models.user import User
+
+        start = datetime(2024, 1, 1)
+        docs = [
+            Document(filename=f"{i}.pdf", file_path=f"/uploads/{i}.pdf", uploaded_by=2, created_at=start + timedelta(days=i))
+            for i in range(3)
+        ]
+        other = User(email="other-admin@example.com", hashed_password="x", role="admin")
+        db.add_all(docs + [other])
+        db.commit()
+        other_headers = {"Authorization": f"Bearer {create_access_token_with_role(other.id, 'admin', timedelta(minutes=5))}"}
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        response = client.post("/documents/review/claim?n=2", headers=headers)
+        assert response.status_code == 200
+        assert [d["id"] for d in response.json()["documents"]] == [docs[0].id, docs[1].id]
+
+        response = client.post("/documents/review/claim?n=2", headers=other_headers)
+        assert [d["id"] for d in response.json()["documents"]] == [docs[2].id]
+
+        # A document leased to someone else cannot be reviewed by the other admin
+        response = client.put(f"/documents/{docs[0].id}/approve", json={}, headers=other_headers)
+        assert response.status_code == 409
+
+        response = client.put(f"/documents/{docs[0].id}/approve", json={}, headers=headers)
+        assert response.status_code == 200
+        db.refresh(docs[0])
+        assert docs[0].claimed_by is None and docs[0].lease_expires_at is None
+
+    def test_expired_review_lease_is_reclaimed(self, client: TestClient, admin_token, db):
+        """Test a document whose lease timed out goes back to the queue"""
+        from datetime import datetime, timedelta
+        from app.models.document import Document
+
+        doc = Document(
+            filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2,
+            claimed_by=99, lease_expires_at=datetime.utcnow() - timedelta(seconds=1)
+        )
+        db.add(doc)
+        db.commit()
+        updated_at = doc.updated_at
+
+        response = client.post("/documents/review/claim", headers={"Authorization": f"Bearer {admin_token}"})
+        assert [d["id"] for d in response.json()["documents"]] == [doc.id]
+        db.refresh(doc)
+        assert doc.lease_expires_at > datetime.utcnow()
+        assert doc.updated_at == updated_at
@@ -0,0 +1,64 @@
+"""
+Test cases for pre-signed download URLs
+"""
+from fastapi.testclient import TestClient
+
+from app.core.security import create_download_token, verify_download_token
+from app.models.document import Document
+
+
+class TestDownloads:
+    """Signed download URL tests"""
+
+    def test_owner_can_download_pending_document(self, client: TestClient, user_token, test_user, db, tmp_path):
+        """Test the owner mints a URL that serves the file without a token"""
+        path = tmp_path / "report.pdf"
+        path.write_bytes(b"%PDF-1.4 content")
+        doc = Document(filename="report.pdf", file_path=str(path), uploaded_by=test_user.id, status="pending")
+        db.add(doc)
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(f"/documents/{doc.id}/download-url", headers=headers)
+        assert response.status_code == 200
+        url = response.json()["url"]
+        assert url.startswith("/files/")
+
+        download = client.get(url)
+        assert download.status_code == 200
+        assert download.content == b"%PDF-1.4 content"
+        assert download.headers["content-type"] == "application/pdf"
+        assert "report.pdf" in download.headers["content-disposition"]
+
+    def test_pending_document_requires_authentication(self, client: TestClient, db):
+        """Test URLs for unapproved documents are not minted anonymously"""
+        doc = Document(filename="report.pdf", file_path="/uploads/report.pdf", uploaded_by=2, status="pending")
+        db.add(doc)
+        db.commit()
+
+        response = client.post(f"/documents/{doc.id}/download-url")
+        assert response.status_code == 401
+
+    def test_tampered_token_rejected(self, client: TestClient):
+        """Test a token whose payload was changed fails verification"""
+        token, _ = create_download_token(1, "/etc/hosts", "hosts", 60)
+        signature = token.split(".")[1]
+        forged, _ = create_download_token(1, "/etc/passwd", "passwd", 60)
+        response = client.get(f"/files/{forged.split('.')[0]}.{signature}")
+        assert response.status_code == 403
+
+    def test_expired_token_rejected(self):
+        """Test an expired token is not accepted"""
+        token, _ = create_download_token(1, "/uploads/a.pdf", "a.pdf", -1)
+        assert verify_download_token(token) is None
+
+    def test_offload_header(self, client: TestClient, monkeypatch):
+        """Test the proxy offload header replaces the file body"""
+        from app.routes import downloads
+
+        monkeypatch.setattr(downloads, "DOWNLOAD_OFFLOAD_HEADER", "X-Accel-Redirect")
+        token, _ = create_download_token(1, "uploads/a.pdf", "a.pdf", 60)
+        response = client.get(f"/files/{token}")
+        assert response.status_code == 200
+        assert response.headers["x-accel-redirect"] == "/protected/a.pdf"
+        assert response.content == b""
@@ -0,0 +1,133 @@
+"""
+Test cases for the document change feed
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.services import events
+from app.services.events import EventBroker, EVENT_DOCUMENT_STATUS, EVENT_DOCUMENT_UPLOADED, event_broker
+
+
+def publish(db, owner_id: int, document_id: int, broker: EventBroker = event_broker) -> int:
+    row = broker.publish(db, EVENT_DOCUMENT_STATUS, owner_id, {"document_id": document_id, "status": "approved"})
+    db.commit()
+    return row.id
+
+
+class TestEventBroker:
+    """Change feed tests"""
+
+    def test_live_events_delivered_to_matching_subscribers(self, db):
+        """Test subscribers only receive events they accept"""
+        broker = EventBroker(poll_interval=0)
+
+        async def scenario():
+            mine = broker.subscribe(lambda item: item.owner_id == 1)
+            others = broker.subscribe(lambda item: item.owner_id == 2)
+            broker.poll(db)
+            publish(db, 1, 10, broker)
+            broker.poll(db)
+            item = await asyncio.wait_for(mine.queue.get(), timeout=1)
+            return item, others.queue.qsize()
+
+        item, other_count = asyncio.run(scenario())
+        assert item.data == {"document_id": 10, "status": "approved"}
+        assert other_count == 0
+
+    def test_events_of_other_workers_share_ids(self, db):
+        """Test an event committed on one worker reaches another worker's subscriber under its row id"""
+        publishing_worker = EventBroker(poll_interval=0)
+        streaming_worker = EventBroker(poll_interval=0)
+
+        async def scenario():
+            subscriber = streaming_worker.subscribe(lambda item: True)
+            streaming_worker.poll(db)
+            event_id = publish(db, 1, 10, publishing_worker)
+            streaming_worker.poll(db)
+            return event_id, await asyncio.wait_for(subscriber.queue.get(), timeout=1)
+
+        event_id, item = asyncio.run(scenario())
+        assert item.id == event_id
+
+    def test_resume_from_last_event_id(self, db):
+        """Test missed events are replayed from the table"""
+        ids = [publish(db, 1, document_id) for document_id in range(3)]
+        missed, resync = EventBroker().missed(db, lambda item: True, ids[0])
+        assert [item.id for item in missed] == ids[1:]
+        assert resync is False
+
+    def test_resync_when_events_are_gone(self, db):
+        """Test a client whose events were pruned, or too many, or unknown is told to resync"""
+        from app.models.document_event import DocumentEvent
+
+        ids = [publish(db, 1, document_id) for document_id in range(5)]
+        db.query(DocumentEvent).filter(DocumentEvent.id <= ids[2]).delete()
+        db.commit()
+
+        broker = EventBroker()
+        assert broker.missed(db, lambda item: True, ids[0])[1] is True
+        assert broker.missed(db, lambda item: True, ids[-1] + 100)[1] is True
+        assert EventBroker(replay_max=1).missed(db, lambda item: True, ids[2]) == ([], True)
+
+    def test_events_published_only_on_commit(self, db):
+        """Test rolled back events are never recorded"""
+        from app.models.document_event import DocumentEvent
+        from app.models.user import User
+
+        db.add(User(email="rolled@back.com", hashed_password="x", role="user"))
+        db.flush()
+        event_broker.publish(db, EVENT_DOCUMENT_UPLOADED, 1, {"document_id": 1})
+        db.rollback()
+        event_broker.publish(db, EVENT_DOCUMENT_UPLOADED, 1, {"document_id": 2})
+        db.commit()
+        assert [row.data for row in db.query(DocumentEvent)] == ['{"document_id": 2}']
+
+
+class TestEventStream:
+    """SSE endpoint tests"""
+
+    def test_stream_replays_own_status_changes(self, client: TestClient, user_token, test_user, db, monkeypatch):
+        """Test a user receives their own missed status changes but not others'"""
+        monkeypatch.setattr(events, "EVENTS_STREAM_MAX_SECONDS", 0.2)
+        publish(db, test_user.id, 1)
+        publish(db, test_user.id + 1, 2)
+
+        headers = {"Authorization": f"Bearer {user_token}", "Last-Event-ID": "0"}
+        response = client.get("/documents/events", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert '"document_id": 1' in response.text
+        assert '"document_id": 2' not in response.text
+
+    def test_stream_requires_authentication(self, client: TestClient):
+        """Test the change feed requires a token"""
+        response = client.get("/documents/events")
+        assert response.status_code == 401
+
+    def test_stream_accepts_signed_query_token(self, client: TestClient, user_token, test_user, db, monkeypatch):
+        """Test an EventSource-style client authenticates with a token minted for the feed"""
+        monkeypatch.setattr(events, "EVENTS_STREAM_MAX_SECONDS", 0.2)
+        publish(db, test_user.id, 1)
+        publish(db, test_user.id + 1, 2)
+
+        response = client.post("/documents/events/token", headers={"Authorization": f"Bearer {user_token}"})
+        assert response.status_code == 200
+        token = response.json()["token"]
+
+        response = client.get("/documents/events", params={"token": token, "last_event_id": 0})
+        assert response.status_code == 200
+        assert '"document_id": 1' in response.text
+        assert '"document_id": 2' not in response.text
+
+    def test_stream_rejects_invalid_query_tokens(self, client: TestClient):
+        """Test expired, forged and download tokens do not open the feed"""
+        from app.core.security import create_download_token, create_events_token
+
+        expired, _ = create_events_token(1, True, -1)
+        download, _ = create_download_token(1, "/uploads/a.pdf", "a.pdf", 60)
+        valid, _ = create_events_token(1, False, 60)
+        forged = valid.replace(valid.split(".")[0], create_events_token(1, True, 60)[0].split(".")[0])
+        for token in (expired, download, forged, "garbage"):
+            response = client.get("/documents/events", params={"token": token})
+            assert response.status_code == 401
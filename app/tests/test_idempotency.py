@@ -0,0 +1,112 @@
+"""
+Test cases for Idempotency-Key replay
+"""
+import asyncio
+
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.core.idempotency import IdempotencyStore, idempotent_request
+import app.core.idempotency as idempotency
+
+
+def streamed(body: bytes, status_code: int) -> StreamingResponse:
+    """What call_next hands to HTTP middleware"""
+    return StreamingResponse(iter([body]), status_code=status_code)
+
+
+def make_request(key: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/documents/upload",
+        "headers": [(b"idempotency-key", key.encode())],
+        "query_string": b"",
+        "client": ("127.0.0.1", 1234),
+    })
+
+
+class TestIdempotency:
+    """Idempotency-Key tests"""
+
+    def test_retried_approve_is_replayed(self, client: TestClient, admin_token, db):
+        """Test a retried approve returns the first response and changes nothing"""
+        from app.models.document import Document
+        from app.models.document_status_history import DocumentStatusHistory
+
+        doc = Document(filename="a.pdf", file_path="/uploads/a.pdf", uploaded_by=2)
+        db.add(doc)
+        db.commit()
+        headers = {"Authorization": f"Bearer {admin_token}", "Idempotency-Key": "approve-1"}
+
+        first = client.put(f"/documents/{doc.id}/approve", json={"comment": "ok"}, headers=headers)
+        second = client.put(f"/documents/{doc.id}/approve", json={"comment": "ok"}, headers=headers)
+
+        assert first.status_code == second.status_code == 200
+        assert second.json() == first.json()
+        assert second.headers["idempotent-replayed"] == "true"
+        assert db.query(DocumentStatusHistory).filter(DocumentStatusHistory.document_id == doc.id).count() == 1
+
+        # A new key is a new request: the document is no longer pending
+        headers["Idempotency-Key"] = "approve-2"
+        assert client.put(f"/documents/{doc.id}/approve", json={}, headers=headers).status_code == 400
+
+    def test_concurrent_duplicates_wait_for_first(self, monkeypatch, tmp_path):
+        """Test duplicates arriving during the first attempt get its response without running"""
+        monkeypatch.setattr(idempotency, "idempotency_store", IdempotencyStore(str(tmp_path / "keys.db")))
+        calls = []
+
+        async def call_next(request):
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return streamed(f'{{"id":{len(calls)}}}'.encode(), 201)
+
+        async def run():
+            return await asyncio.gather(*[idempotent_request(make_request("k"), call_next) for _ in range(5)])
+
+        responses = asyncio.run(run())
+        assert len(calls) == 1
+        assert all(response.status_code == 201 for response in responses)
+        assert {response.body for response in responses} == {b'{"id":1}'}
+
+    def test_server_errors_are_not_stored(self, monkeypatch, tmp_path):
+        """Test a 5xx attempt can be retried with the same key"""
+        monkeypatch.setattr(idempotency, "idempotency_store", IdempotencyStore(str(tmp_path / "keys.db")))
+        statuses = [503, 200]
+
+        async def call_next(request):
+            return streamed(b"{}", statuses.pop(0))
+
+        async def run():
+            first = await idempotent_request(make_request("k"), call_next)
+            second = await idempotent_request(make_request("k"), call_next)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert (first.status_code, second.status_code) == (503, 200)
+
+    def test_keys_are_shared_between_workers(self, tmp_path):
+        """Test a key claimed by one worker is held, then replayed, for another"""
+        path = str(tmp_path / "keys.db")
+        first, second = IdempotencyStore(path), IdempotencyStore(path)
+
+        assert first.claim("k") == (True, None)
+        assert second.claim("k") == (False, None)
+        first.finish("k", 201, [(b"content-type", b"application/json")], b"{}")
+        assert second.claim("k") == (False, (201, [(b"content-type", b"application/json")], b"{}"))
+
+    def test_expired_keys_are_evicted(self, tmp_path):
+        """Test stored responses and abandoned claims are dropped after their TTL"""
+        store = IdempotencyStore(str(tmp_path / "keys.db"), ttl=0, claim_ttl=0)
+        store.claim("k")
+        store.finish("k", 200, [], b"{}")
+        assert store.claim("k") == (True, None)
+        # A claim whose worker died is taken over
+        assert store.claim("k") == (True, None)
+
+    def test_invalid_key_rejected(self, client: TestClient):
+        """Test an over-long Idempotency-Key answers 400"""
+        response = client.post("/auth/login", json={}, headers={"Idempotency-Key": "x" * 300})
+        assert response.status_code == 400
+        assert response.json()["error_code"] == "INVALID_IDEMPOTENCY_KEY"
@@ -0,0 +1,58 @@
+"""
+Test cases for the cross-worker cache invalidation bus
+"""
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import InvalidationBus, invalidation_bus, TOPIC_DOCUMENT, TOPIC_USER
+
+
+@pytest.fixture
+def user_invalidations():
+    """Collect keys dispatched locally for the user topic"""
+    seen = []
+    invalidation_bus.subscribe(TOPIC_USER, seen.append)
+    yield seen
+    invalidation_bus._handlers[TOPIC_USER].remove(seen.append)
+
+
+class TestInvalidationBus:
+    """Invalidation bus tests"""
+
+    def test_local_handlers_run_after_commit(self, db: Session, user_invalidations):
+        """Test that local handlers only run once the transaction commits"""
+        invalidation_bus.publish(db, TOPIC_USER, 7)
+        assert user_invalidations == []
+        db.commit()
+        assert user_invalidations == ["7"]
+
+    def test_rolled_back_invalidations_are_discarded(self, db: Session, user_invalidations):
+        """Test that a rollback drops pending invalidations"""
+        invalidation_bus.publish(db, TOPIC_USER, 7)
+        db.rollback()
+        db.commit()
+        assert user_invalidations == []
+
+    def test_other_worker_sees_invalidation_on_poll(self, db: Session):
+        """Test that a second worker picks up changes through polling"""
+        worker = InvalidationBus(poll_interval=0)
+        seen = []
+        worker.subscribe(TOPIC_DOCUMENT, seen.append)
+
+        worker.poll(db)  # establishes the starting position
+        invalidation_bus.publish(db, TOPIC_DOCUMENT, 42)
+        invalidation_bus.publish(db, TOPIC_DOCUMENT)
+        db.commit()
+
+        worker.poll(db)
+        assert seen == ["42", None]
+
+        worker.poll(db)
+        assert seen == ["42", None]
+
+    def test_update_user_publishes_invalidation(self, client, admin_token, test_user, user_invalidations):
+        """Test that changing a user's role invalidates cached copies of that user"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.patch(f"/users/{test_user.id}", json={"role": "admin"}, headers=headers)
+        assert response.status_code == 200
+        assert user_invalidations == [str(test_user.id)]
@@ -0,0 +1,84 @@
+"""
+Test cases for on-demand request profiling
+"""
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import profiling
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    """Redirect the profile spool to a temporary directory"""
+    monkeypatch.setattr(profiling, "PROFILE_SPOOL_DIR", str(tmp_path))
+    profiling.profile_gate.reset()
+    yield tmp_path
+    profiling.profile_gate.reset()
+
+
+class TestProfiling:
+    """Profiling middleware tests"""
+
+    def test_admin_request_is_profiled(self, client: TestClient, admin_token, spool_dir):
+        """Test that an admin can profile a single request"""
+        headers = {"Authorization": f"Bearer {admin_token}", "X-Profile": "1"}
+        response = client.get("/documents/search/advanced", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["X-Profile-Status"] == "recorded"
+
+        profile_file = spool_dir / f"{response.headers['X-Profile-Id']}.collapsed"
+        assert profile_file.exists()
+        assert profile_file.read_text().startswith("# GET /documents/search/advanced")
+
+    def test_user_request_is_not_profiled(self, client: TestClient, user_token, spool_dir):
+        """Test that regular users cannot trigger profiling"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.get("/documents/my?_profile=1", headers=headers)
+        assert response.status_code == 200
+        assert "X-Profile-Status" not in response.headers
+        assert os.listdir(spool_dir) == []
+
+    def test_profiling_is_rate_limited(self, client: TestClient, admin_token, spool_dir):
+        """Test that back-to-back profiles are rate limited"""
+        headers = {"Authorization": f"Bearer {admin_token}", "X-Profile": "1"}
+        first = client.get("/documents/", headers=headers)
+        second = client.get("/documents/", headers=headers)
+        assert first.headers["X-Profile-Status"] == "recorded"
+        assert second.headers["X-Profile-Status"] == "rate-limited"
+        assert second.status_code == 200
+
+    def test_sampler_only_samples_the_request(self):
+        """Test threads busy with other work are left out of the profile"""
+        import threading
+        import time
+        import anyio
+
+        def spin(seconds: float):
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                pass
+
+        def profiled_work():
+            spin(0.3)
+
+        def other_work():
+            spin(0.3)
+
+        profiling.install_thread_registry()
+        sampler = profiling.StackSampler(interval=0.01)
+
+        async def request():
+            profiling._profiled_request.set(sampler)
+            await anyio.to_thread.run_sync(profiled_work)
+
+        other = threading.Thread(target=other_work)
+        sampler.start()
+        other.start()
+        anyio.run(request)
+        other.join()
+        stacks = sampler.stop()
+
+        assert any("profiled_work" in stack for stack in stacks)
+        assert not any("other_work" in stack for stack in stacks)
+        assert not sampler._threads  # the worker left the registry with its work
@@ -0,0 +1,141 @@
+"""
+Test cases for per-user storage quotas
+"""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.exceptions import QuotaExceeded
+from app.core.quota import recount, reserve_storage
+from app.models.document import Document
+import app.routes.documents as documents
+
+
+def upload(client: TestClient, token: str, content: bytes, filename: str = "quota.pdf"):
+    return client.post(
+        "/documents/upload",
+        files={"file": (filename, content, "application/pdf")},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+
+
+class TestStorageQuota:
+    """Storage quota tests"""
+
+    def test_usage_follows_upload_and_delete(self, client: TestClient, user_token, test_user, db):
+        """Test counters grow on upload and shrink on delete"""
+        response = upload(client, user_token, b"%PDF-1.4 " + b"x" * 991)
+        assert response.status_code == 200
+        db.refresh(test_user)
+        assert (test_user.storage_used_bytes, test_user.document_count) == (1000, 1)
+        assert db.get(Document, response.json()["document_id"]).size_bytes == 1000
+
+        response = client.delete(
+            f"/documents/{response.json()['document_id']}",
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 200
+        db.refresh(test_user)
+        assert (test_user.storage_used_bytes, test_user.document_count) == (0, 0)
+
+    def test_delete_removes_file_and_thumbnail(self, client: TestClient, user_token, db, tmp_path, monkeypatch):
+        """Test deleting a document frees its disk space, not only its quota"""
+        from app.services import thumbnails
+
+        monkeypatch.setattr(thumbnails, "THUMBNAIL_FOLDER", str(tmp_path))
+        response = upload(client, user_token, b"%PDF-1.4 delete me")
+        document = db.get(Document, response.json()["document_id"])
+        thumbnail = thumbnails.thumbnail_path(document.id, document.content_hash)
+        open(thumbnail, "wb").close()
+
+        response = client.delete(f"/documents/{document.id}", headers={"Authorization": f"Bearer {user_token}"})
+        assert response.status_code == 200
+        assert not os.path.exists(document.file_path)
+        assert not os.path.exists(thumbnail)
+
+    def test_upload_over_quota_rejected(self, client: TestClient, user_token, test_user, db):
+        """Test an upload that does not fit is refused without creating a document"""
+        test_user.storage_quota_bytes = 500
+        db.commit()
+
+        response = upload(client, user_token, b"%PDF-1.4 " + b"x" * 991)
+        assert response.status_code == 413
+        assert response.json()["error_code"] == "STORAGE_QUOTA_EXCEEDED"
+        assert db.query(Document).count() == 0
+
+    def test_refused_reservation_removes_file(self, client: TestClient, user_token, db, monkeypatch):
+        """Test a reservation refused after the file was written leaves no orphan file"""
+        saved = []
+        real_save_file = documents.save_file
+
+        def save_file(file):
+            saved.append(real_save_file(file))
+            return saved[-1]
+
+        def reserve_storage(db, user, size):
+            raise QuotaExceeded(0)
+
+        monkeypatch.setattr(documents, "save_file", save_file)
+        monkeypatch.setattr(documents, "reserve_storage", reserve_storage)
+
+        response = upload(client, user_token, b"%PDF-1.4 race")
+        assert response.status_code == 413
+        assert not os.path.exists(saved[0].path)
+
+    def test_same_filename_does_not_overwrite(self, client: TestClient, user_token, db):
+        """Test two uploads with one filename are stored as two files"""
+        first = upload(client, user_token, b"%PDF-1.4 first")
+        second = upload(client, user_token, b"%PDF-1.4 second")
+        paths = [db.get(Document, r.json()["document_id"]).file_path for r in (first, second)]
+        assert paths[0] != paths[1]
+        assert [open(path, "rb").read() for path in paths] == [b"%PDF-1.4 first", b"%PDF-1.4 second"]
+
+    def test_content_length_precheck(self, client: TestClient, user_token, test_user, db, monkeypatch):
+        """Test the middleware refuses an oversized upload from its Content-Length alone"""
+        test_user.storage_quota_bytes = 10_000
+        db.commit()
+        monkeypatch.setattr("app.routes.documents.save_file", lambda file: pytest.fail("route reached"))
+
+        response = upload(client, user_token, b"x" * 50_000)
+        assert response.status_code == 413
+
+    def test_reservation_is_atomic(self, test_user, db):
+        """Test a reservation that would pass the quota is refused at the database"""
+        test_user.storage_quota_bytes = 1500
+        db.commit()
+
+        reserve_storage(db, test_user, 1000)
+        with pytest.raises(QuotaExceeded):
+            reserve_storage(db, test_user, 1000)
+        db.commit()
+        db.refresh(test_user)
+        assert test_user.storage_used_bytes == 1000
+
+    def test_recount_rebuilds_counters(self, test_user, db):
+        """Test recount sums sizes into the usage counters"""
+        db.add_all([
+            Document(filename="a", file_path="/missing/a", uploaded_by=test_user.id, size_bytes=300),
+            Document(filename="b", file_path="/missing/b", uploaded_by=test_user.id, size_bytes=None),
+        ])
+        db.commit()
+
+        recount(db)
+        db.refresh(test_user)
+        assert (test_user.storage_used_bytes, test_user.document_count) == (300, 2)
+
+    def test_storage_report(self, client: TestClient, admin_token, test_user, db):
+        """Test the admin report lists users by usage with their quota"""
+        test_user.storage_used_bytes = 4096
+        test_user.storage_quota_bytes = 8192
+        db.commit()
+
+        response = client.get("/users/storage", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        first = response.json()[0]
+        assert (first["id"], first["storage_quota_bytes"], first["usage_ratio"]) == (test_user.id, 8192, 0.5)
+
+    def test_storage_report_non_admin(self, client: TestClient, user_token):
+        """Test that non-admins cannot read the storage report"""
+        response = client.get("/users/storage", headers={"Authorization": f"Bearer {user_token}"})
+        assert response.status_code == 403
@@ -0,0 +1,73 @@
+"""
+Test cases for admission control
+"""
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit
+from app.core.rate_limit import MemoryBucketStore, SqliteBucketStore, is_exempt
+
+
+class TestBucketStores:
+    """Token bucket tests"""
+
+    def test_memory_bucket_allows_burst_then_limits(self):
+        """Test a bucket admits its burst and then reports when to retry"""
+        store = MemoryBucketStore()
+        results = [store.take("ip:1", 1, rate=1, burst=3) for _ in range(4)]
+        assert [allowed for allowed, _ in results] == [True, True, True, False]
+        assert 0 < results[-1][1] <= 1
+
+    def test_buckets_are_independent(self):
+        """Test one noisy key does not drain another"""
+        store = MemoryBucketStore()
+        store.take("ip:noisy", 5, rate=1, burst=5)
+        assert store.take("ip:noisy", 1, rate=1, burst=5)[0] is False
+        assert store.take("ip:quiet", 1, rate=1, burst=5)[0] is True
+
+    def test_sqlite_bucket_shared_between_stores(self, tmp_path):
+        """Test two stores on the same file (two workers) share one budget"""
+        path = str(tmp_path / "buckets.db")
+        first, second = SqliteBucketStore(path), SqliteBucketStore(path)
+        assert first.take("user:1", 2, rate=0.1, burst=3)[0] is True
+        assert second.take("user:1", 2, rate=0.1, burst=3)[0] is False
+
+    def test_sqlite_idle_buckets_are_pruned(self, tmp_path):
+        """Test admitting requests periodically deletes idle buckets"""
+        store = SqliteBucketStore(str(tmp_path / "buckets.db"), prune_interval=0)
+        store.take("ip:idle", 1, rate=1, burst=5)
+        store._connection().execute(
+            "UPDATE rate_limit_buckets SET updated = updated - ?", (rate_limit.IDLE_SECONDS + 1,)
+        )
+        store.take("ip:active", 1, rate=1, burst=5)
+        keys = [key for (key,) in store._connection().execute("SELECT key FROM rate_limit_buckets")]
+        assert keys == ["ip:active"]
+
+    def test_exempt_paths(self):
+        """Test exemptions match whole path segments only"""
+        assert is_exempt("/health")
+        assert is_exempt("/docs/oauth2-redirect")
+        assert not is_exempt("/documents/my")
+
+
+class TestRateLimitMiddleware:
+    """Middleware tests"""
+
+    def test_login_limited_per_ip_with_retry_after(self, client: TestClient, monkeypatch):
+        """Test expensive routes exhaust the IP budget and get 429 with Retry-After"""
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_IP_BURST", 20)
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_IP_RATE", 0.1)
+        credentials = {"email": "nobody@example.com", "password": "wrong"}
+
+        statuses = [client.post("/auth/login", json=credentials).status_code for _ in range(3)]
+        assert statuses[:2] == [401, 401]
+        assert statuses[2] == 429
+
+        response = client.post("/auth/login", json=credentials)
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert response.json()["error_code"] == "RATE_LIMITED"
+
+    def test_health_is_exempt(self, client: TestClient, monkeypatch):
+        """Test health checks are never limited"""
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_IP_BURST", 1)
+        assert all(client.get("/health").status_code == 200 for _ in range(5))
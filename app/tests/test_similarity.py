@@ -0,0 +1,162 @@
+"""
+Test cases for near-duplicate detection
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.document import Document
+from app.models.document_signature import DocumentSignature
+from app.services import similarity as similarity_service
+from app.services.similarity import (
+    KIND_DHASH,
+    KIND_MINHASH,
+    find_duplicates,
+    lsh_buckets,
+    minhash,
+    probe_buckets,
+    similarity,
+    store_signature
+)
+
+ORIGINAL = (
+    "This rental agreement is made between the landlord and the tenant for the "
+    "property located at 12 Main Street. The monthly rent is payable on the first "
+    "day of each month and the deposit is returned within thirty days of the end "
+    "of the tenancy provided the property is left in good condition."
+)
+RESCANNED = ORIGINAL.replace("thirty days", "30 days")
+UNRELATED = (
+    "Quarterly financial report covering revenue growth, operating costs and the "
+    "outlook for the next fiscal year across all regional business units."
+)
+
+
+def add_document(db, owner_id: int, filename: str) -> Document:
+    doc = Document(filename=filename, file_path=f"/uploads/{filename}", uploaded_by=owner_id, status="pending")
+    db.add(doc)
+    db.flush()
+    return doc
+
+
+class TestSimilarity:
+    """Near-duplicate detection tests"""
+
+    def test_minhash_estimates_similarity(self):
+        """Test MinHash scores near-duplicates high and unrelated text low"""
+        original = minhash(ORIGINAL)
+        assert similarity(KIND_MINHASH, original, minhash(RESCANNED)) >= 0.8
+        assert similarity(KIND_MINHASH, original, minhash(UNRELATED)) < 0.2
+
+    def test_dhash_close_hashes_share_a_bucket(self):
+        """Test images within a few bits always share at least one LSH bucket"""
+        original = [0x0F0F_F0F0_1234_ABCD]
+        edited = [original[0] ^ 0b1000_0000_0100_0001]  # 3 bits differ
+        assert set(lsh_buckets(KIND_DHASH, original)) & set(probe_buckets(KIND_DHASH, edited))
+        assert similarity(KIND_DHASH, original, edited) == pytest.approx(1 - 3 / 64)
+
+    def test_dhash_probe_covers_spread_edits(self):
+        """Test 7 differing bits spread over every band are still found by multi-probe"""
+        original = [0x0F0F_F0F0_1234_ABCD]
+        edited = [original[0] ^ (0b11 | 0b11 << 16 | 0b11 << 32 | 0b1 << 48)]
+        assert not set(lsh_buckets(KIND_DHASH, original)) & set(lsh_buckets(KIND_DHASH, edited))
+        assert set(lsh_buckets(KIND_DHASH, original)) & set(probe_buckets(KIND_DHASH, edited))
+
+    def test_find_duplicates_caps_candidates(self, db, test_user):
+        """Test a crowded bucket is checked up to the candidate cap only"""
+        copies = [add_document(db, test_user.id, f"copy{i}.pdf") for i in range(3)]
+        for doc in copies:
+            store_signature(db, doc.id, KIND_MINHASH, minhash(ORIGINAL))
+        db.commit()
+
+        matches = find_duplicates(db, KIND_MINHASH, minhash(ORIGINAL), max_candidates=2)
+        assert {match["document_id"] for match in matches} == {copies[2].id, copies[1].id}
+
+    def test_find_duplicates(self, db, test_user):
+        """Test lookup returns near-duplicates only"""
+        original = add_document(db, test_user.id, "lease.pdf")
+        unrelated = add_document(db, test_user.id, "report.pdf")
+        store_signature(db, original.id, KIND_MINHASH, minhash(ORIGINAL))
+        store_signature(db, unrelated.id, KIND_MINHASH, minhash(UNRELATED))
+        db.commit()
+
+        matches = find_duplicates(db, KIND_MINHASH, minhash(RESCANNED))
+        assert [match["document_id"] for match in matches] == [original.id]
+
+    def test_document_details_show_duplicates(self, client: TestClient, admin_token, db, test_user):
+        """Test the admin detail view surfaces likely duplicates"""
+        original = add_document(db, test_user.id, "lease.pdf")
+        copy = add_document(db, test_user.id, "lease_scan.pdf")
+        store_signature(db, original.id, KIND_MINHASH, minhash(ORIGINAL))
+        store_signature(db, copy.id, KIND_MINHASH, minhash(RESCANNED))
+        db.commit()
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get(f"/documents/{copy.id}", headers=headers)
+        assert response.status_code == 200
+        duplicates = response.json()["possible_duplicates"]
+        assert [duplicate["document_id"] for duplicate in duplicates] == [original.id]
+
+    def test_late_analysis_skips_deleted_document(self, db, monkeypatch):
+        """Test an analysis finishing after the document was deleted stores nothing"""
+        from concurrent.futures import Future
+        from sqlalchemy import text
+        from app.services.content_index import CONTENT_TABLE
+        from app.tests.conftest import TestingSessionLocal
+
+        future = Future()
+        future.set_result((ORIGINAL, (KIND_MINHASH, minhash(ORIGINAL))))
+        monkeypatch.setattr(similarity_service, "SessionLocal", TestingSessionLocal)
+        similarity_service.store_analysis_when_ready(12345, future)
+
+        assert db.execute(text(f"SELECT count(*) FROM {CONTENT_TABLE}")).scalar() == 0
+        assert db.query(DocumentSignature).count() == 0
+
+    def test_analysis_finishing_after_timeout_is_stored(self, client: TestClient, user_token, db, monkeypatch):
+        """Test an analysis that completes right after the upload stopped waiting is still stored"""
+        from concurrent.futures import Future
+        import app.routes.documents as documents
+        from app.tests.conftest import TestingSessionLocal
+
+        future = Future()
+
+        def wait_for_analysis(job):
+            result = similarity_service.wait_for_analysis(job, timeout=0)
+            future.set_result((ORIGINAL, (KIND_MINHASH, minhash(ORIGINAL))))
+            return result
+
+        monkeypatch.setattr(documents, "start_analysis", lambda path, content_type: future)
+        monkeypatch.setattr(documents, "wait_for_analysis", wait_for_analysis)
+        monkeypatch.setattr(similarity_service, "SessionLocal", TestingSessionLocal)
+
+        response = client.post(
+            "/documents/upload",
+            files={"file": ("lease.pdf", b"%PDF-1.4 lease", "application/pdf")},
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 200
+        stored = db.query(DocumentSignature.document_id).all()
+        assert stored == [(response.json()["document_id"],)]
+
+    def test_details_etag_scoped_to_duplicate_set(self, client: TestClient, admin_token, db, test_user):
+        """Test the detail ETag ignores unrelated changes but follows new duplicates"""
+        from app.core.invalidation import invalidation_bus, TOPIC_DOCUMENT
+
+        original = add_document(db, test_user.id, "lease.pdf")
+        store_signature(db, original.id, KIND_MINHASH, minhash(ORIGINAL))
+        db.commit()
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        etag = client.get(f"/documents/{original.id}", headers=headers).headers["etag"]
+
+        unrelated = add_document(db, test_user.id, "report.pdf")
+        store_signature(db, unrelated.id, KIND_MINHASH, minhash(UNRELATED))
+        invalidation_bus.publish(db, TOPIC_DOCUMENT, unrelated.id)
+        db.commit()
+        cached = client.get(f"/documents/{original.id}", headers={**headers, "If-None-Match": etag})
+        assert cached.status_code == 304
+
+        copy = add_document(db, test_user.id, "lease_scan.pdf")
+        store_signature(db, copy.id, KIND_MINHASH, minhash(RESCANNED))
+        db.commit()
+        changed = client.get(f"/documents/{original.id}", headers={**headers, "If-None-Match": etag})
+        assert changed.status_code == 200
+        assert [d["document_id"] for d in changed.json()["possible_duplicates"]] == [copy.id]
@@ -0,0 +1,105 @@
+"""
+Test cases for single-flight request coalescing
+"""
+import threading
+import time
+
+from app.core.singleflight import SingleFlight
+
+
+def run_concurrently(count: int, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestSingleFlight:
+    """Single-flight tests"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test identical concurrent calls run the function once"""
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"total": 1}
+
+        results, _ = run_concurrently(10, lambda: flight.do("key", slow))
+        assert len(calls) == 1
+        assert all(result == {"total": 1} for result in results)
+
+    def test_errors_are_shared(self):
+        """Test waiters receive the leader's exception"""
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.2)
+            raise ValueError("boom")
+
+        _, errors = run_concurrently(5, lambda: flight.do("key", failing))
+        assert all(isinstance(error, ValueError) for error in errors)
+
+    def test_waiter_cap_runs_extra_callers_directly(self):
+        """Test callers beyond the waiter cap compute on their own"""
+        flight = SingleFlight(max_waiters=1)
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return 1
+
+        run_concurrently(5, lambda: flight.do("key", slow))
+        assert 2 <= len(calls) <= 4
+
+    def test_sequential_calls_are_not_cached(self):
+        """Test a finished call is not reused by later callers"""
+        flight = SingleFlight()
+        assert flight.do("key", lambda: 1) == 1
+        assert flight.do("key", lambda: 2) == 2
+
+    def test_timeout_falls_back_to_own_call(self):
+        """Test a waiter that times out computes the result itself"""
+        flight = SingleFlight(timeout=0.05)
+        started = threading.Event()
+
+        def leader():
+            started.set()
+            time.sleep(0.5)
+            return "leader"
+
+        thread = threading.Thread(target=lambda: flight.do("key", leader))
+        thread.start()
+        started.wait()
+        assert flight.do("key", lambda: "own") == "own"
+        thread.join()
+
+    def test_waiters_retry_on_leader_specific_errors(self):
+        """Test waiters compute themselves when the leader failed for its own reasons"""
+        flight = SingleFlight()
+        calls = []
+
+        def call():
+            calls.append(1)
+            time.sleep(0.2)
+            if len(calls) == 1:
+                raise KeyError("leader only")
+            return "ok"
+
+        results, errors = run_concurrently(3, lambda: flight.do("key", call, retry_on=(KeyError,)))
+        assert sum(isinstance(error, KeyError) for error in errors) == 1
+        assert results.count("ok") == 2
@@ -1,10 +1,19 @@
 """
 Test cases for user management endpoints
 """
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 
 
+def import_lines(response) -> tuple:
+    """(every row result, summary) of a streamed import response"""
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1]["type"] == "summary"
+    return [result for line in lines[:-1] for result in line["results"]], lines[-1]
+
+
 class TestUsers:
     """User management endpoint tests"""
     
@@ -91,3 +100,114 @@ class TestUsers:
             headers=headers
         )
         assert response.status_code == 403
+    
+    def test_list_users_sparse_fields(self, client: TestClient, admin_token, test_user):
+        """Test the fields parameter narrows the user payload"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get("/users/?fields=role", headers=headers)
+        assert response.status_code == 200
+        assert all(set(user) == {"id", "role"} for user in response.json())
+
+    def test_import_users_csv(self, client: TestClient, admin_token, test_user):
+        """Test a CSV import reports created, duplicate and invalid rows"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        csv_data = (
+            "email,password,role\n"
+            "new1@example.com,secret1,user\n"
+            "testuser@example.com,password123,\n"
+            "not-an-email,secret,\n"
+            "new1@example.com,again,\n"
+            "new2@example.com,secret2,admin\n"
+        )
+        response = client.post(
+            "/users/import",
+            files={"file": ("users.csv", csv_data, "text/csv")},
+            headers=headers
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        results, summary = import_lines(response)
+        assert (summary["created"], summary["duplicates"], summary["invalid"]) == (2, 2, 1)
+        assert [r["status"] for r in results] == ["created", "duplicate", "invalid", "duplicate", "created"]
+
+        login = client.post("/auth/login", json={"email": "new2@example.com", "password": "secret2"})
+        assert login.status_code == 200
+
+    def test_import_users_ndjson(self, client: TestClient, admin_token):
+        """Test an NDJSON import reports lines that are not JSON objects"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        ndjson = '{"email": "a@example.com", "password": "x"}\n{broken\n\n[1]\n'
+        response = client.post(
+            "/users/import",
+            files={"file": ("users.ndjson", ndjson, "application/x-ndjson")},
+            headers=headers
+        )
+        assert response.status_code == 200
+        results, _ = import_lines(response)
+        assert [(r["row"], r["status"]) for r in results] == [(1, "created"), (2, "invalid"), (3, "invalid")]
+
+    def test_import_users_non_admin(self, client: TestClient, user_token):
+        """Test that non-admins cannot import users"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(
+            "/users/import",
+            files={"file": ("users.csv", "email,password\n", "text/csv")},
+            headers=headers
+        )
+        assert response.status_code == 403
+
+    def test_import_hashing_is_bounded(self, monkeypatch):
+        """Test an import keeps a bounded number of hashing jobs queued in its own pool"""
+        from concurrent.futures import Future
+        from app.services import user_import
+
+        queued = []
+        outstanding = []
+
+        class Job(Future):
+            def result(self, timeout=None):
+                outstanding.remove(self)
+                return [f"hashed:{password}" for password in self.passwords]
+
+        def submit_to(pool, fn, passwords):
+            assert pool == user_import.POOL_IMPORT
+            job = Job()
+            job.passwords = passwords
+            outstanding.append(job)
+            queued.append(len(outstanding))
+            return job
+
+        monkeypatch.setattr(user_import, "submit_to", submit_to)
+        passwords = [str(i) for i in range(50)]
+        assert user_import._hash_in_pool(passwords) == [f"hashed:{password}" for password in passwords]
+        assert max(queued) <= user_import.USER_IMPORT_MAX_IN_FLIGHT
+
+    def test_import_yields_each_committed_chunk(self, db, monkeypatch):
+        """Test results are produced chunk by chunk, followed by the totals"""
+        from app.services import user_import
+
+        monkeypatch.setattr(user_import, "_hash_in_pool", lambda passwords: [f"hashed:{p}" for p in passwords])
+        rows = [(i, {"email": f"user{i}@example.com", "password": "x"}) for i in range(1, 6)]
+        lines = list(user_import.import_users(db, rows, chunk_size=2, max_rows=4))
+
+        assert [[r["row"] for r in line["results"]] for line in lines[:-1]] == [[1, 2], [3, 4]]
+        assert lines[-1] == {"type": "summary", "created": 4, "duplicates": 0, "invalid": 0, "truncated": True}
+
+    def test_import_bad_header_rejected_before_streaming(self, client: TestClient, admin_token):
+        """Test a CSV without the required columns gets a 400, not a broken stream"""
+        response = client.post(
+            "/users/import",
+            files={"file": ("users.csv", "name,secret\nx,y\n", "text/csv")},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 400
+
+    def test_import_skips_concurrently_registered_email(self, db, test_user):
+        """Test a chunk racing a registration inserts the rest and skips the taken email"""
+        from app.services.user_import import _insert_chunk
+
+        created = _insert_chunk(db, [
+            {"email": test_user.email, "hashed_password": "x", "role": "user"},
+            {"email": "fresh@example.com", "hashed_password": "x", "role": "user"},
+        ])
+        assert list(created) == ["fresh@example.com"]
@@ -0,0 +1,38 @@
+"""
+Bloom filter
+
+A fixed-size bit array answering "definitely not present" or "maybe present"
+in O(k) for k hash probes, whatever the number of items. Sized from the
+expected capacity and the acceptable false-positive rate.
+"""
+import hashlib
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k probes from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def is_full(self) -> bool:
+        """True once more items were added than it was sized for"""
+        return self.count >= self.capacity
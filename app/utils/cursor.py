@@ -0,0 +1,18 @@
+import base64
+import json
+from app.core.exceptions import InvalidRequest
+
+
+def encode_cursor(position: dict) -> str:
+    """Encode a pagination/sync position as an opaque URL-safe token"""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        raise InvalidRequest("Invalid cursor")
+    if not isinstance(position, dict):
+        raise InvalidRequest("Invalid cursor")
+    return position
@@ -0,0 +1,69 @@
+"""
+Sparse field selection (`fields=id,status,...`)
+
+Only the selected columns are loaded, so callers only pay for what they use.
+Endpoints with a fixed response_model return sparse results through
+sparse_response() so the partial dicts skip model validation.
+"""
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.exceptions import InvalidRequest
+from app.models.document import Document
+from app.models.user import User
+
+DOCUMENT_FIELDS = {
+    "id": Document.id,
+    "filename": Document.filename,
+    "file_path": Document.file_path,
+    "status": Document.status,
+    "uploaded_by": Document.uploaded_by,
+    "approved_by": Document.approved_by,
+    "approval_date": Document.approval_date,
+    "approval_comment": Document.approval_comment,
+    "created_at": Document.created_at,
+    "updated_at": Document.updated_at,
+    "version": Document.version,
+}
+
+# Fields exposed by the public approved listing
+PUBLIC_DOCUMENT_FIELDS = {
+    "id": Document.id,
+    "filename": Document.filename,
+    "created_at": Document.created_at,
+    "uploaded_by_id": Document.uploaded_by.label("uploaded_by_id"),
+    "file_path": Document.file_path,
+}
+
+USER_FIELDS = {
+    "id": User.id,
+    "email": User.email,
+    "role": User.role,
+}
+
+
+def parse_fields(fields: Optional[str], allowed: dict, default: Optional[list] = None) -> list:
+    """Parse a comma-separated field list; `id` is always included"""
+    if not fields:
+        return list(default or allowed)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise InvalidRequest(
+            f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}"
+        )
+    return ["id"] + [name for name in dict.fromkeys(names) if name != "id"]
+
+
+def project(row, names: list) -> dict:
+    """Build the response dict of the selected fields from a result row"""
+    return {name: getattr(row, name) for name in names}
+
+
+def columns(names: list, allowed: dict) -> list:
+    """The columns to load for the selected fields"""
+    return [allowed[name] for name in names if allowed.get(name) is not None]
+
+
+def sparse_response(content, headers: Optional[dict] = None) -> JSONResponse:
+    return JSONResponse(jsonable_encoder(content), headers=headers)
@@ -1,8 +1,26 @@
+import hashlib
 import os
+import uuid
+from typing import NamedTuple
 from fastapi import UploadFile, HTTPException
 from app.core.config import UPLOAD_FOLDER, MAX_FILE_SIZE, ALLOWED_TYPES
 
-def save_file(file: UploadFile):
+
+class SavedFile(NamedTuple):
+    path: str
+    content_hash: str  # sha256 hex digest of the file content
+    size: int
+
+
+def upload_size(file: UploadFile) -> int:
+    """Size of an already received upload, without reading it"""
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+def save_file(file: UploadFile) -> SavedFile:
     if file.content_type not in ALLOWED_TYPES:
         raise HTTPException(400, "Invalid file type")
 
@@ -12,9 +30,18 @@ def save_file(file: UploadFile):
 
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-    path = os.path.join(UPLOAD_FOLDER, file.filename)
+    # Unique name: uploads sharing a filename must not overwrite each other
+    path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}_{os.path.basename(file.filename)}")
 
     with open(path, "wb") as f:
         f.write(content)
 
-    return path
+    return SavedFile(path=path, content_hash=hashlib.sha256(content).hexdigest(), size=len(content))
+
+
+def remove_file(path: str):
+    """Delete a stored file, ignoring one that is already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,85 @@
+"""
+Conditional GET helpers
+
+Endpoints look up a cheap version (timestamps/ids from indexed columns),
+derive a strong ETag and Last-Modified from it, and answer 304 before
+building the response when the client's copy is current.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def make_etag(*parts, version: Optional[int] = None) -> str:
+    """Strong ETag over the given version parts
+
+    Pass the entity `version` to prefix it, so the tag can be echoed in
+    If-Match on updates of that entity.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    if version is not None:
+        return f'"{version}-{digest}"'
+    return f'"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime as an HTTP date"""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when no If-None-Match was sent"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison is allowed for If-None-Match
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def version_etag(version: int) -> str:
+    """Strong ETag of an entity version, used with If-Match on updates"""
+    return f'"{version}"'
+
+
+def if_match_satisfied(request: Request, version: int) -> bool:
+    """Evaluate If-Match against an entity version; true when the header is absent
+
+    Accepts the bare version_etag of update responses and the version-prefixed
+    make_etag of reads. Weak tags never match.
+    """
+    if_match = request.headers.get("if-match")
+    if if_match is None or if_match.strip() == "*":
+        return True
+    expected = version_etag(version)
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag == expected or tag.startswith(f'"{version}-'):
+            return True
+    return False
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,70 @@
+"""
+Streaming ZIP writer
+
+zipfile writes into a buffer that refuses seek(), which switches it to data
+descriptors so every entry is written strictly forward. The buffer is drained
+after each chunk, so memory stays at about one chunk no matter how large the
+archive grows.
+"""
+import io
+import logging
+import os
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+from app.core.config import ARCHIVE_CHUNK_SIZE, ARCHIVE_STORED_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(files: Iterable[Tuple[str, str]], chunk_size: int = ARCHIVE_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a ZIP archive of (archive name, file path) pairs chunk by chunk
+
+    Missing files are skipped.
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w") as archive:
+        for arcname, path in files:
+            try:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+            except OSError:
+                logger.error(f"Skipping missing archive entry {path}")
+                continue
+            info.compress_type = (
+                zipfile.ZIP_STORED if path.lower().endswith(ARCHIVE_STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+            )
+            # file_size comes from stat, so zipfile picks ZIP64 headers up front when needed
+            with open(path, "rb") as source, archive.open(info, mode="w") as entry:
+                while chunk := source.read(chunk_size):
+                    entry.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
@@ -0,0 +1,7 @@
+"""
+Benchmark tooling for the Document Management API
+
+- seed:   bulk-load a database with realistic users, documents and history
+- load:   run concurrent HTTP load scenarios against a local server
+- report: latency summaries and baseline comparison shared by all benchmarks
+"""
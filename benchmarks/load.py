@@ -0,0 +1,237 @@
+"""
+End-to-end load scenarios against a locally running API
+
+Start a server against a seeded database (or pass --spawn to let this tool
+start one), then run the scenarios:
+
+    python -m benchmarks.seed --database-url sqlite:///./bench.db
+    python -m benchmarks.load --database-url sqlite:///./bench.db --spawn \\
+        --concurrency 100 --duration 30 --output bench_output.json
+
+Each scenario reports throughput and p50/p95/p99 latency in the JSON format
+understood by `python -m benchmarks.report compare`. A spawned server runs
+without admission control unless --rate-limit is given; 429 answers are
+counted as `rate_limited` and left out of the latency figures either way.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from sqlalchemy import create_engine, select
+
+from app.models.user import User
+from benchmarks.report import build_report, summarize, write_report
+from benchmarks.seed import ADMIN_EMAIL, DEFAULT_PASSWORD, WORDS, FILE_HEADERS
+
+SCENARIOS = ("public_approved", "search_advanced", "login", "upload")
+
+
+class Target:
+    """Connection details and credentials shared by all workers"""
+
+    def __init__(self, base_url: str, user_emails: list, password: str):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.user_emails = user_emails
+        self.password = password
+        self.admin_token = None
+        self.user_token = None
+
+    def connect(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def login(self, email: str) -> str:
+        conn = self.connect()
+        try:
+            status, body = send(conn, "POST", "/auth/login",
+                                json.dumps({"email": email, "password": self.password}),
+                                {"Content-Type": "application/json"})
+        finally:
+            conn.close()
+        if status != 200:
+            raise RuntimeError(f"Login failed for {email}: {status} {body[:200]!r}")
+        return json.loads(body)["access_token"]
+
+
+def send(conn, method: str, path: str, body=None, headers=None):
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def multipart_body(filename: str, content_type: str, payload: bytes):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def build_request(scenario: str, target: Target, rng: random.Random):
+    """Return (method, path, body, headers) for one request of a scenario"""
+    if scenario == "public_approved":
+        query = {"skip": rng.randint(0, 1000), "limit": 20}
+        if rng.random() < 0.5:
+            query["search"] = rng.choice(WORDS)
+        return "GET", f"/documents/public/approved?{urlencode(query)}", None, {}
+
+    if scenario == "search_advanced":
+        query = {"status": rng.choice(["pending", "approved", "rejected"]),
+                 "skip": rng.randint(0, 1000), "limit": 20}
+        if rng.random() < 0.5:
+            query["search"] = rng.choice(WORDS)
+        headers = {"Authorization": f"Bearer {target.admin_token}"}
+        return "GET", f"/documents/search/advanced?{urlencode(query)}", None, headers
+
+    if scenario == "login":
+        payload = {"email": rng.choice(target.user_emails), "password": target.password}
+        return "POST", "/auth/login", json.dumps(payload), {"Content-Type": "application/json"}
+
+    if scenario == "upload":
+        payload = FILE_HEADERS["pdf"] + rng.randbytes(rng.randint(8 * 1024, 256 * 1024))
+        body, content_type = multipart_body(f"load_{uuid.uuid4().hex}.pdf", "application/pdf", payload)
+        headers = {"Authorization": f"Bearer {target.user_token}", "Content-Type": content_type}
+        return "POST", "/documents/upload", body, headers
+
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def run_scenario(scenario: str, target: Target, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = [0]
+    rate_limited = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id: int):
+        rng = random.Random(worker_id)
+        conn = target.connect()
+        local_latencies = []
+        local_errors = 0
+        local_rate_limited = 0
+        try:
+            while time.perf_counter() < deadline:
+                method, path, body, headers = build_request(scenario, target, rng)
+                started = time.perf_counter()
+                try:
+                    status, _ = send(conn, method, path, body, headers)
+                except (OSError, http.client.HTTPException):
+                    local_errors += 1
+                    conn.close()
+                    conn = target.connect()
+                    continue
+                if status == 429:
+                    # Answered by the limiter before any route ran: not a latency sample
+                    local_rate_limited += 1
+                    continue
+                local_latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    local_errors += 1
+        finally:
+            conn.close()
+            with lock:
+                latencies.extend(local_latencies)
+                errors[0] += local_errors
+                rate_limited[0] += local_rate_limited
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = summarize(latencies, elapsed=time.perf_counter() - started, errors=errors[0])
+    summary["rate_limited"] = rate_limited[0]
+    return summary
+
+
+def sample_user_emails(database_url: str, limit: int = 1000) -> list:
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        emails = conn.execute(
+            select(User.email).where(User.role == "user").limit(limit)
+        ).scalars().all()
+    engine.dispose()
+    return emails
+
+
+def spawn_server(database_url: str, base_url: str, workers: int, rate_limit: bool = False) -> subprocess.Popen:
+    port = str(urlsplit(base_url).port or 8000)
+    # A few load threads look like one abusive client to the limiter
+    env = dict(os.environ, DATABASE_URL=database_url, RATE_LIMIT_ENABLED="1" if rate_limit else "0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", port,
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env
+    )
+
+    target = Target(base_url, [], "")
+    for _ in range(100):
+        try:
+            conn = target.connect()
+            status, _ = send(conn, "GET", "/health")
+            conn.close()
+            if status == 200:
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run load scenarios against the API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db",
+                        help="Seeded database, used to pick login accounts")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per scenario")
+    parser.add_argument("--spawn", action="store_true", help="Start a uvicorn server for the run")
+    parser.add_argument("--workers", type=int, default=1, help="Server workers when using --spawn")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="Keep admission control enabled on the spawned server")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    process = spawn_server(args.database_url, args.base_url, args.workers, args.rate_limit) if args.spawn else None
+    try:
+        user_emails = sample_user_emails(args.database_url)
+        if not user_emails:
+            parser.error("No users found; seed the database first with benchmarks.seed")
+
+        target = Target(args.base_url, user_emails, args.password)
+        target.admin_token = target.login(ADMIN_EMAIL)
+        target.user_token = target.login(user_emails[0])
+
+        results = {}
+        for scenario in args.scenarios:
+            results[scenario] = run_scenario(scenario, target, args.concurrency, args.duration)
+            print(f"{scenario}: {results[scenario]}", file=sys.stderr)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    write_report(
+        build_report("load", results, concurrency=args.concurrency,
+                     duration=args.duration, base_url=args.base_url),
+        args.output
+    )
+
+
+if __name__ == "__main__":
+    main()
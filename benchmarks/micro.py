@@ -0,0 +1,202 @@
+"""
+Micro-benchmarks for the primitives every request hits
+
+    python -m benchmarks.micro run --output micro.json
+    python -m benchmarks.micro run --save-baseline
+    python -m benchmarks.micro compare --threshold 0.15
+
+`compare` runs the suite and diffs it against the stored baseline, exiting
+non-zero when any benchmark is slower than the baseline by more than the
+threshold. Benchmarks run against an in-memory SQLite database and a
+temporary upload folder, so no external services are needed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+from types import SimpleNamespace
+
+from fastapi import UploadFile
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.datastructures import Headers
+
+from app.database import Base
+from app.models.user import User
+from app.models.document import Document
+from app.schemas.document import DocumentAdminView
+from app.core.security import create_access_token_with_role
+from app.dependencies.auth import get_current_user
+from app.utils import file_handler
+from benchmarks.report import build_report, compare, load_report, print_comparison, summarize, write_report
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+# Target wall time for one repeat; loops per repeat are calibrated to reach it
+REPEAT_SECONDS = 0.2
+REPEATS = 7
+# Tail percentiles over a handful of repeats are noise; compare the stable metrics
+COMPARED_METRICS = ("min_ms", "p50_ms")
+
+
+def measure(func, repeats: int = REPEATS) -> dict:
+    """Time `func` like timeit: calibrate a loop count, then time several repeats"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= REPEAT_SECONDS / 4 or loops >= 1_000_000:
+            break
+        loops *= 2
+    loops = max(1, int(loops * REPEAT_SECONDS / max(elapsed, 1e-9)))
+
+    per_call = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - started) / loops)
+
+    result = summarize(per_call)
+    result["loops"] = loops
+    result["min_ms"] = round(min(per_call) * 1000, 6)
+    return result
+
+
+def make_session_factory(documents: int):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+    db = session_factory()
+    db.add(User(id=1, email="bench@example.com", hashed_password="x", role="admin"))
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(Document, [
+        {
+            "id": i, "filename": f"document_{i}.pdf", "file_path": f"uploads/document_{i}.pdf",
+            "status": "approved", "uploaded_by": 1, "approved_by": 1,
+            "approval_date": now, "approval_comment": "ok", "created_at": now, "updated_at": now
+        }
+        for i in range(1, documents + 1)
+    ])
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def benchmark_cases(session_factory, upload_folder: str) -> dict:
+    """Build {name: zero-argument callable} for every micro-benchmark"""
+    cases = {}
+    expires = timedelta(minutes=30)
+
+    cases["security.create_access_token_with_role"] = (
+        lambda: create_access_token_with_role(1, "admin", expires)
+    )
+
+    token = create_access_token_with_role(1, "admin", expires)
+    credentials = SimpleNamespace(credentials=token)
+    auth_db = session_factory()
+
+    def current_user():
+        auth_db.expire_all()
+        return get_current_user(credentials, auth_db)
+
+    cases["auth.get_current_user"] = current_user
+
+    file_handler.UPLOAD_FOLDER = upload_folder
+    for label, size in (("1kb", 1024), ("100kb", 100 * 1024), ("1mb", 1024 * 1024), ("5mb", 5 * 1024 * 1024)):
+        payload = b"%PDF-1.4\n" + os.urandom(size - 9)
+
+        def save(payload=payload, label=label):
+            upload = UploadFile(
+                file=BytesIO(payload),
+                filename=f"bench_{label}.pdf",
+                headers=Headers({"content-type": "application/pdf"})
+            )
+            # Each call writes a new uuid-named file: delete it, or the loops fill the disk
+            file_handler.remove_file(file_handler.save_file(upload).path)
+
+        cases[f"file_handler.save_file[{label}]"] = save
+
+    admin_view_list = TypeAdapter(list[DocumentAdminView])
+    listing_db = session_factory()
+    for count in (100, 1000):
+        documents = listing_db.query(Document).limit(count).all()
+        cases[f"serialize.DocumentAdminView[{count}]"] = (
+            lambda documents=documents: admin_view_list.dump_json(admin_view_list.validate_python(documents))
+        )
+
+    for count in (100, 1000):
+        def hydrate(count=count):
+            db = session_factory()
+            try:
+                return db.query(Document).limit(count).all()
+            finally:
+                db.close()
+
+        cases[f"orm.hydrate_documents[{count}]"] = hydrate
+
+    return cases
+
+
+def run(filter_text: str = None) -> dict:
+    session_factory = make_session_factory(documents=1000)
+    results = {}
+    with tempfile.TemporaryDirectory() as upload_folder:
+        for name, func in benchmark_cases(session_factory, upload_folder).items():
+            if filter_text and filter_text not in name:
+                continue
+            results[name] = measure(func)
+            print(f"{name:<45} p50={results[name]['p50_ms']:.4f}ms", file=sys.stderr)
+    return build_report("micro", results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for hot primitives")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite")
+    run_parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    run_parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    run_parser.add_argument("--save-baseline", action="store_true",
+                            help="Store the results as the new baseline")
+    run_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+
+    compare_parser = subparsers.add_parser("compare", help="Run the suite and compare with the baseline")
+    compare_parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    compare_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    compare_parser.add_argument("--threshold", type=float, default=0.15,
+                                help="Allowed relative slowdown before flagging (default 0.15)")
+
+    args = parser.parse_args(argv)
+    report = run(args.filter)
+
+    if args.command == "run":
+        if args.save_baseline:
+            os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+            write_report(report, args.baseline)
+            print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        if args.output or not args.save_baseline:
+            write_report(report, args.output)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        parser.error(f"No baseline at {args.baseline}; run `micro run --save-baseline` first")
+    rows = compare(load_report(args.baseline), report, args.threshold, COMPARED_METRICS)
+    print_comparison(rows)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
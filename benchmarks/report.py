@@ -0,0 +1,138 @@
+"""
+Benchmark reports: latency summaries and baseline comparison
+
+Reports are plain JSON documents of the form
+    {"meta": {...}, "results": {"<name>": {"p50_ms": ..., ...}}}
+so two runs can be diffed with:
+    python -m benchmarks.report compare baseline.json current.json --threshold 0.10
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+from datetime import datetime
+
+# Metrics where a higher value means a regression
+LOWER_IS_BETTER = ("min_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms")
+# Metrics where a lower value means a regression
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list, elapsed: float = None, errors: int = 0) -> dict:
+    """Summarize latencies (in seconds) into millisecond statistics"""
+    values = sorted(latencies)
+    summary = {
+        "requests": len(values),
+        "errors": errors,
+        "mean_ms": round(sum(values) / len(values) * 1000, 4) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 4),
+        "p95_ms": round(percentile(values, 95) * 1000, 4),
+        "p99_ms": round(percentile(values, 99) * 1000, 4),
+        "max_ms": round(values[-1] * 1000, 4) if values else 0.0,
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(values) / elapsed, 2)
+    return summary
+
+
+def build_report(kind: str, results: dict, **meta) -> dict:
+    """Wrap results with metadata describing the run"""
+    return {
+        "meta": {
+            "kind": kind,
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **meta
+        },
+        "results": results
+    }
+
+
+def write_report(report: dict, path: str = None):
+    """Write a report to a file, or to stdout when no path is given"""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def load_report(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float, metrics: tuple = None) -> list:
+    """
+    Compare two reports metric by metric
+
+    Returns one row per (name, metric) present in both reports, flagged as a
+    regression when it is worse than the baseline by more than `threshold`
+    (a fraction, e.g. 0.10 for 10%). `metrics` restricts the comparison.
+    """
+    metrics = metrics or LOWER_IS_BETTER + HIGHER_IS_BETTER
+    rows = []
+    for name, base_metrics in sorted(baseline["results"].items()):
+        current_metrics = current["results"].get(name)
+        if current_metrics is None:
+            continue
+        for metric in metrics:
+            if metric not in base_metrics or metric not in current_metrics:
+                continue
+            base_value = base_metrics[metric]
+            current_value = current_metrics[metric]
+            if base_value == 0:
+                continue
+            change = (current_value - base_value) / base_value
+            worse = change if metric in LOWER_IS_BETTER else -change
+            rows.append({
+                "name": name,
+                "metric": metric,
+                "baseline": base_value,
+                "current": current_value,
+                "change": round(change, 4),
+                "regression": worse > threshold
+            })
+    return rows
+
+
+def print_comparison(rows: list):
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(
+            f"{row['name']:<40} {row['metric']:<15} "
+            f"{row['baseline']:>12.4f} -> {row['current']:>12.4f} "
+            f"({row['change'] * 100:+.1f}%) {flag}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare benchmark reports")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare a run against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Allowed relative slowdown before flagging (default 0.10)")
+
+    args = parser.parse_args(argv)
+
+    rows = compare(load_report(args.baseline), load_report(args.current), args.threshold)
+    print_comparison(rows)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Bulk seeding tool for benchmark databases
+
+Generates users, documents, status history and upload files with bulk
+inserts so large datasets can be built in minutes:
+
+    python -m benchmarks.seed --database-url sqlite:///./bench.db \\
+        --users 10000 --documents 1000000 --files 200
+
+Every seeded user shares the password given by --password (hashed once), and
+an admin account `bench-admin@example.com` is created if it does not exist.
+Document sizes and the users' storage counters are filled in as they would be
+by real uploads, so quota checks see realistic usage.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, create_engine, event, func, select, update
+
+from app.database import Base
+from app.models.user import User
+from app.models.document import Document
+from app.models.document_status_history import DocumentStatusHistory
+from app.core.security import hash_password
+from app.core.config import UPLOAD_FOLDER
+
+ADMIN_EMAIL = "bench-admin@example.com"
+DEFAULT_PASSWORD = "benchpass"
+
+WORDS = [
+    "invoice", "contract", "report", "summary", "receipt", "statement", "policy",
+    "proposal", "agreement", "minutes", "budget", "forecast", "audit", "review",
+    "scan", "passport", "license", "certificate", "payslip", "letter", "q1", "q2",
+    "q3", "q4", "final", "draft", "signed", "2023", "2024", "2025", "hr", "legal"
+]
+FILE_TYPES = [("pdf", 0.7), ("jpg", 0.2), ("png", 0.1)]
+STATUSES = [("approved", 0.6), ("pending", 0.25), ("rejected", 0.15)]
+
+# Minimal headers so generated files are recognised as the right type
+FILE_HEADERS = {
+    "pdf": b"%PDF-1.4\n",
+    "jpg": b"\xff\xd8\xff\xe0\x00\x10JFIF\x00",
+    "png": b"\x89PNG\r\n\x1a\n",
+}
+
+
+def weighted_choice(rng: random.Random, choices: list):
+    return rng.choices([value for value, _ in choices], weights=[w for _, w in choices])[0]
+
+
+def random_filename(rng: random.Random, extension: str) -> str:
+    words = rng.sample(WORDS, rng.randint(2, 4))
+    return f"{'_'.join(words)}_{rng.randint(1, 9999)}.{extension}"
+
+
+def create_bench_engine(database_url: str):
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+
+    if database_url.startswith("sqlite"):
+        @event.listens_for(engine, "connect")
+        def fast_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.close()
+
+    return engine
+
+
+def write_upload_files(rng: random.Random, count: int, folder: str) -> dict:
+    """Write `count` files per type and return {extension: [paths]}"""
+    os.makedirs(folder, exist_ok=True)
+    paths = {extension: [] for extension, _ in FILE_TYPES}
+    for extension in paths:
+        for i in range(count):
+            path = os.path.join(folder, f"bench_{i}.{extension}")
+            size = rng.randint(16 * 1024, 512 * 1024)
+            with open(path, "wb") as f:
+                f.write(FILE_HEADERS[extension])
+                f.write(rng.randbytes(size))
+            paths[extension].append(path)
+    return paths
+
+
+def insert_chunked(conn, table, rows: list, chunk_size: int):
+    for start in range(0, len(rows), chunk_size):
+        conn.execute(table.insert(), rows[start:start + chunk_size])
+
+
+def seed(
+    database_url: str,
+    users: int,
+    documents: int,
+    files: int,
+    password: str = DEFAULT_PASSWORD,
+    chunk_size: int = 10000,
+    seed_value: int = 42
+) -> dict:
+    rng = random.Random(seed_value)
+    engine = create_bench_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    hashed = hash_password(password)
+    now = datetime.utcnow()
+
+    file_paths = write_upload_files(rng, files, os.path.join(UPLOAD_FOLDER, "bench")) if files else {}
+
+    with engine.begin() as conn:
+        first_user_id = (conn.execute(select(func.max(User.id))).scalar() or 0) + 1
+        first_doc_id = (conn.execute(select(func.max(Document.id))).scalar() or 0) + 1
+
+        admin_id = conn.execute(select(User.id).where(User.email == ADMIN_EMAIL)).scalar()
+        user_rows = [
+            {"id": first_user_id + i, "email": f"bench-user-{first_user_id + i}@example.com",
+             "hashed_password": hashed, "role": "user"}
+            for i in range(users)
+        ]
+        if admin_id is None:
+            admin_id = first_user_id + users
+            user_rows.append({"id": admin_id, "email": ADMIN_EMAIL, "hashed_password": hashed, "role": "admin"})
+        insert_chunked(conn, User.__table__, user_rows, chunk_size)
+        user_ids = [row["id"] for row in user_rows if row["role"] == "user"] or [admin_id]
+        file_sizes = {path: os.path.getsize(path) for paths in file_paths.values() for path in paths}
+        usage = {}  # user id -> [bytes, documents]
+
+        for start in range(0, documents, chunk_size):
+            doc_rows = []
+            history_rows = []
+            for doc_id in range(first_doc_id + start, first_doc_id + min(start + chunk_size, documents)):
+                extension = weighted_choice(rng, FILE_TYPES)
+                status = weighted_choice(rng, STATUSES)
+                created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+                paths = file_paths.get(extension)
+                filename = random_filename(rng, extension)
+                file_path = rng.choice(paths) if paths else os.path.join(UPLOAD_FOLDER, filename)
+                size = file_sizes.get(file_path) or rng.randint(16 * 1024, 512 * 1024)
+                owner_id = rng.choice(user_ids)
+                owner_usage = usage.setdefault(owner_id, [0, 0])
+                owner_usage[0] += size
+                owner_usage[1] += 1
+
+                doc = {
+                    "id": doc_id,
+                    "filename": filename,
+                    "file_path": file_path,
+                    "size_bytes": size,
+                    "status": status,
+                    "uploaded_by": owner_id,
+                    "approved_by": None,
+                    "approval_date": None,
+                    "approval_comment": None,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+                history_rows.append({
+                    "document_id": doc_id, "status": "pending", "changed_by": doc["uploaded_by"],
+                    "comment": None, "created_at": created_at
+                })
+
+                if status != "pending":
+                    reviewed_at = created_at + timedelta(seconds=rng.randint(60, 7 * 24 * 3600))
+                    comment = "Looks good" if status == "approved" else "Illegible scan"
+                    doc.update(approved_by=admin_id, approval_date=reviewed_at,
+                               approval_comment=comment, updated_at=reviewed_at)
+                    history_rows.append({
+                        "document_id": doc_id, "status": status, "changed_by": admin_id,
+                        "comment": comment, "created_at": reviewed_at
+                    })
+
+                doc_rows.append(doc)
+
+            conn.execute(Document.__table__.insert(), doc_rows)
+            conn.execute(DocumentStatusHistory.__table__.insert(), history_rows)
+
+        users_table = User.__table__
+        add_usage = update(users_table).where(users_table.c.id == bindparam("user_id")).values(
+            storage_used_bytes=users_table.c.storage_used_bytes + bindparam("used"),
+            document_count=users_table.c.document_count + bindparam("count")
+        )
+        usage_rows = [{"user_id": user_id, "used": used, "count": count} for user_id, (used, count) in usage.items()]
+        for start in range(0, len(usage_rows), chunk_size):
+            conn.execute(add_usage, usage_rows[start:start + chunk_size])
+
+    return {
+        "users": users,
+        "documents": documents,
+        "files": sum(len(paths) for paths in file_paths.values()),
+        "admin_email": ADMIN_EMAIL,
+        "password": password,
+        "elapsed_seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a benchmark database")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--files", type=int, default=50,
+                        help="Upload files to generate per file type (documents share them)")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    summary = seed(
+        args.database_url,
+        users=args.users,
+        documents=args.documents,
+        files=args.files,
+        password=args.password,
+        chunk_size=args.chunk_size,
+        seed_value=args.seed
+    )
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Cold-start benchmark
+
+Spawns fresh interpreters and times each startup phase: importing app.main,
+running the lifespan startup, and producing the first /openapi.json document.
+
+    python -m app.main --dump-openapi openapi.json
+    python -m benchmarks.startup --runs 10 --openapi openapi.json --no-schema
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.report import build_report, summarize, write_report
+
+PHASES_SNIPPET = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def run_lifespan():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        pass
+
+asyncio.run(run_lifespan())
+lifespan_done = time.perf_counter()
+app.main.app.openapi()
+openapi_done = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "lifespan": lifespan_done - imported,
+    "first_openapi": openapi_done - lifespan_done,
+}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", PHASES_SNIPPET],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    phases = json.loads(output.strip().splitlines()[-1])
+    phases["process_total"] = time.perf_counter() - started
+    return phases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure API cold-start time")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", help="Defaults to a fresh temporary SQLite file per run")
+    parser.add_argument("--openapi", help="Prebuilt OpenAPI document to load at startup")
+    parser.add_argument("--no-schema", action="store_true",
+                        help="Skip schema creation at startup (CREATE_SCHEMA_ON_STARTUP=0)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, CREATE_SCHEMA_ON_STARTUP="0" if args.no_schema else "1")
+    if args.openapi:
+        env["OPENAPI_PREBUILT_PATH"] = os.path.abspath(args.openapi)
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for run in range(args.runs):
+            env["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/startup_{run}.db"
+            for phase, seconds in run_once(env).items():
+                timings.setdefault(phase, []).append(seconds)
+
+    results = {phase: summarize(values) for phase, values in timings.items()}
+    for phase, summary in results.items():
+        print(f"{phase:<15} p50={summary['p50_ms']:.1f}ms p95={summary['p95_ms']:.1f}ms", file=sys.stderr)
+
+    write_report(
+        build_report("startup", results, runs=args.runs,
+                     prebuilt_openapi=bool(args.openapi), create_schema=not args.no_schema),
+        args.output
+    )
+
+
+if __name__ == "__main__":
+    main()